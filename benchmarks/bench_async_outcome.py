@@ -0,0 +1,79 @@
+"""
+Time to post a course's grades one at a time with a SessionTransport and
+concurrently with an AsyncOutcomeClient, against a stub LMS on localhost
+that takes 20 ms to answer each request, as a real LMS takes at least.
+
+Run from the repository root with the package importable (Python 3.5+)::
+
+    PYTHONPATH=src python benchmarks/bench_async_outcome.py
+"""
+from __future__ import print_function
+
+import asyncio
+import time
+
+from lti import OutcomeRequest
+from lti.async_outcome import AsyncOutcomeClient, ExecutorTransport, aiohttp
+from lti.transport import SessionTransport
+
+from stub_lms import StubLMS
+
+NUMBER = 200
+LATENCY = 0.02
+
+
+def outcome_requests(url):
+    return [OutcomeRequest({
+        'consumer_key': 'consumer',
+        'consumer_secret': 'secret',
+        'lis_outcome_service_url': url,
+        'lis_result_sourcedid': str(i),
+    }) for i in range(NUMBER)]
+
+
+def report(name, seconds):
+    print('{:<40} {:>8.2f} s {:>10.0f} grades/s'.format(
+        name, seconds, NUMBER / seconds))
+
+
+def bench_sequential(url):
+    transport = SessionTransport()
+    start = time.time()
+    for request in outcome_requests(url):
+        request.transport = transport
+        assert request.post_replace_result(0.5).is_success()
+    report('SessionTransport, one at a time', time.time() - start)
+    transport.close()
+
+
+def bench_async(name, url, client):
+    async def post_all():
+        async with client:
+            return await asyncio.gather(*[
+                client.post_replace_result(request, 0.5)
+                for request in outcome_requests(url)])
+
+    loop = asyncio.new_event_loop()
+    start = time.time()
+    responses = loop.run_until_complete(post_all())
+    report(name, time.time() - start)
+    loop.close()
+    assert all(response.is_success() for response in responses)
+
+
+def main():
+    lms = StubLMS(latency=LATENCY)
+    url = lms.url
+    try:
+        bench_sequential(url)
+        if aiohttp is not None:
+            bench_async('AsyncOutcomeClient(per_host=20)', url,
+                        AsyncOutcomeClient(per_host=20))
+        bench_async('AsyncOutcomeClient(ExecutorTransport())', url,
+                    AsyncOutcomeClient(ExecutorTransport(), per_host=20))
+    finally:
+        lms.stop()
+
+
+if __name__ == '__main__':
+    main()
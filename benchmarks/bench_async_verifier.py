@@ -0,0 +1,103 @@
+"""
+Launch verification under concurrent load when every validator lookup is a
+1ms database call: a blocking validator run through run_in_executor, as a
+synchronous is_valid_request forces, against an async validator awaited by
+AsyncLaunchVerifier.
+
+Run from the repository root with the package importable::
+
+    PYTHONPATH=src python benchmarks/bench_async_verifier.py
+"""
+from __future__ import print_function
+
+import asyncio
+import time
+
+from oauthlib.oauth1 import RequestValidator
+
+from lti import HMACLaunchVerifier, ToolConsumer, ToolProvider
+from lti.async_verifier import AsyncLaunchVerifier
+
+CONCURRENCY = 1000
+LATENCY = 0.001
+KEY = 'consumerkey000000000001'
+SECRET = 'secret'
+URL = 'https://example.edu/launch'
+
+
+class BlockingValidator(RequestValidator):
+    dummy_client = 'dummyconsumerkey000000'
+
+    def validate_client_key(self, client_key, request):
+        time.sleep(LATENCY)
+        return client_key == KEY
+
+    def get_client_secret(self, client_key, request):
+        time.sleep(LATENCY)
+        return SECRET
+
+    def validate_timestamp_and_nonce(self, client_key, timestamp, nonce,
+                                     request, request_token=None,
+                                     access_token=None):
+        time.sleep(LATENCY)
+        return True
+
+
+class AsyncValidator(RequestValidator):
+    dummy_client = 'dummyconsumerkey000000'
+
+    async def validate_client_key(self, client_key, request):
+        await asyncio.sleep(LATENCY)
+        return client_key == KEY
+
+    async def get_client_secret(self, client_key, request):
+        await asyncio.sleep(LATENCY)
+        return SECRET
+
+    async def validate_timestamp_and_nonce(self, client_key, timestamp,
+                                           nonce, request, request_token=None,
+                                           access_token=None):
+        await asyncio.sleep(LATENCY)
+        return True
+
+
+def launches():
+    consumer = ToolConsumer(KEY, SECRET, launch_url=URL, params={
+        'resource_link_id': 'link', 'user_id': 'user', 'roles': 'Learner'})
+    data = consumer.generate_launch_data()
+    return [ToolProvider.from_unpacked_request(
+        None, data, URL,
+        {'Content-Type': 'application/x-www-form-urlencoded'})
+        for _ in range(CONCURRENCY)]
+
+
+async def in_executor(tool_providers):
+    loop = asyncio.get_event_loop()
+    verifier = HMACLaunchVerifier(BlockingValidator())
+    return await asyncio.gather(*[
+        loop.run_in_executor(None, verifier.verify, tp)
+        for tp in tool_providers])
+
+
+async def awaited(tool_providers):
+    verifier = AsyncLaunchVerifier(AsyncValidator())
+    return await asyncio.gather(*[
+        verifier.verify_async(tp) for tp in tool_providers])
+
+
+def main():
+    for name, bench in [('run_in_executor', in_executor),
+                        ('verify_async', awaited)]:
+        tool_providers = launches()
+        loop = asyncio.new_event_loop()
+        start = time.time()
+        results = loop.run_until_complete(bench(tool_providers))
+        seconds = time.time() - start
+        loop.close()
+        assert all(results)
+        print('{:<40} {:>10.0f} launches/s'.format(
+            name, CONCURRENCY / seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Throughput of verify_many with one process and with a process pool.
+
+Run from the repository root with the package importable::
+
+    PYTHONPATH=src python benchmarks/bench_batch.py
+"""
+from __future__ import print_function
+
+import multiprocessing
+
+from oauthlib.oauth1 import RequestValidator
+
+from lti import HMACLaunchVerifier, ToolConsumer
+from lti.batch import verify_many
+
+NUMBER = 20000
+KEY = 'consumerkey000000000001'
+SECRET = 'secret'
+URL = 'https://example.edu/launch'
+HEADERS = {'Content-Type': 'application/x-www-form-urlencoded'}
+
+
+class ReplayValidator(RequestValidator):
+    dummy_client = 'dummyconsumerkey000000'
+
+    def validate_client_key(self, client_key, request):
+        return client_key == KEY
+
+    def get_client_secret(self, client_key, request):
+        return SECRET
+
+    def validate_timestamp_and_nonce(self, client_key, timestamp, nonce,
+                                     request, request_token=None,
+                                     access_token=None):
+        return True
+
+
+def recorded_launches():
+    launches = []
+    for i in range(100):
+        consumer = ToolConsumer(KEY, SECRET, launch_url=URL, params={
+            'resource_link_id': str(i), 'user_id': 'user{0}'.format(i),
+            'roles': 'Learner', 'custom_chapter': '12'})
+        launches.append((consumer.generate_launch_data(), URL, HEADERS))
+    return launches * (NUMBER // len(launches))
+
+
+def bench(name, validator, workers):
+    stats = []
+    for result in verify_many(recorded_launches(), validator,
+                              workers=workers, progress=stats.append):
+        assert result
+    print('{:<40} {:>10.0f} launches/s'.format(
+        '{0} workers={1}'.format(name, workers), stats[-1].per_second))
+
+
+def main():
+    for workers in sorted({1, multiprocessing.cpu_count()}):
+        bench('oauthlib', ReplayValidator(), workers)
+        bench('hmac', HMACLaunchVerifier(ReplayValidator()), workers)
+
+
+if __name__ == '__main__':
+    main()
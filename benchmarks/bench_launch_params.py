@@ -0,0 +1,141 @@
+"""
+Micro benchmarks for LaunchParams.
+
+Run from the repository root with the package importable::
+
+    PYTHONPATH=src python benchmarks/bench_launch_params.py
+"""
+from __future__ import print_function
+
+import timeit
+
+from lti import LaunchParams, LazyLaunchParams, ToolBase
+from lti.utils import parse_qs
+
+try:
+    from urllib.parse import urlencode
+except ImportError:
+    from urllib import urlencode  # Python 2
+
+LAUNCH = {
+    'lti_message_type': 'basic-lti-launch-request',
+    'lti_version': 'LTI-1p0',
+    'resource_link_id': '88391-e1919-bb3456',
+    'user_id': '0ae836b9-7fc9-4060-006f-27b2066ac545',
+    'roles': 'urn:lti:role:ims/lis/Learner,urn:lti:instrole:ims/lis/Student,'
+             'Member',
+    'context_id': '8213060-006f-27b2066ac545',
+    'context_type': 'CourseSection',
+    'lis_person_name_full': 'Jane Q. Public',
+    'custom_chapter': '12',
+}
+
+# a launch as sent by a typical LMS, most of which a tool never reads
+FULL_LAUNCH = dict(LAUNCH, **{
+    'oauth_consumer_key': 'key',
+    'oauth_signature_method': 'HMAC-SHA1',
+    'oauth_timestamp': '1466828504',
+    'oauth_nonce': '9069031379649850801466828504',
+    'oauth_version': '1.0',
+    'oauth_signature': 'WZ9IHyFnKgDKBvnAfNSL3aOVteg=',
+    'oauth_callback': 'about:blank',
+    'resource_link_title': 'Weekly Blog',
+    'resource_link_description': 'A weekly blog.',
+    'user_image': 'https://lms.example.edu/images/users/12345.png',
+    'lis_person_name_given': 'Jane',
+    'lis_person_name_family': 'Public',
+    'lis_person_contact_email_primary': 'user@school.edu',
+    'lis_person_sourcedid': 'school.edu:user',
+    'lis_result_sourcedid': 'feb-123-456-2929::28883',
+    'lis_outcome_service_url': 'https://lms.example.edu/outcomes/',
+    'lis_course_offering_sourcedid': 'DD-ST101',
+    'lis_course_section_sourcedid': 'DD-ST101:C1',
+    'context_title': 'Design of Personal Environments',
+    'context_label': 'SI182',
+    'launch_presentation_locale': 'en-US',
+    'launch_presentation_document_target': 'iframe',
+    'launch_presentation_width': '320',
+    'launch_presentation_height': '240',
+    'launch_presentation_return_url': 'https://lms.example.edu/return',
+    'tool_consumer_info_product_family_code': 'canvas',
+    'tool_consumer_info_version': 'cloud',
+    'tool_consumer_instance_guid': 'lmsng.school.edu',
+    'tool_consumer_instance_name': 'SchoolU',
+    'tool_consumer_instance_contact_email': 'lms@school.edu',
+    'ext_roles': 'urn:lti:instrole:ims/lis/Student',
+    'custom_canvas_course_id': '123',
+    'custom_canvas_user_id': '456',
+})
+
+NUMBER = 20000
+
+
+def report(name, seconds):
+    print('{:<40} {:>8.2f} us/launch'.format(name, seconds / NUMBER * 1e6))
+
+
+class UncachedLaunchParams(LaunchParams):
+    """
+    Splits list values on every read, as LaunchParams used to.
+    """
+
+    def _param_value(self, param):
+        if param in self.schema.list_params:
+            return [x.strip() for x in self._params[param].split(',')]
+        return self._params[param]
+
+
+def bench_list_params():
+
+    def per_launch(tool):
+        # roughly what a launch handler does with the list valued params
+        tool.is_student()
+        tool.is_instructor()
+        tool.has_role('Member')
+        tool.launch_params['context_type']
+
+    for name, params_class in [('list params (reparsed every read)',
+                                UncachedLaunchParams),
+                               ('list params (cached)', LaunchParams)]:
+        tool = ToolBase('key', 'secret', params_class(LAUNCH))
+        report(name, timeit.timeit(lambda: per_launch(tool), number=NUMBER))
+
+
+def bench_rebuild():
+    stored = dict(LaunchParams(LAUNCH)._params)
+    launch_params = LaunchParams(stored)
+
+    report('rebuild with LaunchParams(stored)',
+           timeit.timeit(lambda: LaunchParams(stored), number=NUMBER))
+    report('rebuild with from_trusted(stored)',
+           timeit.timeit(lambda: LaunchParams.from_trusted(stored),
+                         number=NUMBER))
+    report('rebuild with from_trusted(validate)',
+           timeit.timeit(lambda: LaunchParams.from_trusted(stored, True),
+                         number=NUMBER))
+    report('copy()', timeit.timeit(launch_params.copy, number=NUMBER))
+
+
+def bench_form_body():
+    body = urlencode(FULL_LAUNCH).encode('utf-8')
+
+    def read_some(launch_params):
+        for key in ('user_id', 'roles', 'context_id', 'custom_chapter'):
+            launch_params.get(key)
+
+    report('parse body into LaunchParams', timeit.timeit(
+        lambda: read_some(LaunchParams(parse_qs(body.decode('utf-8')))),
+        number=NUMBER))
+    report('parse body into LazyLaunchParams', timeit.timeit(
+        lambda: read_some(LazyLaunchParams.from_body(body)),
+        number=NUMBER))
+
+
+def main():
+    bench_list_params()
+    bench_rebuild()
+    bench_form_body()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Launch verification with oauthlib and with the HMAC fast path.
+
+Run from the repository root with the package importable::
+
+    PYTHONPATH=src python benchmarks/bench_launch_verifier.py
+"""
+from __future__ import print_function
+
+import timeit
+
+from oauthlib.oauth1 import RequestValidator
+
+from lti import HMACLaunchVerifier, LaunchVerifier, ToolConsumer, ToolProvider
+
+NUMBER = 5000
+KEY = 'consumerkey000000000001'
+SECRET = 'secret'
+URL = 'https://example.edu/launch'
+
+
+class Validator(RequestValidator):
+    dummy_client = 'dummyconsumerkey000000'
+
+    def validate_client_key(self, client_key, request):
+        return client_key == KEY
+
+    def get_client_secret(self, client_key, request):
+        return SECRET
+
+    def validate_timestamp_and_nonce(self, client_key, timestamp, nonce,
+                                     request, request_token=None,
+                                     access_token=None):
+        return True
+
+
+def report(name, seconds):
+    print('{:<40} {:>8.1f} us'.format(name, seconds / NUMBER * 1e6))
+
+
+def main():
+    params = {
+        'resource_link_id': '88391-e1919-bb3456',
+        'user_id': '0ae836b9-7fc9-4060-006f-27b2066ac545',
+        'roles': 'Instructor,urn:lti:instrole:ims/lis/Administrator',
+        'lis_person_name_full': 'Jane Q. Public',
+        'context_title': 'Design of Personal Environments',
+        'custom_chapter': '12',
+        'ext_submit': 'Press to launch this activity',
+    }
+    consumer = ToolConsumer(KEY, SECRET, launch_url=URL, params=params)
+    tp = ToolProvider.from_unpacked_request(
+        None, consumer.generate_launch_data(), URL,
+        {'Content-Type': 'application/x-www-form-urlencoded'})
+    for name, verifier in [('oauthlib', LaunchVerifier(Validator())),
+                           ('hmac', HMACLaunchVerifier(Validator()))]:
+        assert verifier.verify(tp)
+        report(name + ' verify', timeit.timeit(
+            lambda: verifier.verify(tp), number=NUMBER))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Throughput of the nonce stores.
+
+Run from the repository root with the package importable::
+
+    PYTHONPATH=src python benchmarks/bench_nonce_store.py
+"""
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+import time
+
+from lti.nonce_store import (MemoryNonceStore, SharedMemoryNonceStore,
+                             SQLiteNonceStore, shared_memory)
+
+NUMBER = 20000
+
+
+def report(name, count, seconds):
+    print('{:<40} {:>10.0f} ops/s'.format(name, count / seconds))
+
+
+def bench_store(name, store):
+    timestamp = str(int(time.time()))
+    nonces = ['nonce{0}'.format(i) for i in range(NUMBER)]
+
+    start = time.time()
+    for nonce in nonces:
+        store.add('key', timestamp, nonce)
+    report(name + ' new nonces', NUMBER, time.time() - start)
+
+    # every one of these is a replay
+    start = time.time()
+    for nonce in nonces:
+        store.add('key', timestamp, nonce)
+    report(name + ' replayed nonces', NUMBER, time.time() - start)
+
+
+def main():
+    bench_store('memory', MemoryNonceStore())
+    directory = tempfile.mkdtemp()
+    try:
+        bench_store('sqlite', SQLiteNonceStore(
+            os.path.join(directory, 'nonces.db')))
+    finally:
+        shutil.rmtree(directory)
+    if shared_memory is not None:
+        store = SharedMemoryNonceStore('lti-bench-{0}'.format(os.getpid()))
+        try:
+            bench_store('shared memory', store)
+        finally:
+            store.unlink()
+            store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Cost of saving a grade to an Outbox on the request path, and the rate at
+which the outbox is then drained to a stub LMS on localhost.
+
+Run from the repository root with the package importable::
+
+    PYTHONPATH=src python benchmarks/bench_outbox.py
+"""
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+import time
+
+from lti import OutcomeRequest
+from lti.outbox import Outbox
+from lti.outcome_request import REPLACE_REQUEST
+
+from stub_lms import StubLMS
+
+NUMBER = 2000
+
+
+def main():
+    lms = StubLMS()
+    directory = tempfile.mkdtemp()
+    try:
+        outbox = Outbox(os.path.join(directory, 'outbox.db'))
+        requests = [OutcomeRequest({
+            'consumer_key': 'consumer',
+            'consumer_secret': 'secret',
+            'lis_outcome_service_url': lms.url,
+            'lis_result_sourcedid': str(i),
+            'operation': REPLACE_REQUEST,
+            'score': 0.5,
+        }) for i in range(NUMBER)]
+
+        start = time.time()
+        for request in requests:
+            outbox.put(request)
+        seconds = time.time() - start
+        print('{:<40} {:>8.1f} us/grade'.format(
+            'Outbox.put', seconds / NUMBER * 1e6))
+
+        start = time.time()
+        assert outbox.drain() == NUMBER
+        seconds = time.time() - start
+        print('{:<40} {:>8.0f} grades/s'.format(
+            'Outbox.drain', NUMBER / seconds))
+    finally:
+        lms.stop()
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
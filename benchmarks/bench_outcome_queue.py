@@ -0,0 +1,62 @@
+"""
+Grades posted after every attempt: 20 students make 5 attempts each
+against a stub LMS on localhost that takes 20 ms to answer. Compares the
+time post_replace_result holds up the request that records an attempt,
+and the number of requests the LMS receives, with and without an
+OutcomeQueue.
+
+Run from the repository root with the package importable::
+
+    PYTHONPATH=src python benchmarks/bench_outcome_queue.py
+"""
+from __future__ import print_function
+
+import time
+
+from lti import ToolProvider
+from lti.outcome_queue import OutcomeQueue
+from lti.transport import SessionTransport
+
+from stub_lms import StubLMS
+
+STUDENTS = 20
+ATTEMPTS = 5
+LATENCY = 0.02
+
+
+def bench(name, lms, queue):
+    transport = SessionTransport()
+    lms.posts = 0
+    blocked = 0
+    start = time.time()
+    for attempt in range(ATTEMPTS):
+        for student in range(STUDENTS):
+            tp = ToolProvider('consumer', 'secret', {
+                'lis_outcome_service_url': lms.url,
+                'lis_result_sourcedid': str(student)})
+            tp.outcome_transport = transport
+            tp.outcome_queue = queue
+            before = time.time()
+            tp.post_replace_result(attempt / float(ATTEMPTS))
+            blocked += time.time() - before
+    if queue is not None:
+        queue.close()
+    total = time.time() - start
+    transport.close()
+    print('{:<30} {:>8.3f} ms/attempt {:>6} LMS requests {:>8.2f} s'.format(
+        name, blocked / (STUDENTS * ATTEMPTS) * 1000, lms.posts, total))
+
+
+def main():
+    lms = StubLMS(latency=LATENCY)
+    try:
+        bench('post_replace_result', lms, None)
+        bench('OutcomeQueue(workers=4)', lms, OutcomeQueue(workers=4))
+        bench('OutcomeQueue(delay=1)', lms,
+              OutcomeQueue(workers=4, delay=1))
+    finally:
+        lms.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Cost of parsing the XML of outcome requests, as a tool consumer does for
+every request it receives, with the strict single pass of process_xml and
+with lxml.objectify, trying each operation in turn, as it did before.
+
+Run from the repository root with the package importable::
+
+    PYTHONPATH=src python benchmarks/bench_outcome_request_parse.py
+"""
+from __future__ import print_function
+
+import timeit
+
+from lxml import objectify
+
+from lti import OutcomeRequest
+from lti.outcome_request import DELETE_REQUEST, READ_REQUEST, REPLACE_REQUEST
+
+NUMBER = 20000
+
+
+def objectify_process_xml(request, xml):
+    root = objectify.fromstring(xml)
+    request.message_identifier = str(
+        root.imsx_POXHeader.imsx_POXRequestHeaderInfo.imsx_messageIdentifier)
+    try:
+        result = root.imsx_POXBody.replaceResultRequest
+        request.operation = REPLACE_REQUEST
+        request.lis_result_sourcedid = \
+            result.resultRecord.sourcedGUID.sourcedId
+        request.score = str(
+            result.resultRecord.result.resultScore.textString)
+    except:
+        pass
+    try:
+        result = root.imsx_POXBody.deleteResultRequest
+        request.operation = DELETE_REQUEST
+        request.lis_result_sourcedid = \
+            result.resultRecord.sourcedGUID.sourcedId
+    except:
+        pass
+    try:
+        result = root.imsx_POXBody.readResultRequest
+        request.operation = READ_REQUEST
+        request.lis_result_sourcedid = \
+            result.resultRecord.sourcedGUID.sourcedId
+    except:
+        pass
+
+
+def report(name, seconds):
+    print('{:<40} {:>8.2f} us/message {:>10.0f} messages/s'.format(
+        name, seconds / NUMBER * 1e6, NUMBER / seconds))
+
+
+def main():
+    messages = []
+    for operation in (REPLACE_REQUEST, READ_REQUEST, DELETE_REQUEST):
+        messages.append((operation, OutcomeRequest({
+            'operation': operation, 'score': 0.85,
+            'message_identifier': '1313355158804',
+            'lis_result_sourcedid': '261-154-728-17-784',
+        }).generate_request_xml()))
+    for name, xml in messages:
+        request = OutcomeRequest()
+        report(name + ', objectify', min(timeit.repeat(
+            lambda: objectify_process_xml(request, xml),
+            number=NUMBER, repeat=3)))
+        report(name + ', process_xml', min(timeit.repeat(
+            lambda: request.process_xml(xml), number=NUMBER, repeat=3)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Cost of parsing the responses of an LMS to outcome requests, as a tool
+provider does after every post, with the single pass of process_xml and
+with lxml.objectify, as it did before.
+
+Run from the repository root with the package importable::
+
+    PYTHONPATH=src python benchmarks/bench_outcome_response_parse.py
+"""
+from __future__ import print_function
+
+import timeit
+
+from lxml import objectify
+
+from lti import OutcomeResponse
+
+NUMBER = 20000
+
+RESPONSE_XML = b'''<?xml version="1.0" encoding="UTF-8"?>
+<imsx_POXEnvelopeResponse xmlns="http://www.imsglobal.org/services/ltiv1p1/xsd/imsoms_v1p0">
+  <imsx_POXHeader>
+    <imsx_POXResponseHeaderInfo>
+      <imsx_version>V1.0</imsx_version>
+      <imsx_messageIdentifier>4560</imsx_messageIdentifier>
+      <imsx_statusInfo>
+        <imsx_codeMajor>success</imsx_codeMajor>
+        <imsx_severity>status</imsx_severity>
+        <imsx_description>Score for 3124567 is now 0.92</imsx_description>
+        <imsx_messageRefIdentifier>999999123</imsx_messageRefIdentifier>
+        <imsx_operationRefIdentifier>replaceResult</imsx_operationRefIdentifier>
+      </imsx_statusInfo>
+    </imsx_POXResponseHeaderInfo>
+  </imsx_POXHeader>
+  <imsx_POXBody>
+    <replaceResultResponse/>
+  </imsx_POXBody>
+</imsx_POXEnvelopeResponse>
+'''
+
+READ_XML = RESPONSE_XML.replace(
+    b'<replaceResultResponse/>',
+    b'''<readResultResponse>
+      <result>
+        <resultScore>
+          <language>en</language>
+          <textString>0.91</textString>
+        </resultScore>
+      </result>
+    </readResultResponse>''').replace(
+    b'>replaceResult<', b'>readResult<')
+
+FAILURE_XML = RESPONSE_XML.replace(b'>success<', b'>failure<').replace(
+    b'>status<', b'>error<')
+
+
+def objectify_process_xml(response, xml):
+    try:
+        root = objectify.fromstring(xml)
+        header_info = root.imsx_POXHeader.imsx_POXResponseHeaderInfo
+        response.message_identifier = header_info.imsx_messageIdentifier
+        status_node = header_info.imsx_statusInfo
+        response.code_major = status_node.imsx_codeMajor
+        response.severity = status_node.imsx_severity
+        response.description = status_node.imsx_description
+        response.message_ref_identifier = str(
+            status_node.imsx_messageRefIdentifier)
+        response.operation = status_node.imsx_operationRefIdentifier
+        try:
+            response.score = str(root.imsx_POXBody.readResultResponse.
+                                 result.resultScore.textString)
+        except AttributeError:
+            pass
+    except:
+        pass
+
+
+def report(name, seconds):
+    print('{:<40} {:>8.2f} us/message {:>10.0f} messages/s'.format(
+        name, seconds / NUMBER * 1e6, NUMBER / seconds))
+
+
+def main():
+    for name, xml in (('replaceResult success', RESPONSE_XML),
+                      ('readResult success', READ_XML),
+                      ('replaceResult failure', FAILURE_XML)):
+        response = OutcomeResponse()
+        report(name + ', objectify', min(timeit.repeat(
+            lambda: objectify_process_xml(response, xml),
+            number=NUMBER, repeat=3)))
+        report(name + ', process_xml', min(timeit.repeat(
+            lambda: response.process_xml(xml), number=NUMBER, repeat=3)))
+
+
+if __name__ == '__main__':
+    main()
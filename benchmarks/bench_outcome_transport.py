@@ -0,0 +1,49 @@
+"""
+Latency of posting grades with a new connection each time and with a
+SessionTransport, against a stub LMS on localhost. Over TLS to a remote
+LMS, the handshakes the session saves cost far more.
+
+Run from the repository root with the package importable::
+
+    PYTHONPATH=src python benchmarks/bench_outcome_transport.py
+"""
+from __future__ import print_function
+
+import time
+
+from lti import OutcomeRequest
+from lti.transport import OutcomeTransport, SessionTransport
+
+from stub_lms import StubLMS
+
+NUMBER = 500
+
+
+def bench(name, url, transport):
+    start = time.time()
+    for i in range(NUMBER):
+        request = OutcomeRequest({
+            'consumer_key': 'consumer',
+            'consumer_secret': 'secret',
+            'lis_outcome_service_url': url,
+            'lis_result_sourcedid': str(i),
+            'transport': transport,
+        })
+        assert request.post_replace_result(0.5).is_success()
+    print('{:<40} {:>8.2f} ms/grade'.format(
+        name, (time.time() - start) / NUMBER * 1000))
+
+
+def main():
+    lms = StubLMS()
+    try:
+        bench('new connection per grade', lms.url, OutcomeTransport())
+        transport = SessionTransport()
+        bench('SessionTransport', lms.url, transport)
+        transport.close()
+    finally:
+        lms.stop()
+
+
+if __name__ == '__main__':
+    main()
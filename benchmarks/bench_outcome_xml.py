@@ -0,0 +1,54 @@
+"""
+Cost of generating the XML of outcome requests by filling in a template
+and by building and serializing an lxml tree, as generate_request_xml did
+before.
+
+Run from the repository root with the package importable::
+
+    PYTHONPATH=src python benchmarks/bench_outcome_xml.py
+"""
+from __future__ import print_function
+
+import timeit
+
+from lti import OutcomeRequest
+from lti.outcome_request import DELETE_REQUEST, READ_REQUEST, REPLACE_REQUEST
+
+NUMBER = 20000
+
+
+def report(name, seconds):
+    print('{:<40} {:>8.2f} us/message {:>10.0f} messages/s'.format(
+        name, seconds / NUMBER * 1e6, NUMBER / seconds))
+
+
+def main():
+    requests = [
+        ('replaceResult', OutcomeRequest({
+            'operation': REPLACE_REQUEST, 'score': 0.85,
+            'message_identifier': '1313355158804',
+            'lis_result_sourcedid': '261-154-728-17-784'})),
+        ('replaceResult with resultData', OutcomeRequest({
+            'operation': REPLACE_REQUEST, 'score': 0.85,
+            'result_data': {'text': 'Well done & thanks'},
+            'message_identifier': '1313355158804',
+            'lis_result_sourcedid': '261-154-728-17-784'})),
+        ('readResult', OutcomeRequest({
+            'operation': READ_REQUEST,
+            'message_identifier': '1313355158804',
+            'lis_result_sourcedid': '261-154-728-17-784'})),
+        ('deleteResult', OutcomeRequest({
+            'operation': DELETE_REQUEST,
+            'message_identifier': '1313355158804',
+            'lis_result_sourcedid': '261-154-728-17-784'})),
+    ]
+    for name, request in requests:
+        assert request.generate_request_xml() == request._tree_request_xml()
+        report(name + ', lxml tree', min(timeit.repeat(
+            request._tree_request_xml, number=NUMBER, repeat=3)))
+        report(name + ', template', min(timeit.repeat(
+            request.generate_request_xml, number=NUMBER, repeat=3)))
+
+
+if __name__ == '__main__':
+    main()
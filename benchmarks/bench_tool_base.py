@@ -0,0 +1,79 @@
+"""
+Micro benchmarks for ToolBase attribute access.
+
+Run from the repository root with the package importable::
+
+    PYTHONPATH=src python benchmarks/bench_tool_base.py
+"""
+from __future__ import print_function
+
+import timeit
+
+from lti import LaunchParams, ToolBase
+from lti.launch_params import valid_param
+
+NUMBER = 200000
+
+
+class Plain(object):
+
+    def __init__(self):
+        self.user_id = 'user'
+
+
+class LegacyToolBase(object):
+    """
+    Routes every attribute through __getattr__/__setattr__, as ToolBase
+    used to.
+    """
+
+    def __init__(self, consumer_key, consumer_secret, params):
+        self.consumer_key = consumer_key
+        self.consumer_secret = consumer_secret
+        self.launch_params = LaunchParams(params)
+
+    def __getattr__(self, attr):
+        if not valid_param(attr):
+            raise AttributeError(attr)
+        try:
+            return self.launch_params[attr]
+        except KeyError:
+            return None
+
+    def __setattr__(self, key, value):
+        if valid_param(key):
+            self.launch_params[key] = value
+        else:
+            self.__dict__[key] = value
+
+
+def report(name, seconds):
+    print('{:<40} {:>8.0f} ns'.format(name, seconds / NUMBER * 1e9))
+
+
+def bench_attributes():
+    params = {'user_id': 'user', 'custom_chapter': '12'}
+    plain = Plain()
+    report('plain attribute read', timeit.timeit(
+        lambda: plain.user_id, number=NUMBER))
+    writes = {}
+    for name, tool in [('legacy', LegacyToolBase('key', 'secret', params)),
+                       ('descriptor', ToolBase('key', 'secret', params))]:
+        report(name + ' spec param read', timeit.timeit(
+            lambda: tool.user_id, number=NUMBER))
+        report(name + ' custom param read', timeit.timeit(
+            lambda: tool.custom_chapter, number=NUMBER))
+        writes[name] = min(timeit.repeat(
+            lambda: setattr(tool, 'outcome_requests', None),
+            number=NUMBER, repeat=3))
+        report(name + ' instance attribute write', writes[name])
+    assert writes['descriptor'] <= writes['legacy'], \
+        'instance attribute writes are slower than before'
+
+
+def main():
+    bench_attributes()
+
+
+if __name__ == '__main__':
+    main()
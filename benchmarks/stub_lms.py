@@ -0,0 +1,66 @@
+"""
+A stub LMS on localhost for the outcome benchmarks, which answers every
+outcome request with success after ``latency`` seconds and counts them in
+``posts``.
+"""
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+RESPONSE = (b'<?xml version="1.0" encoding="UTF-8"?>'
+            b'<imsx_POXEnvelopeResponse xmlns="http://www.imsglobal.org/'
+            b'services/ltiv1p1/xsd/imsoms_v1p0"><imsx_POXHeader>'
+            b'<imsx_POXResponseHeaderInfo><imsx_version>V1.0</imsx_version>'
+            b'<imsx_messageIdentifier>1</imsx_messageIdentifier>'
+            b'<imsx_statusInfo><imsx_codeMajor>success</imsx_codeMajor>'
+            b'<imsx_severity>status</imsx_severity>'
+            b'</imsx_statusInfo></imsx_POXResponseHeaderInfo>'
+            b'</imsx_POXHeader><imsx_POXBody><replaceResultResponse/>'
+            b'</imsx_POXBody></imsx_POXEnvelopeResponse>')
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # as production servers do on keep-alive connections
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        with self.server.lock:
+            self.server.posts += 1
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/xml')
+        self.send_header('Content-Length', str(len(RESPONSE)))
+        self.end_headers()
+        self.wfile.write(RESPONSE)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubLMS(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency=0):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), Handler)
+        self.latency = latency
+        self.posts = 0
+        self.lock = threading.Lock()
+        self.url = 'http://127.0.0.1:{0}/service'.format(
+            self.server_address[1])
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -1,15 +1,21 @@
 DEFAULT_LTI_VERSION = 'LTI-1.0'
 
 # Classes
-from .launch_params import LaunchParams
+from .launch_params import LaunchParams, LaunchParamSchema, LazyLaunchParams
+from .roles import RoleSet
 from .tool_base import ToolBase
 from .tool_config import ToolConfig
 from .tool_consumer import ToolConsumer
 from .tool_provider import ToolProvider
+from .launch_verifier import LaunchVerifier
+from .hmac_verifier import HMACLaunchVerifier
+from .launch_pipeline import StagedLaunchVerifier
+from .consumer_registry import ConsumerRegistry
 from .outcome_request import OutcomeRequest
 from .outcome_response import OutcomeResponse
 from .contentitem_response import ContentItemResponse
 from .tool_proxy import ToolProxy
 
 # Exceptions
-from .utils import InvalidLTIConfigError, InvalidLTIRequestError
+from .utils import (InvalidLTIConfigError, InvalidLTIRequestError,
+                    InvalidOutcomeRequestError)
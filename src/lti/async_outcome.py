@@ -0,0 +1,200 @@
+'''
+Grade passback for asyncio applications. Requires Python 3.5 or later.
+'''
+import asyncio
+import functools
+
+from .outcome_request import DELETE_REQUEST, READ_REQUEST
+from .outcome_response import OutcomeResponse
+from .transport import SessionTransport, _host
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+def _native_headers(headers):
+    # requests-oauthlib leaves some values as bytes, which aiohttp refuses
+    return dict((name, value.decode('utf-8')
+                 if isinstance(value, bytes) else value)
+                for name, value in headers.items())
+
+
+class PostResponse(object):
+    '''
+    The parts of an HTTP response that OutcomeResponse reads.
+    '''
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+
+class AiohttpTransport(object):
+    '''
+    Posts outcome requests with an ``aiohttp.ClientSession``, which keeps
+    connections to each host open between requests. Requires aiohttp.
+
+    ``timeout`` is the total number of seconds a request may take, and at
+    most ``limit`` connections are open at once.
+    '''
+
+    def __init__(self, timeout=30, limit=100):
+        if aiohttp is None:
+            raise RuntimeError('AiohttpTransport requires aiohttp')
+        self.timeout = timeout
+        self.limit = limit
+        self._session = None
+
+    def create_session(self):
+        return aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.limit),
+            timeout=aiohttp.ClientTimeout(total=self.timeout))
+
+    async def post(self, url, data=None, headers=None):
+        if self._session is None:
+            self._session = self.create_session()
+        async with self._session.post(url, data=data,
+                                      headers=headers) as response:
+            content = await response.read()
+            return PostResponse(response.status, response.headers, content)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class ExecutorTransport(object):
+    '''
+    Runs a blocking OutcomeTransport, a SessionTransport by default, in an
+    executor, for when aiohttp is not installed. Requests are only as
+    concurrent as the executor has threads.
+    '''
+
+    def __init__(self, transport=None, executor=None):
+        if transport is None:
+            transport = SessionTransport()
+        self.transport = transport
+        self.executor = executor
+
+    async def post(self, url, data=None, headers=None):
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            self.executor,
+            functools.partial(self.transport.post, url, data=data,
+                              headers=headers))
+
+    async def close(self):
+        self.transport.close()
+
+
+class AsyncOutcomeClient(object):
+    '''
+    Posts OutcomeRequests from a coroutine, many at a time.
+
+    The request XML and its OAuth signature are exactly those of
+    ``OutcomeRequest.post_outcome_request``. At most ``per_host`` requests
+    are in flight to each outcome service host at once; the rest wait
+    their turn, and are signed when it comes. Requests are sent through
+    ``transport``, an AiohttpTransport by default. A ``rate_limiter``, a
+    RateLimiter that may be shared with blocking code, spaces them out
+    further; an OutcomeRequest's own rate_limiter takes precedence. The
+    OutcomeRequest's outcome_cache is used as by the blocking methods.
+
+    Like the blocking methods, each returns the OutcomeResponse and stores
+    it on the OutcomeRequest. Use one client per event loop.
+    '''
+
+    def __init__(self, transport=None, per_host=10, rate_limiter=None):
+        if transport is None:
+            transport = AiohttpTransport()
+        self.transport = transport
+        self.per_host = per_host
+        self.rate_limiter = rate_limiter
+        self._semaphores = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _semaphore(self, url):
+        key = _host(url)
+        semaphore = self._semaphores.get(key)
+        if semaphore is None:
+            semaphore = self._semaphores[key] = asyncio.Semaphore(
+                self.per_host)
+        return semaphore
+
+    async def post_outcome_request(self, outcome_request, **kwargs):
+        '''
+        POST an OutcomeRequest whose operation is already set.
+        '''
+        cache = outcome_request.outcome_cache
+        if cache is not None:
+            outcome_response = cache.lookup(outcome_request)
+            if outcome_response is not None:
+                outcome_request.outcome_response = outcome_response
+                return outcome_response
+        url = outcome_request.lis_outcome_service_url
+        rate_limiter = outcome_request.rate_limiter or self.rate_limiter
+        async with self._semaphore(url):
+            if rate_limiter is not None:
+                wait = rate_limiter.reserve(url, outcome_request.consumer_key)
+                if wait:
+                    await asyncio.sleep(wait)
+            prepared = outcome_request.prepare_outcome_request(**kwargs)
+            response = await self.transport.post(
+                prepared.url, data=prepared.body,
+                headers=_native_headers(prepared.headers))
+        outcome_response = OutcomeResponse.from_post_response(
+            response, response.content)
+        if cache is not None:
+            cache.store(outcome_request, outcome_response)
+        outcome_request.outcome_response = outcome_response
+        return outcome_response
+
+    async def post_replace_result(self, outcome_request, score,
+                                  result_data=None):
+        '''
+        POST the given score with a replaceResult. result_data is as for
+        ``OutcomeRequest.post_replace_result``.
+        '''
+        outcome_request._set_replace_result(score, result_data)
+        return await self.post_outcome_request(outcome_request)
+
+    async def post_delete_result(self, outcome_request):
+        '''
+        POST a deleteResult.
+        '''
+        outcome_request.operation = DELETE_REQUEST
+        return await self.post_outcome_request(outcome_request)
+
+    async def post_read_result(self, outcome_request):
+        '''
+        POST a readResult.
+        '''
+        outcome_request.operation = READ_REQUEST
+        return await self.post_outcome_request(outcome_request)
+
+    async def post_many(self, outcome_requests, return_exceptions=False):
+        '''
+        POST OutcomeRequests whose operations are already set, concurrently,
+        returning their OutcomeResponses in the same order. With
+        ``return_exceptions``, a request that fails gives its exception
+        instead of stopping the others.
+        '''
+        return await asyncio.gather(
+            *[self.post_outcome_request(request)
+              for request in outcome_requests],
+            return_exceptions=return_exceptions)
+
+    async def close(self):
+        '''
+        Close the transport's connections.
+        '''
+        await self.transport.close()
@@ -0,0 +1,154 @@
+'''
+Launch verification for asyncio applications. Requires Python 3.5 or later.
+'''
+import asyncio
+import inspect
+import weakref
+
+from oauthlib.oauth1.rfc5849 import errors
+
+from .hmac_verifier import HMACLaunchVerifier
+from .launch_verifier import (REJECTED, REPLAYED_NONCE, LaunchVerifier,
+                              VerificationResult)
+from .utils import InvalidLTIConfigError
+
+
+async def _resolve(value):
+    if inspect.isawaitable(value):
+        return await value
+    return value
+
+
+class AsyncLaunchVerifier(HMACLaunchVerifier):
+    '''
+    An HMACLaunchVerifier whose ``verify_async`` coroutine awaits the
+    validator's ``validate_timestamp_and_nonce``, ``validate_client_key``,
+    ``get_client_secret``, ``get_client_secrets`` and
+    ``client_secret_matched`` when they are coroutines, so that they may
+    look up nonces and secrets asynchronously. Plain methods work too.
+
+    Only computing the signature runs inline, on the event loop. The checks
+    are those of ``verify``, in the same order, and RSA and PLAINTEXT
+    signatures are still checked by oauthlib, with the secret already
+    fetched.
+    '''
+
+    async def verify_async(self, tool_provider):
+        '''
+        Verify a ToolProvider's launch, returning a VerificationResult.
+        '''
+        request = self._launch_request(tool_provider)
+        if request is None:
+            try:
+                request = self.endpoint._create_request(
+                    tool_provider.launch_url, 'POST',
+                    tool_provider.to_params(), tool_provider.launch_headers)
+            except errors.OAuth1Error:
+                return VerificationResult(
+                    False, consumer_key=tool_provider.launch_params.get(
+                        'oauth_consumer_key'), reason=REJECTED)
+
+        validator = self.validator
+        client_key = request.client_key
+        reason = self._check_oauth_params(request) or \
+            self._check_timestamp(request)
+        if reason is None and not await _resolve(
+                validator.validate_timestamp_and_nonce(
+                    client_key, request.timestamp, request.nonce, request)):
+            reason = REPLAYED_NONCE
+        if reason is not None:
+            return VerificationResult(False, consumer_key=client_key,
+                                      request=request, reason=reason)
+
+        valid_client = await _resolve(
+            validator.validate_client_key(client_key, request))
+        if not valid_client:
+            request.client_key = validator.dummy_client
+        secret = await _resolve(
+            validator.get_client_secret(request.client_key, request))
+        valid_signature = self._signature_matches(request, secret)
+        if valid_client and not valid_signature and \
+                hasattr(validator, 'get_client_secrets'):
+            others = await _resolve(
+                validator.get_client_secrets(client_key, request))
+            for other in others:
+                if other != secret and self._signature_matches(
+                        request, other):
+                    secret = other
+                    valid_signature = True
+                    break
+        if valid_client and valid_signature and \
+                hasattr(validator, 'client_secret_matched'):
+            await _resolve(validator.client_secret_matched(client_key, secret))
+        request.client_key = client_key
+
+        request.validator_log['client'] = valid_client
+        request.validator_log['signature'] = valid_signature
+        valid = valid_client and valid_signature
+        return VerificationResult(
+            valid, consumer_key=client_key, consumer_secret=secret,
+            request=request, reason=self._reason(valid, request))
+
+
+# the AsyncLaunchVerifier made for each LaunchVerifier, such as the verifier
+# of a ConsumerRegistry, so that oauthlib is only set up once for each
+_async_verifiers = weakref.WeakKeyDictionary()
+
+
+# the verify methods that verify_async does the same checks as
+_PLAIN_VERIFY = (LaunchVerifier.verify, HMACLaunchVerifier.verify)
+
+
+def _async_verifier(launch_verifier):
+    verifier = _async_verifiers.get(launch_verifier)
+    if verifier is None:
+        verifier = _async_verifiers[launch_verifier] = AsyncLaunchVerifier(
+            launch_verifier.validator)
+    return verifier
+
+
+async def verify_launch_async(tool_provider, validator=None):
+    '''
+    The coroutine version of ``ToolProvider.verify_launch``.
+
+    Pass a long-lived AsyncLaunchVerifier. A LaunchVerifier, or the verifier
+    of the ``consumer_registry``, gets an AsyncLaunchVerifier that is kept
+    for the next launches, but like ``verify_launch``, a plain validator is
+    wrapped anew for every launch.
+
+    A verifier with checks of its own, such as a StagedLaunchVerifier, has
+    no coroutine version, so its ``verify`` is run in the default executor
+    of the event loop instead, with its validator called from that thread.
+    '''
+    if validator is None:
+        if tool_provider.consumer_registry is None:
+            raise InvalidLTIConfigError(
+                'is_valid_request needs a validator or consumer_registry')
+        validator = tool_provider.consumer_registry.verifier
+    if isinstance(validator, AsyncLaunchVerifier):
+        result = await validator.verify_async(tool_provider)
+    elif isinstance(validator, LaunchVerifier) and \
+            type(validator).verify not in _PLAIN_VERIFY:
+        result = await asyncio.get_event_loop().run_in_executor(
+            None, validator.verify, tool_provider)
+    elif isinstance(validator, LaunchVerifier):
+        result = await _async_verifier(validator).verify_async(tool_provider)
+    else:
+        result = await AsyncLaunchVerifier(validator).verify_async(
+            tool_provider)
+
+    if result.valid and not tool_provider.consumer_key and \
+            not tool_provider.consumer_secret:
+        # Gather the key and secret
+        tool_provider.consumer_key = \
+            tool_provider.launch_params['oauth_consumer_key']
+        tool_provider.consumer_secret = result.consumer_secret
+
+    return result
+
+
+async def is_valid_request_async(tool_provider, validator=None):
+    '''
+    The coroutine version of ``ToolProvider.is_valid_request``.
+    '''
+    return (await verify_launch_async(tool_provider, validator)).valid
@@ -0,0 +1,153 @@
+import itertools
+import multiprocessing
+import pickle
+import time
+from collections import deque
+
+try:
+    from concurrent.futures import ProcessPoolExecutor
+except ImportError:
+    # Python 2 without the futures backport
+    ProcessPoolExecutor = None
+
+from .launch_params import InvalidLaunchParamError
+from .launch_verifier import (MISSING_OAUTH_PARAMS, REJECTED, VERIFIER_ERROR,
+                              LaunchVerifier, VerificationResult)
+from .tool_provider import ToolProvider
+from .utils import InvalidLTIRequestError
+
+# the verifier of each worker process, set up by _setup_worker
+_worker = {}
+
+
+class BatchStats(object):
+    '''
+    Progress of a verify_many run.
+    '''
+
+    def __init__(self):
+        self.started = time.time()
+        self.verified = 0
+        self.valid = 0
+
+    @property
+    def seconds(self):
+        return time.time() - self.started
+
+    @property
+    def per_second(self):
+        seconds = self.seconds
+        return self.verified / seconds if seconds else 0.0
+
+
+def _setup_worker(setup):
+    # setup is the pickled validator and ToolProvider class, sent along
+    # with every chunk but only unpickled once per worker
+    if _worker.get('setup') != setup:
+        validator, tool_provider_class = pickle.loads(setup)
+        if not isinstance(validator, LaunchVerifier):
+            validator = LaunchVerifier(validator)
+        _worker['setup'] = setup
+        _worker['verifier'] = validator
+        _worker['tool_provider_class'] = tool_provider_class
+
+
+def _verify_one(verifier, tool_provider_class, launch):
+    params, url, headers = launch
+    try:
+        tool_provider = tool_provider_class.from_unpacked_request(
+            None, params, url, headers)
+        result = verifier.verify(tool_provider)
+    except InvalidLTIRequestError:
+        return VerificationResult(False, reason=MISSING_OAUTH_PARAMS)
+    except InvalidLaunchParamError:
+        return VerificationResult(False, reason=REJECTED)
+    except Exception as e:
+        return _failed(e)
+    # the oauthlib request is neither needed nor cheap to send back
+    result.request = None
+    return result
+
+
+def _failed(error):
+    # an error of the validator, such as from its nonce store, fails only
+    # its own launch, and is sent back from the worker, so it must pickle
+    try:
+        pickle.loads(pickle.dumps(error, pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        error = RuntimeError(repr(error))
+    return VerificationResult(False, reason=VERIFIER_ERROR, error=error)
+
+
+def _verify_chunk(setup, chunk):
+    _setup_worker(setup)
+    verifier = _worker['verifier']
+    tool_provider_class = _worker['tool_provider_class']
+    return [_verify_one(verifier, tool_provider_class, launch)
+            for launch in chunk]
+
+
+def _as_launch(launch):
+    if isinstance(launch, ToolProvider):
+        return (dict(launch.to_params()), launch.launch_url,
+                dict(launch.launch_headers))
+    return launch
+
+
+def verify_many(launches, validator, workers=None, chunksize=256,
+                tool_provider_class=ToolProvider, progress=None):
+    '''
+    Verify many recorded launches across a pool of worker processes,
+    yielding a VerificationResult for each, in order, as they complete.
+
+    Each launch is a ``(params, url, headers)`` tuple as taken by
+    ``ToolProvider.from_unpacked_request``, where params may be the raw
+    request body, or a ToolProvider. The validator, a RequestValidator or
+    LaunchVerifier, is pickled to every worker, whose copies do not share
+    state. When replaying old launches it has to accept their timestamps
+    and nonces. An exception raised while verifying a launch, such as a
+    database error in the validator, does not stop the batch: that
+    launch fails with the reason ``VERIFIER_ERROR`` and the exception as
+    its ``error``.
+
+    Launches are sent to the workers ``chunksize`` at a time, with only a
+    few chunks per worker in flight, so ``launches`` may be a generator
+    over any number of them. ``progress`` is called with the BatchStats
+    after each chunk. With ``workers=1`` everything runs in this process.
+    '''
+    workers = workers or multiprocessing.cpu_count()
+    if workers > 1 and ProcessPoolExecutor is None:
+        raise RuntimeError('verify_many needs concurrent.futures for workers')
+    setup = pickle.dumps((validator, tool_provider_class),
+                         pickle.HIGHEST_PROTOCOL)
+    stats = BatchStats()
+    launches = iter(launches)
+    chunks = iter(lambda: [_as_launch(launch) for launch in
+                           itertools.islice(launches, chunksize)], [])
+
+    def done(results):
+        stats.verified += len(results)
+        stats.valid += sum(1 for result in results if result.valid)
+        if progress is not None:
+            progress(stats)
+        return results
+
+    if workers == 1:
+        try:
+            for chunk in chunks:
+                for result in done(_verify_chunk(setup, chunk)):
+                    yield result
+        finally:
+            _worker.clear()
+        return
+
+    with ProcessPoolExecutor(workers) as pool:
+        pending = deque()
+        for chunk in itertools.islice(chunks, 2 * workers):
+            pending.append(pool.submit(_verify_chunk, setup, chunk))
+        while pending:
+            results = pending.popleft().result()
+            for chunk in itertools.islice(chunks, 1):
+                pending.append(pool.submit(_verify_chunk, setup, chunk))
+            for result in done(results):
+                yield result
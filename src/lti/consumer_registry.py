@@ -0,0 +1,244 @@
+import json
+import os
+import threading
+import time
+
+from oauthlib.oauth1 import RequestValidator
+
+from .launch_verifier import LaunchVerifier
+from .nonce_store import NonceValidatorMixin
+from .utils import sqlite_connection
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+
+class ConsumerBackend(object):
+    '''
+    Where a ConsumerRegistry looks up the secrets of a consumer key.
+    '''
+
+    def get_secrets(self, consumer_key):
+        '''
+        Return the active secrets for a consumer key, newest first, or an
+        empty sequence for an unknown key.
+        '''
+        raise NotImplementedError
+
+
+def _as_secrets(value):
+    if value is None:
+        return ()
+    if isinstance(value, (list, tuple)):
+        return tuple(value)
+    return (value,)
+
+
+class DictConsumerBackend(ConsumerBackend):
+    '''
+    Secrets from a mapping of consumer key to a secret or list of secrets.
+    '''
+
+    def __init__(self, consumers):
+        self.consumers = consumers
+
+    def get_secrets(self, consumer_key):
+        return _as_secrets(self.consumers.get(consumer_key))
+
+
+class FileConsumerBackend(ConsumerBackend):
+    '''
+    Secrets from a JSON or YAML file mapping consumer keys to a secret or
+    list of secrets. YAML is used for ``.yaml`` and ``.yml`` files and needs
+    PyYAML to be installed.
+
+    The file is checked for changes at most every ``check_interval``
+    seconds and reloaded when it has been modified. If a reload fails, for
+    example on a half written file, the previous secrets stay in use.
+    '''
+
+    def __init__(self, path, check_interval=1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._mtime = os.stat(path).st_mtime
+        self._next_check = time.time() + check_interval
+        self._consumers = self._load()
+
+    def _load(self):
+        with open(self.path, 'rb') as f:
+            data = f.read().decode('utf-8')
+        if self.path.endswith(('.yaml', '.yml')):
+            if yaml is None:
+                raise RuntimeError('PyYAML is required to read ' + self.path)
+            return yaml.safe_load(data) or {}
+        return json.loads(data)
+
+    def _reload(self):
+        now = time.time()
+        if now < self._next_check:
+            return
+        with self._lock:
+            if now < self._next_check:
+                return
+            self._next_check = now + self.check_interval
+            try:
+                mtime = os.stat(self.path).st_mtime
+                if mtime != self._mtime:
+                    self._consumers = self._load()
+                    self._mtime = mtime
+            except (EnvironmentError, ValueError):
+                pass
+
+    def get_secrets(self, consumer_key):
+        self._reload()
+        return _as_secrets(self._consumers.get(consumer_key))
+
+
+class SQLiteConsumerBackend(ConsumerBackend):
+    '''
+    Secrets from a table in a SQLite database, one row per secret.
+    '''
+
+    def __init__(self, path, table='lti_consumers'):
+        self.path = path
+        self.table = table
+        self._connection = sqlite_connection(path)
+        with self._connection() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS {0} ('
+                'consumer_key TEXT NOT NULL, '
+                'secret TEXT NOT NULL, '
+                'PRIMARY KEY (consumer_key, secret))'.format(table))
+
+    def get_secrets(self, consumer_key):
+        rows = self._connection().execute(
+            'SELECT secret FROM {0} WHERE consumer_key = ? '
+            'ORDER BY rowid DESC'.format(self.table), (consumer_key,))
+        return tuple(row[0] for row in rows)
+
+    def add_secret(self, consumer_key, secret):
+        with self._connection() as connection:
+            connection.execute(
+                'INSERT OR IGNORE INTO {0} (consumer_key, secret) '
+                'VALUES (?, ?)'.format(self.table), (consumer_key, secret))
+
+    def remove_secret(self, consumer_key, secret):
+        with self._connection() as connection:
+            connection.execute(
+                'DELETE FROM {0} WHERE consumer_key = ? AND secret = ?'
+                .format(self.table), (consumer_key, secret))
+
+
+class ConsumerRegistry(object):
+    '''
+    Consumer keys and their secrets, looked up through a ConsumerBackend and
+    cached for ``ttl`` seconds.
+
+    A key may have several active secrets while a secret is being rotated.
+    The registry remembers which one last verified a launch and offers it
+    first, both for verifying launches and for signing outcome requests.
+
+    Set it as the ``consumer_registry`` of a ToolProvider, or pass its
+    ``verifier`` to ``ToolProvider.is_valid_request``. The verifier is an
+    instance of ``verifier_class``.
+    '''
+    verifier_class = LaunchVerifier
+
+    def __init__(self, backend, ttl=60, maxsize=10000):
+        if isinstance(backend, dict):
+            backend = DictConsumerBackend(backend)
+        self.backend = backend
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._cache = dict()
+        self._matched = dict()
+        self._verifier = None
+
+    def secrets(self, consumer_key):
+        '''
+        Return the active secrets for a consumer key, the one that last
+        matched first.
+        '''
+        now = time.time()
+        entry = self._cache.get(consumer_key)
+        if entry is None or entry[0] <= now:
+            if len(self._cache) >= self.maxsize:
+                self._cache.clear()
+            secrets = tuple(self.backend.get_secrets(consumer_key))
+            self._cache[consumer_key] = (now + self.ttl, secrets)
+        else:
+            secrets = entry[1]
+        matched = self._matched.get(consumer_key)
+        if matched is not None and matched != secrets[:1] and \
+                matched[0] in secrets:
+            secrets = matched + tuple(s for s in secrets if s != matched[0])
+        return secrets
+
+    def secret(self, consumer_key):
+        '''
+        Return the preferred secret for a consumer key, or None.
+        '''
+        secrets = self.secrets(consumer_key)
+        return secrets[0] if secrets else None
+
+    def record_match(self, consumer_key, secret):
+        '''
+        Remember the secret that verified a launch from a consumer key.
+        '''
+        self._matched[consumer_key] = (secret,)
+
+    def invalidate(self, consumer_key=None):
+        '''
+        Drop cached secrets, for one consumer key or for all of them.
+        '''
+        if consumer_key is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(consumer_key, None)
+
+    def __contains__(self, consumer_key):
+        return bool(self.secrets(consumer_key))
+
+    @property
+    def verifier(self):
+        '''
+        A shared LaunchVerifier checking launches against this registry.
+        '''
+        if self._verifier is None:
+            self._verifier = self.verifier_class(
+                ConsumerRegistryValidator(self))
+        return self._verifier
+
+
+class ConsumerRegistryValidator(NonceValidatorMixin, RequestValidator):
+    '''
+    An oauthlib RequestValidator backed by a ConsumerRegistry, with replay
+    protection from a NonceStore.
+    '''
+    dummy_client = u'lti_unknown_consumer_key'
+    dummy_secret = u'lti_unknown_consumer_secret'
+
+    def __init__(self, registry, nonce_store=None):
+        super(ConsumerRegistryValidator, self).__init__()
+        self.registry = registry
+        if nonce_store is not None:
+            self.nonce_store = nonce_store
+
+    def check_client_key(self, client_key):
+        # the registry decides which keys exist, whatever their format
+        return bool(client_key)
+
+    def validate_client_key(self, client_key, request):
+        return client_key in self.registry
+
+    def get_client_secret(self, client_key, request):
+        return self.registry.secret(client_key) or self.dummy_secret
+
+    def get_client_secrets(self, client_key, request):
+        return self.registry.secrets(client_key)
+
+    def client_secret_matched(self, client_key, secret):
+        self.registry.record_match(client_key, secret)
@@ -0,0 +1,244 @@
+import binascii
+import hashlib
+import hmac
+import re
+import time
+
+from oauthlib.common import urldecode
+from oauthlib.oauth1.rfc5849 import CONTENT_TYPE_FORM_URLENCODED
+from oauthlib.oauth1.rfc5849.signature import base_string_uri
+from requests.structures import CaseInsensitiveDict
+
+from .launch_verifier import (INSECURE_TRANSPORT, INVALID_OAUTH_PARAMS,
+                              MISSING_OAUTH_PARAMS, REPLAYED_NONCE,
+                              TIMESTAMP_OUT_OF_WINDOW, LaunchVerifier,
+                              VerificationResult)
+from .utils import lru_cache
+
+try:
+    from urllib.parse import quote, unquote
+except ImportError:
+    # Python 2
+    from urllib import quote, unquote
+
+DIGESTS = {
+    'HMAC-SHA1': hashlib.sha1,
+    'HMAC-SHA256': hashlib.sha256,
+    'HMAC-SHA512': hashlib.sha512,
+}
+
+_UNRESERVED = re.compile(u'[A-Za-z0-9._~-]*\\Z')
+
+
+def escape(value):
+    '''
+    Percent-encode a value as RFC 5849 section 3.6 requires. Values made
+    only of unreserved characters, as most launch values are, are returned
+    as they are.
+    '''
+    if _UNRESERVED.match(value):
+        return value
+    escaped = quote(value.encode('utf-8'), safe=b'~')
+    if isinstance(escaped, bytes):
+        # Python 2
+        escaped = escaped.decode('ascii')
+    return escaped
+
+
+@lru_cache(maxsize=256)
+def _uri_parts(url):
+    # The base string URI and query parameters of a launch URL, which are
+    # the same for every launch to it.
+    return escape(base_string_uri(url)), tuple(urldecode(url.partition(
+        '?')[2].partition('#')[0]))
+
+
+@lru_cache(maxsize=1024)
+def _keyed_hmac(secret, signature_method):
+    # Keying HMAC hashes the key and sets up both pads. Doing that once per
+    # secret leaves only a copy() for each launch.
+    key = escape(secret or u'') + u'&'
+    return hmac.new(key.encode('utf-8'), digestmod=DIGESTS[signature_method])
+
+
+class LaunchRequest(object):
+    '''
+    Stands in for the oauthlib Request passed to RequestValidator methods
+    by the HMACLaunchVerifier.
+    '''
+
+    def __init__(self, uri, escaped_uri, params, oauth_params):
+        self.uri = uri
+        self.escaped_uri = escaped_uri
+        self.http_method = 'POST'
+        self.params = params
+        self.oauth_params = oauth_params
+        self.signature = oauth_params.get('oauth_signature')
+        self.client_key = oauth_params.get('oauth_consumer_key')
+        self.nonce = oauth_params.get('oauth_nonce')
+        self.timestamp = oauth_params.get('oauth_timestamp')
+        self.signature_method = oauth_params.get('oauth_signature_method')
+        self.resource_owner_key = None
+        self.validator_log = {}
+        # the signature base string, once built
+        self.message = None
+
+
+class HMACLaunchVerifier(LaunchVerifier):
+    '''
+    A LaunchVerifier that checks HMAC signed launches itself instead of
+    through oauthlib.
+
+    It performs the checks of oauthlib's SignatureOnlyEndpoint in the same
+    order, against the same RequestValidator, but builds the signature base
+    string directly from the launch parameters and reuses a keyed HMAC for
+    each consumer secret. Launches it does not handle, signed with RSA or
+    PLAINTEXT, carrying an Authorization header or an oauth_token, are
+    passed on to oauthlib.
+    '''
+
+    def verify(self, tool_provider):
+        request = self._launch_request(tool_provider)
+        if request is None:
+            return super(HMACLaunchVerifier, self).verify(tool_provider)
+
+        validator = self.validator
+        reason = self._check_oauth_params(request) or \
+            self._check_timestamp(request)
+        if reason is None and not validator.validate_timestamp_and_nonce(
+                request.client_key, request.timestamp, request.nonce,
+                request):
+            reason = REPLAYED_NONCE
+        if reason is not None:
+            return VerificationResult(
+                False, consumer_key=request.client_key, request=request,
+                reason=reason)
+
+        client_key = request.client_key
+        valid_client = validator.validate_client_key(client_key, request)
+        if not valid_client:
+            request.client_key = validator.dummy_client
+        valid_signature, secret = self._verify_signature(request, valid_client)
+        request.client_key = client_key
+
+        request.validator_log['client'] = valid_client
+        request.validator_log['signature'] = valid_signature
+        return VerificationResult(
+            valid_client and valid_signature, consumer_key=client_key,
+            consumer_secret=secret, request=request,
+            reason=self._reason(valid_client and valid_signature, request))
+
+    def _launch_request(self, tool_provider):
+        # A LaunchRequest for the launch, or None if it is not one the fast
+        # path handles.
+        params = tool_provider.to_params()
+        if params.get('oauth_signature_method') not in DIGESTS or \
+                'oauth_token' in params:
+            return None
+        headers = tool_provider.launch_headers
+        if not isinstance(headers, CaseInsensitiveDict):
+            headers = CaseInsensitiveDict(headers)
+        if 'Authorization' in headers or CONTENT_TYPE_FORM_URLENCODED not in \
+                headers.get('Content-Type', ''):
+            return None
+        url = tool_provider.launch_url
+        try:
+            escaped_uri, query = _uri_parts(url)
+        except ValueError:
+            return None
+        if any(key.startswith('oauth_') for key, _ in query):
+            return None
+
+        oauth_params = {}
+        pairs = list(query)
+        for key, value in params.items():
+            if key.startswith('oauth_'):
+                if u'%' in value:
+                    value = unquote(value)
+                oauth_params[key] = value
+                if key == 'oauth_signature':
+                    continue
+            pairs.append((key, value))
+        return LaunchRequest(url, escaped_uri, pairs, oauth_params)
+
+    def _check_oauth_params(self, request):
+        # oauthlib's checks of the OAuth parameters, bar the timestamp
+        # window, returning the reason for a rejection
+        validator = self.validator
+        if validator.enforce_ssl and \
+                not request.uri.lower().startswith('https://'):
+            return INSECURE_TRANSPORT
+        if not all((request.signature, request.client_key, request.nonce,
+                    request.timestamp, request.signature_method)):
+            return MISSING_OAUTH_PARAMS
+        if request.signature_method not in \
+                validator.allowed_signature_methods or \
+                request.oauth_params.get('oauth_version', '1.0') != '1.0' or \
+                len(request.timestamp) != 10 or \
+                not validator.check_client_key(request.client_key) or \
+                not validator.check_nonce(request.nonce):
+            return INVALID_OAUTH_PARAMS
+        try:
+            int(request.timestamp)
+        except ValueError:
+            return INVALID_OAUTH_PARAMS
+        return None
+
+    def _check_timestamp(self, request):
+        if abs(time.time() - int(request.timestamp)) > \
+                self.validator.timestamp_lifetime:
+            return TIMESTAMP_OUT_OF_WINDOW
+        return None
+
+    def _verify_signature(self, request, valid_client):
+        # Returns whether the signature is valid and the secret it was
+        # checked against, trying every secret of a rotating consumer key.
+        validator = self.validator
+        secret = validator.get_client_secret(request.client_key, request)
+        valid = self._signature_matches(request, secret)
+        if valid_client and not valid and \
+                hasattr(validator, 'get_client_secrets'):
+            for other in validator.get_client_secrets(
+                    request.client_key, request):
+                if other != secret and self._signature_matches(
+                        request, other):
+                    secret = other
+                    valid = True
+                    break
+        if valid_client and valid and \
+                hasattr(validator, 'client_secret_matched'):
+            validator.client_secret_matched(request.client_key, secret)
+        return valid, secret
+
+    def _signature_matches(self, request, secret):
+        if not isinstance(request, LaunchRequest):
+            # signed in a way only oauthlib handles
+            request.lti_candidate_secret = secret
+            return self.endpoint._check_signature(request)
+        if request.message is None:
+            request.message = self.signature_base_string(
+                request.escaped_uri, request.params)
+        return self._check_signature(request.message, secret,
+                                     request.signature_method,
+                                     request.signature)
+
+    @staticmethod
+    def signature_base_string(escaped_uri, pairs):
+        '''
+        Build the signature base string of a POST to a base string URI,
+        already escaped, with the given parameters.
+        '''
+        escaped = sorted((escape(key), escape(value))
+                         for key, value in pairs)
+        # escaping the escaped pairs again only has to encode their '%'
+        normalized = u'%26'.join(
+            key.replace(u'%', u'%25') + u'%3D' + value.replace(u'%', u'%25')
+            for key, value in escaped)
+        return u'POST&' + escaped_uri + u'&' + normalized
+
+    @staticmethod
+    def _check_signature(message, secret, signature_method, signature):
+        mac = _keyed_hmac(secret, signature_method).copy()
+        mac.update(message.encode('utf-8'))
+        expected = binascii.b2a_base64(mac.digest())[:-1]
+        return hmac.compare_digest(expected, signature.encode('utf-8'))
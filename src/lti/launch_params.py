@@ -1,9 +1,15 @@
 import sys
 
 try:
-    from collections.abc import MutableMapping
+    from collections.abc import Mapping, MutableMapping
 except ImportError:
-    from collections import MutableMapping
+    from collections import Mapping, MutableMapping
+
+try:
+    from urllib.parse import unquote_to_bytes, urlencode
+except ImportError:
+    # Python 2
+    from urllib import unquote as unquote_to_bytes, urlencode
 
 from . import DEFAULT_LTI_VERSION
 
@@ -86,6 +92,11 @@ LAUNCH_PARAMS_IS_LIST = [
     'accept_presentation_document_targets'
 ]
 
+LAUNCH_PARAMS_PREFIXES = [
+    'custom_',
+    'ext_'
+]
+
 LAUNCH_PARAMS_CANVAS = [
     'selection_directive',
     'text'
@@ -136,12 +147,59 @@ LAUNCH_PARAMS = (
 )
 
 
+class LaunchParamSchema(object):
+    """
+    A compiled description of which launch params are valid.
+
+    The known param names are held in a frozenset and the dynamic
+    (``custom_``, ``ext_``) params are matched against a tuple of prefixes,
+    so checking a param is a constant-time operation. Schemas are
+    immutable; use ``extend`` to derive one that also accepts vendor params.
+    """
+
+    def __init__(self, params=LAUNCH_PARAMS, prefixes=LAUNCH_PARAMS_PREFIXES,
+                 list_params=LAUNCH_PARAMS_IS_LIST):
+        self.params = frozenset(params)
+        self.prefixes = tuple(prefixes)
+        self.list_params = frozenset(list_params)
+
+    def extend(self, params=(), prefixes=(), list_params=()):
+        """
+        Return a new schema that also accepts the given params and prefixes.
+        """
+        return self.__class__(
+            self.params.union(params, list_params),
+            self.prefixes + tuple(p for p in prefixes
+                                  if p not in self.prefixes),
+            self.list_params.union(list_params))
+
+    def is_valid(self, param):
+        return param in self.params or param.startswith(self.prefixes)
+
+    def prefix_of(self, param):
+        """
+        Return the dynamic prefix the param starts with, or None.
+        """
+        for prefix in self.prefixes:
+            if param.startswith(prefix):
+                return prefix
+        return None
+
+
+LAUNCH_PARAM_SCHEMA = LaunchParamSchema()
+
+
 def valid_param(param):
-    if param.startswith('custom_') or param.startswith('ext_'):
-        return True
-    elif param in LAUNCH_PARAMS:
-        return True
-    return False
+    return LAUNCH_PARAM_SCHEMA.is_valid(param)
+
+
+def unquote_plus_bytes(raw, encoding='utf-8'):
+    """
+    Decode one urlencoded key or value taken from a form body.
+    """
+    if b'%' not in raw and b'+' not in raw:
+        return raw.decode(encoding)
+    return unquote_to_bytes(raw.replace(b'+', b' ')).decode(encoding)
 
 
 class InvalidLaunchParamError(ValueError):
@@ -151,16 +209,69 @@ class InvalidLaunchParamError(ValueError):
         super(Exception, self).__init__(message)
 
 
+class ReadOnlyParams(dict):
+    """
+    A dict that refuses to be changed, handed out for cached params.
+    Use ``copy()`` to get a plain dict that can be modified.
+    """
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError('params are read only, copy them to make changes')
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        # rebuilt from a plain dict, as the default protocol would set
+        # the items one at a time
+        return (self.__class__, (dict(self),))
+
+
+class LaunchParamsPrefixView(Mapping):
+    """
+    A live, read-only view of the launch params that share a dynamic prefix
+    such as ``custom_``. Keys are presented without the prefix.
+    """
+
+    def __init__(self, launch_params, prefix):
+        self._launch_params = launch_params
+        self._prefix = prefix
+        self._keys = launch_params._prefixed.setdefault(prefix, set())
+
+    def __getitem__(self, key):
+        return self._launch_params[self._prefix + key]
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __iter__(self):
+        start = len(self._prefix)
+        return iter([key[start:] for key in self._keys])
+
+
 class LaunchParams(MutableMapping):
     """
     Represents the params for an LTI launch request. Provides dict-like
     behavior through the use of the MutableMapping ABC mixin.  Strictly
     enforces that params are valid LTI params.
+
+    The set of valid params is defined by the ``schema`` class attribute.
+    Subclasses may accept vendor params by extending it::
+
+        class VendorLaunchParams(LaunchParams):
+            schema = LaunchParams.schema.extend(['basiclti_submit'])
     """
+    schema = LAUNCH_PARAM_SCHEMA
+
+    # caches for to_params() and to_body(), cleared on every change
+    _flat_params = None
+    _encoded = None
 
     def __init__(self, *args, **kwargs):
 
         self._params = dict()
+        self._prefixed = dict((p, set()) for p in self.schema.prefixes)
+        self._parsed = dict()
         self.update(*args, **kwargs)
 
         # now verify we only got valid launch params
@@ -174,20 +285,139 @@ class LaunchParams(MutableMapping):
         if 'lti_message_type' not in self:
             self['lti_message_type'] = 'basic-lti-launch-request'
 
+    @classmethod
+    def from_trusted(cls, params, validate=False):
+        """
+        Create launch params from a mapping that is already known to be good,
+        such as the output of ``to_params()`` kept in session storage.
+
+        The mapping is adopted in a single pass instead of going through
+        ``__setitem__`` key by key. A key that is not a valid launch param
+        raises InvalidLaunchParamError if ``validate`` is true and is
+        dropped otherwise.
+        """
+        launch_params = cls.__new__(cls)
+        launch_params._params = params = dict(params)
+        launch_params._prefixed = prefixed = dict(
+            (p, set()) for p in cls.schema.prefixes)
+        launch_params._parsed = dict()
+
+        known = cls.schema.params
+        list_params = cls.schema.list_params
+        prefixes = cls.schema.prefixes
+        unknown = []
+        for key, value in params.items():
+            if key.startswith(prefixes):
+                prefixed[cls.schema.prefix_of(key)].add(key)
+            elif key not in known and not launch_params.valid_param(key):
+                # a subclass may override valid_param rather than the schema
+                if validate:
+                    raise InvalidLaunchParamError(key)
+                unknown.append(key)
+                continue
+            if key in list_params and isinstance(value, (list, tuple)):
+                params[key] = ','.join([x.strip() for x in value])
+        for key in unknown:
+            del params[key]
+
+        params.setdefault('lti_version', DEFAULT_LTI_VERSION)
+        params.setdefault('lti_message_type', 'basic-lti-launch-request')
+        return launch_params
+
+    def copy(self):
+        """
+        Return a shallow copy, without revalidating any params.
+        """
+        launch_params = self.__class__.__new__(self.__class__)
+        launch_params._params = self._params.copy()
+        launch_params._prefixed = dict(
+            (p, set(keys)) for p, keys in self._prefixed.items())
+        # parsed list values are immutable tuples, so they can be shared
+        launch_params._parsed = self._parsed.copy()
+        launch_params._flat_params = self._flat_params
+        launch_params._encoded = self._encoded
+        return launch_params
+
+    __copy__ = copy
+
+    def __getstate__(self):
+        # the caches are rebuilt on demand and are not worth pickling
+        state = self.__dict__.copy()
+        state.pop('_flat_params', None)
+        state.pop('_encoded', None)
+        return state
+
     def set_non_spec_param(self, param, val):
+        self._index(param)
+        self._parsed.pop(param, None)
+        self._changed()
         self._params[param] = val
 
     def get_non_spec_param(self, param):
         return self._params.get(param)
 
+    def custom_params(self):
+        """
+        Return a live view of the ``custom_`` params, keyed without prefix.
+        """
+        return LaunchParamsPrefixView(self, 'custom_')
+
+    def ext_params(self):
+        """
+        Return a live view of the ``ext_`` params, keyed without prefix.
+        """
+        return LaunchParamsPrefixView(self, 'ext_')
+
+    def to_params(self):
+        """
+        Return the params as a flat dict, with list values joined back into
+        comma separated strings, ready to be signed or sent.
+
+        The result is read only and is cached until the params change.
+        """
+        params = self._flat_params
+        if params is None:
+            params = dict()
+            for key, value in self.items():
+                if isinstance(value, (list, tuple)):
+                    value = ','.join(value)
+                params[key] = value
+            params = self._flat_params = ReadOnlyParams(params)
+        return params
+
+    def to_body(self):
+        """
+        Return ``to_params()`` as an ``application/x-www-form-urlencoded``
+        body, cached until the params change.
+        """
+        if self._encoded is None:
+            self._encoded = urlencode(
+                list(self.to_params().items())).encode('ascii')
+        return self._encoded
+
+    def _changed(self):
+        self._flat_params = self._encoded = None
+
+    def _index(self, param):
+        prefix = self.schema.prefix_of(param)
+        if prefix is not None:
+            self._prefixed[prefix].add(param)
+
     def _param_value(self, param):
-        if param in LAUNCH_PARAMS_IS_LIST:
-            return [x.strip() for x in self._params[param].split(',')]
+        if param in self.schema.list_params:
+            # list values are parsed once and cached until the param is
+            # written again, so they are returned as immutable tuples
+            try:
+                return self._parsed[param]
+            except KeyError:
+                value = self._parsed[param] = tuple(
+                    x.strip() for x in self._params[param].split(','))
+                return value
         else:
             return self._params[param]
 
     def valid_param(self, param):
-        return valid_param(param)
+        return self.schema.is_valid(param)
 
     def __len__(self):
         return len(self._params)
@@ -204,14 +434,166 @@ class LaunchParams(MutableMapping):
     def __setitem__(self, key, value):
         if not self.valid_param(key):
             raise InvalidLaunchParamError(key)
-        if key in LAUNCH_PARAMS_IS_LIST:
-            if isinstance(value, list):
+        if key in self.schema.list_params:
+            if isinstance(value, (list, tuple)):
                 value = ','.join([x.strip() for x in value])
+            self._parsed.pop(key, None)
+        if key not in self._params:
+            self._index(key)
+        self._changed()
         self._params[key] = value
 
     def __delitem__(self, key):
+        self._changed()
         if key in self._params:
             del self._params[key]
+            self._parsed.pop(key, None)
+            prefix = self.schema.prefix_of(key)
+            if prefix is not None:
+                self._prefixed[prefix].discard(key)
 
     def __iter__(self):
         return iter(self._params)
+
+
+class LazyLaunchParams(LaunchParams):
+    """
+    Launch params backed by the raw ``application/x-www-form-urlencoded``
+    request body.
+
+    ``from_body`` scans the body once, decoding and validating the keys and
+    recording where each value is. A value is only unquoted and decoded
+    the first time it is read. Writes are stored as usual and replace the
+    value from the body.
+    """
+
+    # classes made by for_class, by (cls, launch_params_class)
+    _lazy_classes = dict()
+
+    def __init__(self, *args, **kwargs):
+        self._body = b''
+        self._encoding = 'utf-8'
+        self._raw = dict()
+        super(LazyLaunchParams, self).__init__(*args, **kwargs)
+
+    @classmethod
+    def for_class(cls, launch_params_class):
+        """
+        Return a subclass of this class that accepts the same params as
+        ``launch_params_class``, a LaunchParams subclass with an extended
+        schema or its own ``valid_param``.
+        """
+        if issubclass(cls, launch_params_class):
+            return cls
+        key = (cls, launch_params_class)
+        lazy_class = LazyLaunchParams._lazy_classes.get(key)
+        if lazy_class is None:
+            lazy_class = LazyLaunchParams._lazy_classes[key] = type(
+                'Lazy' + launch_params_class.__name__,
+                (cls, launch_params_class), {})
+        return lazy_class
+
+    @classmethod
+    def from_body(cls, body, encoding='utf-8'):
+        if not isinstance(body, bytes):
+            body = body.encode(encoding)
+
+        launch_params = cls.__new__(cls)
+        launch_params._params = dict()
+        launch_params._prefixed = dict(
+            (p, set()) for p in cls.schema.prefixes)
+        launch_params._parsed = dict()
+        launch_params._body = body
+        launch_params._encoding = encoding
+        launch_params._raw = raw = dict()
+
+        valid_param = launch_params.valid_param
+        prefixes = cls.schema.prefixes
+        start = 0
+        length = len(body)
+        while start < length:
+            end = body.find(b'&', start)
+            if end < 0:
+                end = length
+            if end > start:
+                equals = body.find(b'=', start, end)
+                if equals < 0:
+                    key_end = value_start = end
+                else:
+                    key_end, value_start = equals, equals + 1
+                key = unquote_plus_bytes(body[start:key_end], encoding)
+                if not valid_param(key):
+                    raise InvalidLaunchParamError(key)
+                # like a MultiDict, the first value of a repeated key wins
+                if key not in raw:
+                    raw[key] = (value_start, end)
+                    if key.startswith(prefixes):
+                        launch_params._index(key)
+            start = end + 1
+
+        if 'lti_version' not in raw:
+            launch_params._params['lti_version'] = DEFAULT_LTI_VERSION
+        if 'lti_message_type' not in raw:
+            launch_params._params['lti_message_type'] = \
+                'basic-lti-launch-request'
+        return launch_params
+
+    @classmethod
+    def from_trusted(cls, params, validate=False):
+        launch_params = super(LazyLaunchParams, cls).from_trusted(
+            params, validate)
+        launch_params._body = b''
+        launch_params._encoding = 'utf-8'
+        launch_params._raw = dict()
+        return launch_params
+
+    def copy(self):
+        launch_params = super(LazyLaunchParams, self).copy()
+        launch_params._body = self._body
+        launch_params._encoding = self._encoding
+        launch_params._raw = self._raw.copy()
+        return launch_params
+
+    __copy__ = copy
+
+    def _decode(self, param):
+        start, end = self._raw.pop(param)
+        value = self._params[param] = unquote_plus_bytes(
+            self._body[start:end], self._encoding)
+        return value
+
+    def _param_value(self, param):
+        if param in self._raw:
+            self._decode(param)
+        return super(LazyLaunchParams, self)._param_value(param)
+
+    def get_non_spec_param(self, param):
+        if param in self._raw:
+            return self._decode(param)
+        return super(LazyLaunchParams, self).get_non_spec_param(param)
+
+    def set_non_spec_param(self, param, val):
+        self._raw.pop(param, None)
+        super(LazyLaunchParams, self).set_non_spec_param(param, val)
+
+    def __len__(self):
+        return len(self._params) + len(self._raw)
+
+    def __contains__(self, item):
+        return self.valid_param(item) and (
+            item in self._raw or item in self._params)
+
+    def __setitem__(self, key, value):
+        self._raw.pop(key, None)
+        super(LazyLaunchParams, self).__setitem__(key, value)
+
+    def __delitem__(self, key):
+        if self._raw.pop(key, None) is not None:
+            prefix = self.schema.prefix_of(key)
+            if prefix is not None:
+                self._prefixed[prefix].discard(key)
+        super(LazyLaunchParams, self).__delitem__(key)
+
+    def __iter__(self):
+        # reading a value moves it out of _raw, so iterate over a snapshot
+        return iter(list(self._params) + list(self._raw))
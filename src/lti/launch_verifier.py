@@ -0,0 +1,148 @@
+from oauthlib.oauth1 import SignatureOnlyEndpoint
+
+# Why a launch was rejected, as reported by VerificationResult.reason
+MISSING_LAUNCH_PARAMS = 'missing_launch_params'
+MISSING_OAUTH_PARAMS = 'missing_oauth_params'
+INVALID_OAUTH_PARAMS = 'invalid_oauth_params'
+INSECURE_TRANSPORT = 'insecure_transport'
+TIMESTAMP_OUT_OF_WINDOW = 'timestamp_out_of_window'
+UNKNOWN_CONSUMER = 'unknown_consumer'
+REPLAYED_NONCE = 'replayed_nonce'
+INVALID_SIGNATURE = 'invalid_signature'
+REJECTED = 'rejected'
+VERIFIER_ERROR = 'verifier_error'
+
+
+class SecretRecordingValidator(object):
+    '''
+    Proxies a RequestValidator, recording the client secret on the oauthlib
+    request being verified instead of on itself, so that one instance can
+    be shared by concurrent verifications.
+    '''
+
+    def __init__(self, validator):
+        self._validator = validator
+
+    def __getattr__(self, name):
+        return getattr(self._validator, name)
+
+    def get_client_secret(self, client_key, request):
+        # a secret being tried during rotation takes precedence
+        secret = getattr(request, 'lti_candidate_secret', None)
+        if secret is None:
+            secret = self._validator.get_client_secret(client_key, request)
+        request.lti_consumer_secret = secret
+        return secret
+
+
+class VerificationResult(object):
+    '''
+    The outcome of verifying one launch. Truthy when the launch is valid.
+    Otherwise ``reason`` says why it was rejected, as precisely as the
+    verifier could tell, and ``error`` holds the exception raised while
+    verifying it, if any.
+    '''
+
+    def __init__(self, valid, consumer_key=None, consumer_secret=None,
+                 request=None, reason=None, error=None):
+        self.valid = valid
+        self.consumer_key = consumer_key
+        self.consumer_secret = consumer_secret
+        self.request = request
+        self.error = error
+        if not valid and reason is None:
+            reason = REJECTED
+        self.reason = reason
+
+    def __bool__(self):
+        return bool(self.valid)
+
+    __nonzero__ = __bool__  # Python 2
+
+
+class LaunchVerifier(object):
+    '''
+    Verifies the OAuth signature of ToolProvider launches.
+
+    The oauthlib endpoint and validator proxy are built once, so a single
+    verifier can be created at startup and used for every launch, from any
+    number of threads, provided the wrapped validator is thread safe.
+
+    A consumer key may have several secrets while one is being rotated. If
+    the validator implements ``get_client_secrets(client_key, request)``,
+    a launch whose signature does not match the secret from
+    ``get_client_secret`` is checked against the others too, and the one
+    that matches is reported to ``client_secret_matched(client_key,
+    secret)`` when the validator implements it.
+    '''
+
+    def __init__(self, validator):
+        self.validator = validator
+        self.endpoint = SignatureOnlyEndpoint(
+            SecretRecordingValidator(validator))
+
+    def __reduce__(self):
+        # pickled as its validator, for use in other processes
+        return (self.__class__, (self.validator,))
+
+    def verify(self, tool_provider):
+        '''
+        Verify a ToolProvider's launch, returning a VerificationResult.
+        '''
+        valid, request = self.endpoint.validate_request(
+            tool_provider.launch_url,
+            'POST',
+            tool_provider.to_params(),
+            tool_provider.launch_headers
+        )
+        if request is not None and not valid:
+            valid = self._verify_other_secrets(request)
+        elif valid and hasattr(self.validator, 'client_secret_matched') and \
+                hasattr(request, 'lti_consumer_secret'):
+            self.validator.client_secret_matched(
+                request.client_key, request.lti_consumer_secret)
+        # like ProxyValidator, fall back to the validator's own secret when
+        # get_client_secret was never called
+        secret = getattr(request, 'lti_consumer_secret',
+                         getattr(self.validator, 'secret', None))
+        return VerificationResult(
+            valid,
+            consumer_key=tool_provider.launch_params.get(
+                'oauth_consumer_key'),
+            consumer_secret=secret,
+            request=request,
+            reason=self._reason(valid, request))
+
+    @staticmethod
+    def _reason(valid, request):
+        if valid:
+            return None
+        log = getattr(request, 'validator_log', None)
+        if not log:
+            # oauthlib gave up before checking the client and signature
+            return REJECTED
+        if not log.get('client'):
+            return UNKNOWN_CONSUMER
+        return INVALID_SIGNATURE
+
+    def _verify_other_secrets(self, request):
+        log = request.validator_log
+        if not log.get('client') or log.get('signature') is not False or \
+                not hasattr(self.validator, 'get_client_secrets'):
+            return False
+        tried = getattr(request, 'lti_consumer_secret', None)
+        for secret in self.validator.get_client_secrets(
+                request.client_key, request):
+            if secret == tried:
+                continue
+            request.lti_candidate_secret = secret
+            if self.endpoint._check_signature(request):
+                log['signature'] = True
+                if hasattr(self.validator, 'client_secret_matched'):
+                    self.validator.client_secret_matched(
+                        request.client_key, secret)
+                return True
+        request.lti_candidate_secret = None
+        if tried is not None:
+            request.lti_consumer_secret = tried
+        return False
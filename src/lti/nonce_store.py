@@ -0,0 +1,340 @@
+import hashlib
+import math
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:
+    # Python < 3.8
+    resource_tracker = shared_memory = None
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+
+from .utils import sqlite_connection
+
+# oauthlib rejects launches whose timestamp is further than this from now,
+# so a nonce only has to be remembered this long after its timestamp
+NONCE_TTL = 600
+
+
+class NonceStore(object):
+    '''
+    Remembers the nonces of recent launches so that replays can be refused.
+
+    A nonce is recorded together with its consumer key and timestamp, and is
+    forgotten once its timestamp is more than ``ttl`` seconds old, by which
+    time oauthlib rejects the timestamp anyway.
+    '''
+
+    def __init__(self, ttl=NONCE_TTL):
+        self.ttl = ttl
+
+    def add(self, client_key, timestamp, nonce):
+        '''
+        Record a nonce. Returns False if it has already been seen and not
+        yet expired, meaning the launch is a replay.
+        '''
+        raise NotImplementedError
+
+    def expires(self, timestamp, now):
+        try:
+            return int(timestamp) + self.ttl
+        except (TypeError, ValueError):
+            return int(now) + self.ttl
+
+
+class MemoryNonceStore(NonceStore):
+    '''
+    An in-process nonce store holding at most ``maxsize`` nonces.
+
+    When full the oldest nonce is dropped, so ``maxsize`` should comfortably
+    exceed the number of launches expected within ``ttl`` seconds.
+    '''
+
+    def __init__(self, ttl=NONCE_TTL, maxsize=100000):
+        super(MemoryNonceStore, self).__init__(ttl)
+        self.maxsize = maxsize
+        self._nonces = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, client_key, timestamp, nonce):
+        now = time.time()
+        key = (client_key, timestamp, nonce)
+        with self._lock:
+            expires = self._nonces.get(key)
+            if expires is not None and expires > now:
+                return False
+            self._nonces.pop(key, None)
+            self._nonces[key] = self.expires(timestamp, now)
+            self._evict(now)
+        return True
+
+    def _evict(self, now):
+        # Nonces arrive in roughly timestamp order, so the expired ones
+        # collect at the front.
+        nonces = self._nonces
+        while nonces:
+            expires = next(iter(nonces.values()))
+            if expires > now and len(nonces) <= self.maxsize:
+                break
+            nonces.popitem(last=False)
+
+    def __len__(self):
+        return len(self._nonces)
+
+
+class SQLiteNonceStore(NonceStore):
+    '''
+    A nonce store in a local SQLite database, shared by every process on the
+    host that uses the same file.
+
+    The database runs in WAL mode so that readers do not block the writer.
+    Expired nonces are not deleted one by one but swept in a single batch at
+    most every ``sweep_interval`` seconds.
+    '''
+
+    def __init__(self, path, ttl=NONCE_TTL, sweep_interval=60,
+                 table='lti_nonces'):
+        super(SQLiteNonceStore, self).__init__(ttl)
+        self.path = path
+        self.sweep_interval = sweep_interval
+        self.table = table
+        self._connection = sqlite_connection(path, wal=True)
+        self._next_sweep = 0
+
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS {0} ('
+                'client_key TEXT NOT NULL, '
+                'timestamp TEXT NOT NULL, '
+                'nonce TEXT NOT NULL, '
+                'expires INTEGER NOT NULL, '
+                'PRIMARY KEY (client_key, timestamp, nonce))'.format(table))
+            connection.execute(
+                'CREATE INDEX IF NOT EXISTS {0}_expires '
+                'ON {0} (expires)'.format(table))
+
+    def add(self, client_key, timestamp, nonce):
+        now = time.time()
+        connection = self._connection()
+        if now >= self._next_sweep:
+            self.sweep(now)
+        expires = self.expires(timestamp, now)
+        params = (client_key, str(timestamp), nonce)
+        with connection:
+            added = connection.execute(
+                'INSERT OR IGNORE INTO {0} '
+                '(client_key, timestamp, nonce, expires) '
+                'VALUES (?, ?, ?, ?)'.format(self.table),
+                params + (expires,)).rowcount
+            if not added:
+                # already there, but may have expired since the last sweep
+                added = connection.execute(
+                    'UPDATE {0} SET expires = ? '
+                    'WHERE client_key = ? AND timestamp = ? AND nonce = ? '
+                    'AND expires <= ?'.format(self.table),
+                    (expires,) + params + (now,)).rowcount
+        return bool(added)
+
+    def sweep(self, now=None):
+        '''
+        Delete every expired nonce.
+        '''
+        if now is None:
+            now = time.time()
+        self._next_sweep = now + self.sweep_interval
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                'DELETE FROM {0} WHERE expires <= ?'.format(self.table),
+                (now,))
+
+    def __len__(self):
+        return self._connection().execute(
+            'SELECT COUNT(*) FROM {0}'.format(self.table)).fetchone()[0]
+
+
+class FileLock(object):
+    '''
+    A lock shared by the threads of every process that uses the same path.
+    Only threads are excluded on platforms without ``fcntl``.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._file = None
+        self._pid = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if fcntl is not None:
+            if self._pid != os.getpid():
+                # a descriptor inherited over fork shares its lock with the
+                # parent, so every process opens the file itself
+                self._file = open(self.path, 'a')
+                self._pid = os.getpid()
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._thread_lock.release()
+
+
+def _open_shared_memory(name, create=False, size=0):
+    # Before Python 3.13 every attached segment is registered with the
+    # resource tracker, which unlinks it when that process exits, even
+    # though other workers still use it.
+    try:
+        return shared_memory.SharedMemory(
+            name, create=create, size=size, track=False)
+    except TypeError:
+        memory = shared_memory.SharedMemory(name, create=create, size=size)
+        resource_tracker.unregister(memory._name, 'shared_memory')
+        return memory
+
+
+class SharedMemoryNonceStore(NonceStore):
+    '''
+    A nonce filter in shared memory, for pre-fork servers where a replay
+    may reach any worker on the host.
+
+    Nonces are kept in a ring of Bloom filters, one for each
+    ``bucket_seconds`` window of launch timestamps. A replay carries the
+    timestamp of the original launch and so is always checked against the
+    same filter, which is only cleared for reuse once its window is more
+    than ``ttl`` seconds old. Each filter holds ``capacity`` nonces with a
+    false positive rate of ``error_rate``: that fraction of new nonces are
+    taken for replays, but no replay is missed.
+
+    Every process opening a store with the same ``name`` shares it. The
+    shared memory outlives those processes until ``unlink`` is called.
+    Requires Python 3.8 or later.
+    '''
+    HEADER = struct.Struct('<8sIIIQ')
+    WINDOW = struct.Struct('<q')
+    MAGIC = b'LTINONC1'
+
+    def __init__(self, name='lti-nonces', ttl=NONCE_TTL, bucket_seconds=60,
+                 capacity=100000, error_rate=1e-6, lock_path=None):
+        if shared_memory is None:
+            raise RuntimeError(
+                'SharedMemoryNonceStore requires Python 3.8 or later')
+        super(SharedMemoryNonceStore, self).__init__(ttl)
+        self.name = name
+        self.bucket_seconds = bucket_seconds
+        # enough windows for timestamps up to ttl either side of now
+        self.buckets = int(math.ceil(2.0 * ttl / bucket_seconds)) + 2
+        bits = -capacity * math.log(error_rate) / math.log(2) ** 2
+        self.bits = int(math.ceil(bits / 8.0)) * 8
+        self.hashes = max(1, int(round(self.bits * math.log(2) / capacity)))
+        self.bucket_size = self.WINDOW.size + self.bits // 8
+
+        self._lock = FileLock(lock_path or os.path.join(
+            tempfile.gettempdir(), name + '.lock'))
+        header = self.HEADER.pack(self.MAGIC, bucket_seconds, self.buckets,
+                                  self.hashes, self.bits)
+        with self._lock:
+            try:
+                self._memory = _open_shared_memory(
+                    name, create=True,
+                    size=self.HEADER.size + self.buckets * self.bucket_size)
+                self._memory.buf[:self.HEADER.size] = header
+            except FileExistsError:
+                self._memory = _open_shared_memory(name)
+                if bytes(self._memory.buf[:self.HEADER.size]) != header:
+                    self._memory.close()
+                    raise ValueError(
+                        'Shared memory {} holds a nonce store with different '
+                        'settings'.format(name))
+
+    def _positions(self, client_key, timestamp, nonce):
+        key = u'\x00'.join([str(client_key), str(timestamp), str(nonce)])
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        step = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * step) % self.bits for i in range(self.hashes)]
+
+    def add(self, client_key, timestamp, nonce):
+        now = time.time()
+        expires = self.expires(timestamp, now)
+        if expires <= now:
+            # forgotten, as in the other stores
+            return True
+        if expires > now + 2 * self.ttl:
+            # too far in the future to have a filter of its own
+            return False
+
+        window = (expires - self.ttl) // self.bucket_seconds
+        offset = (self.HEADER.size +
+                  (window % self.buckets) * self.bucket_size)
+        start = offset + self.WINDOW.size
+        positions = self._positions(client_key, timestamp, nonce)
+        buf = self._memory.buf
+        with self._lock:
+            current = self.WINDOW.unpack_from(buf, offset)[0]
+            if current < window:
+                # the filter belongs to an expired window, so reuse it
+                buf[start:offset + self.bucket_size] = bytes(self.bits // 8)
+                self.WINDOW.pack_into(buf, offset, window)
+            elif current > window:
+                return False
+
+            seen = True
+            for position in positions:
+                index = start + (position >> 3)
+                mask = 1 << (position & 7)
+                byte = buf[index]
+                if not byte & mask:
+                    seen = False
+                    buf[index] = byte | mask
+        return not seen
+
+    def close(self):
+        '''
+        Detach this process from the shared memory.
+        '''
+        self._memory.close()
+
+    def unlink(self):
+        '''
+        Destroy the shared memory once every process has closed it.
+        '''
+        if getattr(self._memory, '_track', True):
+            # unlink() unregisters it from the resource tracker again
+            resource_tracker.register(self._memory._name, 'shared_memory')
+        self._memory.unlink()
+        try:
+            os.remove(self._lock.path)
+        except OSError:
+            pass
+
+
+class NonceValidatorMixin(object):
+    '''
+    Implements ``validate_timestamp_and_nonce`` for an oauthlib
+    RequestValidator using a NonceStore::
+
+        class Validator(NonceValidatorMixin, RequestValidator):
+            nonce_store = SQLiteNonceStore('/var/tmp/lti-nonces.db')
+
+    By default all validators share one process wide MemoryNonceStore.
+    '''
+    nonce_store = MemoryNonceStore()
+
+    def validate_timestamp_and_nonce(self, client_key, timestamp, nonce,
+                                     request, request_token=None,
+                                     access_token=None):
+        return self.nonce_store.add(client_key, timestamp, nonce)
@@ -0,0 +1,369 @@
+'''
+A durable outbox for outcome requests, and the worker that drains it::
+
+    python -m lti.outbox /var/lib/lti/outbox.db --consumers consumers.json
+'''
+import argparse
+import json
+import sys
+import time
+
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:
+    # Python 2 without the futures backport
+    ThreadPoolExecutor = None
+
+from .outcome_request import DELETE_REQUEST, REPLACE_REQUEST, OutcomeRequest
+from .outcome_response import format_score
+from .transport import SessionTransport
+from .utils import sqlite_connection
+
+# the status of an outbox row
+PENDING = 'pending'
+SENDING = 'sending'
+SENT = 'sent'
+FAILED = 'failed'
+# replaced by a newer write to the same result before it was sent
+SUPERSEDED = 'superseded'
+
+# operations that set the result, of which only the newest counts
+WRITE_OPERATIONS = (REPLACE_REQUEST, DELETE_REQUEST)
+
+# code_major values with which the LMS refused a request for good
+FINAL_CODES = ('failure', 'unsupported')
+
+
+class Outbox(object):
+    '''
+    OutcomeRequests saved in a local SQLite table before they are posted,
+    so that a grade survives the process that computed it.
+
+    ``put`` costs one local insert. ``drain`` then posts the saved requests
+    in batches of up to ``batch_size``, ``workers`` at a time, and records
+    each outcome on its row: the ``code_major`` and description of the
+    OutcomeResponse, or the error. Requests that fail or are not yet
+    processed are retried after ``retry_delay`` seconds, doubling after
+    every attempt, up to ``max_attempts`` attempts; ``failure`` and
+    ``unsupported`` responses are final.
+
+    The requests for each result, that is, each lis_outcome_service_url and
+    lis_result_sourcedid, are posted one at a time, in the order they were
+    put. A replaceResult or deleteResult supersedes the writes to the same
+    result that are still pending, and those that fail once it is put, so
+    an older score never reaches the LMS after a newer one.
+
+    A row is leased to the worker that claims it for ``lease`` seconds. If
+    the worker dies before recording the outcome, the request is posted
+    again, so a request may reach the LMS twice, but is never lost.
+    replaceResult and deleteResult requests are idempotent.
+
+    Secrets are saved with the requests unless they are signed with a
+    ``consumer_registry``. The outbox that drains the table then needs the
+    same ``consumer_registry``.
+
+    An Outbox can be set as the ``outcome_queue`` of a ToolProvider.
+    '''
+
+    def __init__(self, path, consumer_registry=None, transport=None,
+                 batch_size=50, workers=4, max_attempts=8, retry_delay=30,
+                 lease=300, table='lti_outbox'):
+        self.path = path
+        self.consumer_registry = consumer_registry
+        self.transport = transport
+        self.batch_size = batch_size
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.lease = lease
+        self.table = table
+        # transactions are begun explicitly
+        self._connection = sqlite_connection(path, wal=True,
+                                             isolation_level=None)
+
+        connection = self._connection()
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS {0} ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+            'status TEXT NOT NULL, '
+            'operation TEXT NOT NULL, '
+            'lis_outcome_service_url TEXT NOT NULL, '
+            'lis_result_sourcedid TEXT NOT NULL, '
+            'consumer_key TEXT NOT NULL, '
+            'consumer_secret TEXT, '
+            'score TEXT, '
+            'result_data TEXT, '
+            'message_identifier TEXT, '
+            'attempts INTEGER NOT NULL DEFAULT 0, '
+            'next_attempt REAL NOT NULL, '
+            'created REAL NOT NULL, '
+            'updated REAL NOT NULL, '
+            'response_code INTEGER, '
+            'code_major TEXT, '
+            'description TEXT, '
+            'error TEXT)'.format(self.table))
+        connection.execute(
+            'CREATE INDEX IF NOT EXISTS {0}_due '
+            'ON {0} (status, next_attempt)'.format(self.table))
+        connection.execute(
+            'CREATE INDEX IF NOT EXISTS {0}_result '
+            'ON {0} (lis_outcome_service_url, lis_result_sourcedid, id)'
+            .format(self.table))
+
+    def put(self, outcome_request):
+        '''
+        Save an OutcomeRequest whose operation is already set. Returns the
+        id of its row.
+        '''
+        now = time.time()
+        request = outcome_request
+        score = None if request.score is None else \
+            format_score(request.score)
+        result_data = None if request.result_data is None else \
+            json.dumps(request.result_data)
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            if request.operation in WRITE_OPERATIONS:
+                connection.execute(
+                    'UPDATE {0} SET status = ?, updated = ? '
+                    'WHERE lis_outcome_service_url = ? '
+                    'AND lis_result_sourcedid = ? AND status = ? '
+                    'AND operation IN (?, ?)'.format(self.table),
+                    (SUPERSEDED, now, request.lis_outcome_service_url,
+                     request.lis_result_sourcedid, PENDING) +
+                    WRITE_OPERATIONS)
+            row_id = connection.execute(
+                'INSERT INTO {0} (status, operation, lis_outcome_service_url, '
+                'lis_result_sourcedid, consumer_key, consumer_secret, score, '
+                'result_data, message_identifier, next_attempt, created, '
+                'updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'
+                .format(self.table),
+                (PENDING, request.operation, request.lis_outcome_service_url,
+                 request.lis_result_sourcedid, request.consumer_key,
+                 request.consumer_secret, score, result_data,
+                 request.message_identifier, now, now, now)).lastrowid
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return row_id
+
+    def claim(self, limit=None, now=None):
+        '''
+        Lease up to ``limit`` requests that are due, returning a list of
+        ``(id, OutcomeRequest)`` pairs. Only the oldest unfinished request
+        for each result may be claimed, so no two are posted at once.
+        '''
+        now = time.time() if now is None else now
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            rows = connection.execute(
+                'SELECT id, operation, lis_outcome_service_url, '
+                'lis_result_sourcedid, consumer_key, consumer_secret, score, '
+                'result_data, message_identifier FROM {0} AS due '
+                'WHERE status IN (?, ?) AND next_attempt <= ? '
+                'AND NOT EXISTS (SELECT 1 FROM {0} AS earlier '
+                'WHERE earlier.lis_outcome_service_url = '
+                'due.lis_outcome_service_url '
+                'AND earlier.lis_result_sourcedid = due.lis_result_sourcedid '
+                'AND earlier.id < due.id AND earlier.status IN (?, ?)) '
+                'ORDER BY next_attempt LIMIT ?'.format(self.table),
+                (PENDING, SENDING, now, PENDING, SENDING,
+                 limit or self.batch_size)).fetchall()
+            connection.executemany(
+                'UPDATE {0} SET status = ?, attempts = attempts + 1, '
+                'next_attempt = ?, updated = ? WHERE id = ?'
+                .format(self.table),
+                [(SENDING, now + self.lease, now, row[0]) for row in rows])
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return [(row[0], self._outcome_request(row)) for row in rows]
+
+    def _outcome_request(self, row):
+        (_, operation, url, sourcedid, consumer_key, consumer_secret, score,
+         result_data, message_identifier) = row
+        return OutcomeRequest({
+            'operation': operation,
+            'lis_outcome_service_url': url,
+            'lis_result_sourcedid': sourcedid,
+            'consumer_key': consumer_key,
+            'consumer_secret': consumer_secret,
+            'consumer_registry': self.consumer_registry,
+            'transport': self.transport,
+            'score': score,
+            'result_data': None if result_data is None else
+            json.loads(result_data),
+            'message_identifier': message_identifier,
+        })
+
+    def drain(self):
+        '''
+        Post every request that is due, batch after batch. Returns the
+        number of requests posted.
+        '''
+        if self.transport is None:
+            self.transport = SessionTransport(pool_maxsize=self.workers)
+        posted = 0
+        executor = None
+        if ThreadPoolExecutor is not None and self.workers > 1:
+            executor = ThreadPoolExecutor(self.workers)
+        try:
+            while True:
+                claimed = self.claim()
+                if not claimed:
+                    return posted
+                send = executor.map if executor is not None else map
+                self._record(list(send(self._send, claimed)))
+                posted += len(claimed)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    @staticmethod
+    def _send(claimed):
+        row_id, outcome_request = claimed
+        try:
+            return row_id, outcome_request.post_outcome_request(), None
+        except Exception as e:
+            return row_id, None, e
+
+    def _record(self, outcomes):
+        now = time.time()
+        connection = self._connection()
+        attempts = dict(connection.execute(
+            'SELECT id, attempts FROM {0} WHERE id IN ({1})'.format(
+                self.table, ', '.join('?' * len(outcomes))),
+            [row_id for row_id, _, _ in outcomes]).fetchall())
+        updates = []
+        for row_id, response, error in outcomes:
+            code_major = description = response_code = None
+            if response is not None:
+                code_major = response.code_major
+                code_major = None if code_major is None else str(code_major)
+                description = response.description
+                description = None if description is None else \
+                    str(description)
+                response_code = response.response_code
+            if code_major == 'success':
+                status = SENT
+            elif code_major in FINAL_CODES or \
+                    attempts[row_id] >= self.max_attempts:
+                status = FAILED
+            else:
+                status = PENDING
+            delay = self.retry_delay * 2 ** (attempts[row_id] - 1)
+            updates.append((status, now + delay, now, response_code,
+                            code_major, description,
+                            None if error is None else repr(error), row_id))
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.executemany(
+                'UPDATE {0} SET status = ?, next_attempt = ?, updated = ?, '
+                'response_code = ?, code_major = ?, description = ?, '
+                'error = ? WHERE id = ?'.format(self.table), updates)
+            # writes to be retried that a newer write was put after
+            connection.execute(
+                'UPDATE {0} SET status = ? WHERE id IN ({1}) '
+                'AND status = ? AND operation IN (?, ?) '
+                'AND EXISTS (SELECT 1 FROM {0} AS newer '
+                'WHERE newer.lis_outcome_service_url = '
+                '{0}.lis_outcome_service_url '
+                'AND newer.lis_result_sourcedid = {0}.lis_result_sourcedid '
+                'AND newer.id > {0}.id AND newer.operation IN (?, ?))'.format(
+                    self.table, ', '.join('?' * len(outcomes))),
+                (SUPERSEDED,) + tuple(row_id for row_id, _, _ in outcomes) +
+                (PENDING,) + WRITE_OPERATIONS + WRITE_OPERATIONS)
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+    def status(self, row_id):
+        '''
+        The status of a request, and what happened to its last attempt, as
+        a dict, or None if there is no such row.
+        '''
+        cursor = self._connection().execute(
+            'SELECT status, attempts, response_code, code_major, '
+            'description, error FROM {0} WHERE id = ?'.format(self.table),
+            (row_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return dict(zip((column[0] for column in cursor.description), row))
+
+    def counts(self):
+        '''
+        The number of requests in each status.
+        '''
+        return dict(self._connection().execute(
+            'SELECT status, COUNT(*) FROM {0} GROUP BY status'
+            .format(self.table)).fetchall())
+
+    def purge(self, age):
+        '''
+        Delete requests that were sent, failed or superseded more than
+        ``age`` seconds ago. Returns the number deleted.
+        '''
+        return self._connection().execute(
+            'DELETE FROM {0} WHERE status IN (?, ?, ?) AND updated < ?'
+            .format(self.table),
+            (SENT, FAILED, SUPERSEDED, time.time() - age)).rowcount
+
+    def run(self, interval=1.0, purge_after=7 * 86400):
+        '''
+        Drain the outbox every ``interval`` seconds, forever.
+        '''
+        while True:
+            self.drain()
+            if purge_after is not None:
+                self.purge(purge_after)
+            time.sleep(interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m lti.outbox',
+        description='Post the outcome requests saved in an outbox.')
+    parser.add_argument('path', help='the SQLite database of the outbox')
+    parser.add_argument('--table', default='lti_outbox')
+    parser.add_argument('--consumers', metavar='FILE',
+                        help='a JSON or YAML file of consumer keys and '
+                        'secrets, for requests saved without a secret')
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--max-attempts', type=int, default=8)
+    parser.add_argument('--retry-delay', type=float, default=30)
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help='seconds between drains')
+    parser.add_argument('--purge-after', type=float, default=7 * 86400,
+                        help='seconds to keep sent and failed requests')
+    parser.add_argument('--once', action='store_true',
+                        help='drain once and exit')
+    args = parser.parse_args(argv)
+
+    registry = None
+    if args.consumers:
+        from .consumer_registry import ConsumerRegistry, FileConsumerBackend
+        registry = ConsumerRegistry(FileConsumerBackend(args.consumers))
+    outbox = Outbox(args.path, consumer_registry=registry,
+                    batch_size=args.batch_size, workers=args.workers,
+                    max_attempts=args.max_attempts,
+                    retry_delay=args.retry_delay, table=args.table)
+    if args.once:
+        posted = outbox.drain()
+        print('posted {0} outcome requests: {1}'.format(
+            posted, json.dumps(outbox.counts(), sort_keys=True)))
+        return 0
+    try:
+        outbox.run(args.interval, args.purge_after)
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from .outcome_request import DELETE_REQUEST, READ_REQUEST, REPLACE_REQUEST
+from .outcome_response import OutcomeResponse
+
+
+class OutcomeCache(object):
+    '''
+    Saves outcome requests that would not change anything.
+
+    The cache remembers the last score and result_data successfully posted
+    with a replaceResult for each result, that is, each
+    lis_outcome_service_url and lis_result_sourcedid. Posting the same
+    again returns a successful OutcomeResponse, whose ``attempts`` is 0,
+    without sending anything. Successful readResult responses are reused
+    for ``read_ttl`` seconds, or until the result is written.
+
+    At most ``maxsize`` results of each kind are remembered, the least
+    recently used being forgotten first. ``counts`` tallies the hits and
+    misses of replaceResult and readResult requests.
+
+    Only posts through this cache are seen, so it should only be used when
+    nothing else changes the scores in the LMS, or with a short
+    ``read_ttl``. One cache can be shared by every thread of a process.
+    '''
+
+    def __init__(self, maxsize=10000, read_ttl=60):
+        self.maxsize = maxsize
+        self.read_ttl = read_ttl
+        self.counts = Counter()
+        self._written = OrderedDict()
+        self._read = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(outcome_request):
+        return (outcome_request.lis_outcome_service_url,
+                outcome_request.lis_result_sourcedid)
+
+    @staticmethod
+    def _value(outcome_request):
+        # the score as it is written in the request XML
+        score = outcome_request.score
+        result_data = outcome_request.result_data
+        return (None if score is None else str(score),
+                None if not result_data else
+                tuple(sorted(result_data.items())))
+
+    def lookup(self, outcome_request):
+        '''
+        Return the OutcomeResponse for a request that need not be sent, or
+        None if it must be.
+        '''
+        operation = outcome_request.operation
+        key = self.key(outcome_request)
+        with self._lock:
+            if operation == REPLACE_REQUEST:
+                value = self._written.pop(key, None)
+                if value is not None:
+                    self._written[key] = value
+                if value is None or value != self._value(outcome_request):
+                    self.counts['replace_misses'] += 1
+                    return None
+                self.counts['replace_hits'] += 1
+                return OutcomeResponse(
+                    code_major='success', severity='status',
+                    operation=REPLACE_REQUEST, attempts=0,
+                    message_ref_identifier=outcome_request.message_identifier,
+                    description='The score is unchanged')
+            if operation == READ_REQUEST:
+                entry = self._read.pop(key, None)
+                if entry is None or entry[0] <= time.time():
+                    self.counts['read_misses'] += 1
+                    return None
+                self._read[key] = entry
+                self.counts['read_hits'] += 1
+                return entry[1]
+        return None
+
+    def store(self, outcome_request, outcome_response):
+        '''
+        Record the response to a request that was sent.
+        '''
+        operation = outcome_request.operation
+        key = self.key(outcome_request)
+        success = outcome_response.is_success()
+        with self._lock:
+            if operation in (REPLACE_REQUEST, DELETE_REQUEST):
+                self._read.pop(key, None)
+                # after a failure, the score in the LMS is unknown
+                self._written.pop(key, None)
+                if operation == REPLACE_REQUEST and success:
+                    self._written[key] = self._value(outcome_request)
+                    self._evict(self._written)
+            elif operation == READ_REQUEST and success:
+                self._read.pop(key, None)
+                self._read[key] = (time.time() + self.read_ttl,
+                                   outcome_response)
+                self._evict(self._read)
+
+    def _evict(self, entries):
+        while len(entries) > self.maxsize:
+            entries.popitem(last=False)
+
+    def invalidate(self, outcome_request=None):
+        '''
+        Forget what is known of a request's result, or of every result.
+        '''
+        with self._lock:
+            if outcome_request is None:
+                self._written.clear()
+                self._read.clear()
+            else:
+                key = self.key(outcome_request)
+                self._written.pop(key, None)
+                self._read.pop(key, None)
+
+    def metrics(self):
+        '''
+        Return a snapshot of ``counts``.
+        '''
+        with self._lock:
+            return dict(self.counts)
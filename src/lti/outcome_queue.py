@@ -0,0 +1,158 @@
+import logging
+import threading
+import time
+from collections import Counter, deque
+
+log = logging.getLogger(__name__)
+
+
+class OutcomeQueue(object):
+    '''
+    Posts OutcomeRequests from a pool of background threads, so that
+    the request that records a grade does not wait for the LMS.
+
+    Writes for the same result, that is, the same lis_outcome_service_url
+    and lis_result_sourcedid, are coalesced: while one is waiting to be
+    posted, a newer one takes its place, and only the last is sent. A write
+    is never posted while an earlier one for the same result is still in
+    flight, so the LMS keeps the last. readResult requests are queued
+    apart from writes and are not ordered with them.
+
+    Each request waits ``delay`` seconds before it may be posted, which
+    lets quick successive grades coalesce. Up to ``workers`` requests are
+    posted at once.
+
+    Every callable in ``hooks`` is called from a worker thread as
+    ``hook(outcome_request, outcome_response, error)`` once a request has
+    been posted, with the exception it raised, if any, as ``error``.
+    Requests that were coalesced away are only counted.
+
+    ``counts`` tallies requests that were ``queued``, ``coalesced``,
+    ``posted`` and ``failed``. The worker threads are started by the first
+    ``put``, so a queue can be created before a server forks.
+    '''
+
+    def __init__(self, workers=4, delay=0, hooks=None):
+        self.workers = workers
+        self.delay = delay
+        self.hooks = list(hooks or [])
+        self.counts = Counter()
+        self._pending = {}
+        self._due = deque()
+        self._in_flight = set()
+        self._threads = []
+        self._closed = False
+        self._condition = threading.Condition()
+
+    @staticmethod
+    def key(outcome_request):
+        '''
+        The key under which writes to the same result are coalesced.
+        '''
+        return (outcome_request.lis_outcome_service_url,
+                outcome_request.lis_result_sourcedid,
+                outcome_request.is_read_request())
+
+    def put(self, outcome_request):
+        '''
+        Queue an OutcomeRequest whose operation is already set.
+        '''
+        key = self.key(outcome_request)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('OutcomeQueue is closed')
+            if not self._threads:
+                self._start()
+            self.counts['queued'] += 1
+            if key in self._pending:
+                self.counts['coalesced'] += 1
+            elif key not in self._in_flight:
+                self._due.append((time.time() + self.delay, key))
+                self._condition.notify()
+            self._pending[key] = outcome_request
+
+    def flush(self, timeout=None):
+        '''
+        Post every queued request without waiting out the delay, and wait
+        until they have been posted. Returns whether the queue emptied
+        within ``timeout`` seconds.
+        '''
+        deadline = None if timeout is None else time.time() + timeout
+        with self._condition:
+            self._due = deque((0, key) for _, key in self._due)
+            self._condition.notify_all()
+            while self._pending or self._in_flight:
+                remaining = None if deadline is None else \
+                    deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            return not self._pending and not self._in_flight
+
+    def close(self, timeout=None):
+        '''
+        Flush the queue and stop the worker threads.
+        '''
+        flushed = self.flush(timeout)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        return flushed
+
+    def metrics(self):
+        '''
+        Return a snapshot of ``counts``, with the number of requests
+        ``pending`` and ``in_flight``.
+        '''
+        with self._condition:
+            metrics = dict(self.counts)
+            metrics['pending'] = len(self._pending)
+            metrics['in_flight'] = len(self._in_flight)
+            return metrics
+
+    def _start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work,
+                                      name='OutcomeQueue-{0}'.format(i))
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def _next(self):
+        with self._condition:
+            while True:
+                if self._due:
+                    due, key = self._due[0]
+                    wait = due - time.time()
+                    if wait <= 0:
+                        self._due.popleft()
+                        self._in_flight.add(key)
+                        return key, self._pending.pop(key)
+                elif self._closed:
+                    return None, None
+                else:
+                    wait = None
+                self._condition.wait(wait)
+
+    def _work(self):
+        while True:
+            key, outcome_request = self._next()
+            if outcome_request is None:
+                return
+            response = error = None
+            try:
+                response = outcome_request.post_outcome_request()
+            except Exception as e:
+                error = e
+            for hook in self.hooks:
+                try:
+                    hook(outcome_request, response, error)
+                except Exception:
+                    log.exception('OutcomeQueue hook %r failed', hook)
+            with self._condition:
+                self._in_flight.discard(key)
+                self.counts['posted' if error is None else 'failed'] += 1
+                if key in self._pending:
+                    # a newer write came in while this one was in flight
+                    self._due.append((time.time() + self.delay, key))
+                self._condition.notify_all()
@@ -1,16 +1,23 @@
+import re
+import time
 from collections import defaultdict
-from lxml import etree, objectify
+from lxml import etree
 
 import requests
+
 from requests_oauthlib import OAuth1
 from requests_oauthlib.oauth1_auth import SIGNATURE_TYPE_AUTH_HEADER
 
-from .outcome_response import OutcomeResponse
-from .utils import InvalidLTIConfigError
+from .outcome_response import (OUTCOME_NAMESPACE, OutcomeResponse,
+                               format_score)
+from .transport import DEFAULT_TRANSPORT, CircuitOpenError
+from .utils import (InvalidLTIConfigError, InvalidOutcomeRequestError,
+                    xml_parser)
 
 REPLACE_REQUEST = 'replaceResult'
 DELETE_REQUEST = 'deleteResult'
 READ_REQUEST = 'readResult'
+OPERATIONS = (REPLACE_REQUEST, DELETE_REQUEST, READ_REQUEST)
 
 VALID_ATTRIBUTES = [
     'operation',
@@ -22,9 +29,88 @@ VALID_ATTRIBUTES = [
     'lis_result_sourcedid',
     'consumer_key',
     'consumer_secret',
+    'consumer_registry',
+    'transport',
+    'retry_policy',
+    'circuit_breaker',
+    'rate_limiter',
+    'outcome_cache',
     'post_request'
 ]
 
+try:
+    text_type = unicode
+except NameError:
+    text_type = str  # Python 3
+
+try:
+    # characters that lxml refuses in text
+    _INVALID_XML_CHARS = re.compile(
+        u'[^\t\n\r\x20-\ud7ff\ue000-\ufffd\U00010000-\U0010ffff]')
+except re.error:
+    # narrow Python 2 build: leave characters outside the BMP to lxml
+    _INVALID_XML_CHARS = re.compile(u'[^\t\n\r\x20-\ud7ff\ue000-\ufffd]')
+
+# the elements process_xml reads, by the tag of the root element, with or
+# without the namespace: the name under which each is kept, and the tag
+# its parent must have
+_REQUEST_ELEMENTS = {}
+for _prefix in ('{' + OUTCOME_NAMESPACE + '}', ''):
+    _elements = {
+        'imsx_messageIdentifier': ('message_identifier',
+                                   'imsx_POXRequestHeaderInfo'),
+        'sourcedId': ('lis_result_sourcedid', 'sourcedGUID'),
+        'textString': ('score', 'resultScore'),
+        'text': ('text', 'resultData'),
+        'url': ('url', 'resultData'),
+    }
+    for _operation in OPERATIONS:
+        _elements[_operation + 'Request'] = (_operation, 'imsx_POXBody')
+    _REQUEST_ELEMENTS[_prefix + 'imsx_POXEnvelopeRequest'] = dict(
+        (_prefix + tag, (name, _prefix + parent))
+        for tag, (name, parent) in _elements.items())
+del _prefix, _elements, _operation
+
+# generate_request_xml output for each operation, around the parts that vary
+_REQUEST_XML_HEAD = (
+    u"<?xml version='1.0' encoding='utf-8'?>\n"
+    u'<imsx_POXEnvelopeRequest '
+    u'xmlns="http://www.imsglobal.org/services/ltiv1p1/xsd/imsoms_v1p0">'
+    u'<imsx_POXHeader><imsx_POXRequestHeaderInfo>'
+    u'<imsx_version>V1.0</imsx_version>')
+_REQUEST_XML_BODY = dict((operation, (
+    u'</imsx_POXRequestHeaderInfo></imsx_POXHeader><imsx_POXBody>'
+    u'<{0}Request><resultRecord><sourcedGUID>'.format(operation),
+    u'</resultRecord></{0}Request></imsx_POXBody>'
+    u'</imsx_POXEnvelopeRequest>'.format(operation)))
+    for operation in (REPLACE_REQUEST, DELETE_REQUEST, READ_REQUEST))
+
+
+class _TreeNeeded(Exception):
+    '''
+    The request XML cannot be filled into a template, and has to be built
+    by lxml, which may refuse it.
+    '''
+
+
+def _xml_element(tag, text):
+    # an element as lxml serializes it
+    if text is None:
+        return u'<{0}/>'.format(tag)
+    if not isinstance(text, text_type):
+        if text_type is str or not isinstance(text, str):
+            raise _TreeNeeded
+        try:
+            text = text.decode('ascii')  # Python 2
+        except UnicodeDecodeError:
+            raise _TreeNeeded
+    if _INVALID_XML_CHARS.search(text):
+        raise _TreeNeeded
+    return u'<{0}>{1}</{0}>'.format(tag, text.replace(u'&', u'&amp;')
+                                    .replace(u'<', u'&lt;')
+                                    .replace(u'>', u'&gt;')
+                                    .replace(u'\r', u'&#13;'))
+
 
 class OutcomeRequest(object):
     '''
@@ -36,6 +122,15 @@ class OutcomeRequest(object):
     This class can be used both by Tool Providers and Tool Consumers, though
     they each use it differently. The TP will use it to POST an OAuth-signed
     request to the TC. A TC will use it to parse such a request from a TP.
+
+    Without a consumer_secret, requests are signed with the secret the
+    consumer_registry prefers for the consumer_key. They are sent through
+    the transport, an OutcomeTransport, if one is given, and retried as
+    the retry_policy, a RetryPolicy, allows. A circuit_breaker, a
+    CircuitBreaker, stops requests to a host that keeps failing, and a
+    rate_limiter, a RateLimiter, holds each request back until the host
+    may take another. With an outcome_cache, an OutcomeCache, requests
+    that would not change anything are not sent.
     '''
     def __init__(self, opts=defaultdict(lambda: None)):
         # Initialize all our accessors to None
@@ -76,6 +171,10 @@ class OutcomeRequest(object):
             'text' : str text
             'url' : str url
         '''
+        self._set_replace_result(score, result_data)
+        return self.post_outcome_request()
+
+    def _set_replace_result(self, score, result_data):
         self.operation = REPLACE_REQUEST
         self.score = score
         self.result_data = result_data
@@ -88,10 +187,6 @@ class OutcomeRequest(object):
                 error_msg = ('Dictionary result_data can only have the key '
                              '"text" or the key "url".')
                 raise InvalidLTIConfigError(error_msg)
-            else:
-                return self.post_outcome_request()
-        else:
-            return self.post_outcome_request()
 
     def post_delete_result(self):
         '''
@@ -131,68 +226,207 @@ class OutcomeRequest(object):
     def post_outcome_request(self, **kwargs):
         '''
         POST an OAuth signed request to the Tool Consumer.
+
+        With a retry_policy or circuit_breaker, connection errors and
+        timeouts do not raise, but are the ``error`` of the returned
+        OutcomeResponse.
+        '''
+        self._check_required_attributes()
+        cache = self.outcome_cache
+        if cache is not None:
+            outcome_resp = cache.lookup(self)
+            if outcome_resp is not None:
+                self.outcome_response = outcome_resp
+                return self.outcome_response
+        if self.retry_policy is None and self.circuit_breaker is None:
+            outcome_resp = self._post(**kwargs)
+        else:
+            outcome_resp = self._post_with_retries(**kwargs)
+        if cache is not None:
+            cache.store(self, outcome_resp)
+        self.outcome_response = outcome_resp
+        return self.outcome_response
+
+    def _post(self, **kwargs):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(self.lis_outcome_service_url,
+                                      self.consumer_key)
+        headers = {'Content-type': 'application/xml'}
+        transport = self.transport or DEFAULT_TRANSPORT
+        resp = transport.post(self.lis_outcome_service_url,
+                              auth=self._oauth(**kwargs),
+                              data=self.generate_request_xml(),
+                              headers=headers)
+        return OutcomeResponse.from_post_response(resp, resp.content)
+
+    def _post_with_retries(self, **kwargs):
+        url = self.lis_outcome_service_url
+        retry_policy = self.retry_policy
+        breaker = self.circuit_breaker
+        attempts = 0
+        while True:
+            if breaker is not None and not breaker.allow(url):
+                outcome_resp = OutcomeResponse(error=CircuitOpenError(url))
+                break
+            attempts += 1
+            outcome_resp = error = None
+            try:
+                outcome_resp = self._post(**kwargs)
+            except requests.RequestException as e:
+                error = e
+                outcome_resp = OutcomeResponse(error=e)
+            except BaseException:
+                # the host never saw the request, such as when its XML
+                # could not be built, so it does not count for the circuit
+                if breaker is not None:
+                    breaker.release(url)
+                raise
+            if breaker is not None:
+                breaker.record(url, outcome_resp, error)
+            if retry_policy is None or attempts >= retry_policy.attempts or \
+                    not retry_policy.should_retry(outcome_resp, error):
+                break
+            time.sleep(retry_policy.delay(attempts))
+        outcome_resp.attempts = attempts
+        return outcome_resp
+
+    def prepare_outcome_request(self, **kwargs):
+        '''
+        Build the OAuth signed request that post_outcome_request would POST,
+        as a ``requests.PreparedRequest``, for sending some other way.
         '''
+        self._check_required_attributes()
+        return requests.Request(
+            'POST', self.lis_outcome_service_url,
+            auth=self._oauth(**kwargs), data=self.generate_request_xml(),
+            headers={'Content-type': 'application/xml'}).prepare()
+
+    def _check_required_attributes(self):
         if not self.has_required_attributes():
             raise InvalidLTIConfigError(
                 'OutcomeRequest does not have all required attributes')
 
-        header_oauth = OAuth1(self.consumer_key, self.consumer_secret,
-                              signature_type=SIGNATURE_TYPE_AUTH_HEADER,
-                              force_include_body=True, **kwargs)
-
-        headers = {'Content-type': 'application/xml'}
-        resp = requests.post(self.lis_outcome_service_url, auth=header_oauth,
-                             data=self.generate_request_xml(),
-                             headers=headers)
-        outcome_resp = OutcomeResponse.from_post_response(resp, resp.content)
-        self.outcome_response = outcome_resp
-        return self.outcome_response
+    def _oauth(self, **kwargs):
+        return OAuth1(self.consumer_key, self.signing_secret(),
+                      signature_type=SIGNATURE_TYPE_AUTH_HEADER,
+                      force_include_body=True, **kwargs)
 
     def process_xml(self, xml):
         '''
-        Parse Outcome Request data from XML.
+        Parse Outcome Request data from XML, raising an
+        InvalidOutcomeRequestError if it is malformed.
         '''
-        root = objectify.fromstring(xml)
-        self.message_identifier = str(
-            root.imsx_POXHeader.imsx_POXRequestHeaderInfo.
-            imsx_messageIdentifier)
-        try:
-            result = root.imsx_POXBody.replaceResultRequest
-            self.operation = REPLACE_REQUEST
-            # Get result sourced id from resultRecord
-            self.lis_result_sourcedid = result.resultRecord.\
-                sourcedGUID.sourcedId
-            self.score = str(result.resultRecord.result.
-                             resultScore.textString)
-        except:
-            pass
-
         try:
-            result = root.imsx_POXBody.deleteResultRequest
-            self.operation = DELETE_REQUEST
-            # Get result sourced id from resultRecord
-            self.lis_result_sourcedid = result.resultRecord.\
-                sourcedGUID.sourcedId
-        except:
-            pass
-
-        try:
-            result = root.imsx_POXBody.readResultRequest
-            self.operation = READ_REQUEST
-            # Get result sourced id from resultRecord
-            self.lis_result_sourcedid = result.resultRecord.\
-                sourcedGUID.sourcedId
-        except:
-            pass
+            root = etree.fromstring(xml, xml_parser())
+        except (etree.XMLSyntaxError, ValueError) as e:
+            raise InvalidOutcomeRequestError('Malformed XML: {0}'.format(e))
+        if root.getroottree().docinfo.doctype:
+            raise InvalidOutcomeRequestError('A DOCTYPE is not allowed')
+        elements = _REQUEST_ELEMENTS.get(root.tag)
+        if elements is None:
+            raise InvalidOutcomeRequestError(
+                'Not an imsx_POXEnvelopeRequest: {0}'.format(root.tag))
+
+        # a single walk over the elements that matter, in document order
+        found = {}
+        operation = None
+        for element in root.iter(*elements):
+            name, parent = elements[element.tag]
+            if element.getparent().tag != parent:
+                # the same tag elsewhere, as in the resultTotalScore that
+                # Canvas adds, is an extension this does not read
+                continue
+            if name in OPERATIONS:
+                if operation is not None:
+                    raise InvalidOutcomeRequestError(
+                        'More than one operation')
+                operation = name
+            elif name in found:
+                raise InvalidOutcomeRequestError(
+                    'More than one {0}'.format(element.tag))
+            elif name != 'message_identifier' and operation is None:
+                raise InvalidOutcomeRequestError(
+                    'Outside of an operation: {0}'.format(element.tag))
+            else:
+                found[name] = element.text or ''
+
+        if 'message_identifier' not in found:
+            raise InvalidOutcomeRequestError('No imsx_messageIdentifier')
+        if operation is None:
+            raise InvalidOutcomeRequestError('No supported operation')
+        if not found.get('lis_result_sourcedid'):
+            raise InvalidOutcomeRequestError('No sourcedId')
+
+        self.message_identifier = found['message_identifier']
+        self.operation = operation
+        self.lis_result_sourcedid = found['lis_result_sourcedid']
+        if operation == REPLACE_REQUEST:
+            self.score = found.get('score')
+            self.result_data = dict(
+                (key, found[key]) for key in ('text', 'url')
+                if key in found) or None
+
+    def signing_secret(self):
+        '''
+        The secret to sign with, from the consumer_registry if no
+        consumer_secret was given.
+        '''
+        if self.consumer_secret is None and \
+                self.consumer_registry is not None:
+            return self.consumer_registry.secret(self.consumer_key)
+        return self.consumer_secret
 
     def has_required_attributes(self):
         return self.consumer_key is not None\
-            and self.consumer_secret is not None\
+            and self.signing_secret() is not None\
             and self.lis_outcome_service_url is not None\
             and self.lis_result_sourcedid is not None\
             and self.operation is not None
 
     def generate_request_xml(self):
+        '''
+        The XML of the request, as UTF-8 bytes.
+        '''
+        try:
+            return self._template_request_xml()
+        except _TreeNeeded:
+            return self._tree_request_xml()
+
+    def _template_request_xml(self):
+        # the output of _tree_request_xml, without building a tree
+        body = _REQUEST_XML_BODY.get(self.operation)
+        if body is None:
+            raise _TreeNeeded
+        parts = [_REQUEST_XML_HEAD,
+                 _xml_element('imsx_messageIdentifier',
+                              self.message_identifier),
+                 body[0],
+                 _xml_element('sourcedId', self.lis_result_sourcedid),
+                 u'</sourcedGUID>']
+        if self.score is not None:
+            parts.append(u'<result><resultScore><language>en</language>')
+            parts.append(_xml_element('textString',
+                                      format_score(self.score)))
+            parts.append(u'</resultScore>')
+            if self.result_data:
+                if 'text' in self.result_data:
+                    parts.append(u'<resultData>')
+                    parts.append(_xml_element('text',
+                                              self.result_data['text']))
+                    parts.append(u'</resultData>')
+                elif 'url' in self.result_data:
+                    parts.append(u'<resultData>')
+                    parts.append(_xml_element('url', self.result_data['url']))
+                    parts.append(u'</resultData>')
+                else:
+                    parts.append(u'<resultData/>')
+            parts.append(u'</result>')
+        elif self.result_data:
+            raise _TreeNeeded
+        parts.append(body[1])
+        return u''.join(parts).encode('utf-8')
+
+    def _tree_request_xml(self):
         root = etree.Element(
             'imsx_POXEnvelopeRequest',
             xmlns='http://www.imsglobal.org/services/ltiv1p1/xsd/imsoms_v1p0')
@@ -220,7 +454,7 @@ class OutcomeRequest(object):
             language = etree.SubElement(result_score, 'language')
             language.text = 'en'
             text_string = etree.SubElement(result_score, 'textString')
-            text_string.text = self.score.__str__()
+            text_string.text = format_score(self.score)
 
         if self.result_data:
             resultData = etree.SubElement(result, 'resultData')
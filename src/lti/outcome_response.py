@@ -1,5 +1,7 @@
-from lxml import etree, objectify
-from .utils import InvalidLTIConfigError
+from lxml import etree
+from .utils import InvalidLTIConfigError, xml_parser
+
+OUTCOME_NAMESPACE = 'http://www.imsglobal.org/services/ltiv1p1/xsd/imsoms_v1p0'
 
 CODE_MAJOR_CODES = [
     'success',
@@ -24,9 +26,41 @@ VALID_ATTRIBUTES = [
     'severity',
     'description',
     'operation',
-    'message_ref_identifier'
+    'message_ref_identifier',
+    'attempts',
+    'error'
 ]
 
+# the elements process_xml reads, by the tag of the root element, with or
+# without the namespace: the attribute each is kept in, and the tag its
+# parent must have
+_RESPONSE_ELEMENTS = {}
+for _prefix in ('{' + OUTCOME_NAMESPACE + '}', ''):
+    _RESPONSE_ELEMENTS[_prefix + 'imsx_POXEnvelopeResponse'] = dict(
+        (_prefix + tag, (name, _prefix + parent)) for tag, name, parent in (
+            ('imsx_messageIdentifier', 'message_identifier',
+             'imsx_POXResponseHeaderInfo'),
+            ('imsx_codeMajor', 'code_major', 'imsx_statusInfo'),
+            ('imsx_severity', 'severity', 'imsx_statusInfo'),
+            ('imsx_description', 'description', 'imsx_statusInfo'),
+            ('imsx_messageRefIdentifier', 'message_ref_identifier',
+             'imsx_statusInfo'),
+            ('imsx_operationRefIdentifier', 'operation', 'imsx_statusInfo'),
+            ('textString', 'score', 'resultScore'),
+        ))
+del _prefix
+
+
+def format_score(score):
+    '''
+    The text of a score in outcome XML. Strings are written as they are
+    and floats with repr, which, unlike str on Python 2, parses back to
+    the same float.
+    '''
+    if isinstance(score, float):
+        return repr(score)
+    return score.__str__()
+
 
 class OutcomeResponse(object):
     '''
@@ -42,6 +76,15 @@ class OutcomeResponse(object):
     each will use it differently. TPs will use it to partse the result of an
     OutcomeRequest to the TC. A TC will use it to generate proper response XML
     to send back to a TP.
+
+    When an OutcomeRequest is posted with a retry policy or circuit breaker,
+    ``attempts`` is the number of times it was sent, and ``error`` the
+    exception, such as a CircuitOpenError, that kept the last attempt from
+    getting a response.
+
+    Parsed responses hold plain strings, but for the ``score`` of a
+    readResult response, which is a float, or None if the LMS has no score
+    or sent something other than a number.
     '''
     def __init__(self, **kwargs):
         # Initialize all class accessors to None
@@ -89,36 +132,34 @@ class OutcomeResponse(object):
 
     def process_xml(self, xml):
         '''
-        Parse OutcomeResponse data form XML.
+        Parse OutcomeResponse data from XML. Whatever is missing, or cannot
+        be parsed at all, is left as None.
         '''
         try:
-            root = objectify.fromstring(xml)
-            # Get message idenifier from header info
-            self.message_identifier = root.imsx_POXHeader.\
-                imsx_POXResponseHeaderInfo.\
-                imsx_messageIdentifier
-
-            status_node = root.imsx_POXHeader.\
-                imsx_POXResponseHeaderInfo.\
-                imsx_statusInfo
-
-            # Get status parameters from header info status
-            self.code_major = status_node.imsx_codeMajor
-            self.severity = status_node.imsx_severity
-            self.description = status_node.imsx_description
-            self.message_ref_identifier = str(
-                status_node.imsx_messageRefIdentifier)
-            self.operation = status_node.imsx_operationRefIdentifier
-
+            root = etree.fromstring(xml, xml_parser())
+        except (etree.XMLSyntaxError, ValueError):
+            # not XML, such as the error page of a proxy
+            return
+        elements = _RESPONSE_ELEMENTS.get(root.tag)
+        if elements is None or root.getroottree().docinfo.doctype:
+            return
+
+        # a single walk over the elements that matter, in document order
+        found = {}
+        for element in root.iter(*elements):
+            name, parent = elements[element.tag]
+            if name not in found and element.getparent().tag == parent:
+                found[name] = element.text or ''
+
+        score = found.pop('score', None)
+        for name, value in found.items():
+            setattr(self, name, value)
+        if score is not None:
             try:
-                # Try to get the score
-                self.score = str(root.imsx_POXBody.readResultResponse.
-                                 result.resultScore.textString)
-            except AttributeError:
-                # Not a readResult, just ignore!
+                self.score = float(score)
+            except ValueError:
+                # an empty textString: there is no score
                 pass
-        except:
-            pass
 
     def generate_response_xml(self):
         '''
@@ -126,7 +167,7 @@ class OutcomeResponse(object):
         '''
         root = etree.Element(
             'imsx_POXEnvelopeResponse',
-            xmlns='http://www.imsglobal.org/services/ltiv1p1/xsd/imsoms_v1p0')
+            xmlns=OUTCOME_NAMESPACE)
 
         header = etree.SubElement(root, 'imsx_POXHeader')
         header_info = etree.SubElement(header, 'imsx_POXResponseHeaderInfo')
@@ -155,12 +196,12 @@ class OutcomeResponse(object):
         response = etree.SubElement(body, '%s%s' % (self.operation,
                                                     'Response'))
 
-        if self.score:
+        if self.score is not None:
             result = etree.SubElement(response, 'result')
             result_score = etree.SubElement(result, 'resultScore')
             language = etree.SubElement(result_score, 'language')
             language.text = 'en'
             text_string = etree.SubElement(result_score, 'textString')
-            text_string.text = str(self.score)
+            text_string.text = format_score(self.score)
 
         return etree.tostring(root, xml_declaration=True)
@@ -0,0 +1,93 @@
+from collections import namedtuple
+
+from .utils import lru_cache
+
+CONTEXT_SCOPE = 'context'
+INSTITUTION_SCOPE = 'institution'
+SYSTEM_SCOPE = 'system'
+
+ROLE_URN_PREFIXES = [
+    ('urn:lti:role:ims/lis/', CONTEXT_SCOPE),
+    ('urn:lti:instrole:ims/lis/', INSTITUTION_SCOPE),
+    ('urn:lti:sysrole:ims/lis/', SYSTEM_SCOPE),
+]
+
+# Number of distinct role strings kept parsed for the whole process
+ROLE_CACHE_SIZE = 1024
+
+
+class Role(namedtuple('Role', ['scope', 'name', 'sub_role', 'urn'])):
+    '''
+    A parsed LIS role.
+
+    Names are lowercased so comparisons are case insensitive. Simple names
+    such as ``Instructor`` are context roles, as in the LTI 1.1 spec, but
+    have ``urn`` set to False so they can also match roles in other scopes.
+    Unrecognized URNs keep the whole URN as their name and have no scope.
+    '''
+
+
+@lru_cache(maxsize=ROLE_CACHE_SIZE)
+def parse_role(role):
+    '''
+    Parse a role, given either as a simple name or as a full LIS URN like
+    ``urn:lti:role:ims/lis/TeachingAssistant/TeachingAssistantSection``.
+    '''
+    role = role.strip().lower()
+    for prefix, scope in ROLE_URN_PREFIXES:
+        if role.startswith(prefix):
+            name, _, sub_role = role[len(prefix):].partition('/')
+            return Role(scope, name, sub_role or None, True)
+    if role.startswith('urn:'):
+        return Role(None, role, None, True)
+    name, _, sub_role = role.partition('/')
+    return Role(CONTEXT_SCOPE, name, sub_role or None, False)
+
+
+class RoleSet(object):
+    '''
+    The roles of a single launch, indexed for constant time lookups.
+    '''
+
+    def __init__(self, roles=()):
+        self.source = roles
+        self.roles = tuple(parse_role(r) for r in roles if r.strip())
+        self.names = frozenset(r.name for r in self.roles)
+        self._named_sub_roles = frozenset(
+            (r.name, r.sub_role) for r in self.roles)
+        self._scoped = frozenset((r.scope, r.name) for r in self.roles)
+        self._scoped_sub_roles = frozenset(
+            (r.scope, r.name, r.sub_role) for r in self.roles)
+
+    def has_role(self, role, scope=None):
+        '''
+        Check for a role.
+
+        A simple name matches that role in any scope unless ``scope`` is
+        given, while a URN only matches a role in the same scope. A role with
+        a sub-role only matches that sub-role; one without matches any.
+        '''
+        parsed = parse_role(role)
+        if scope is None and not parsed.urn:
+            if parsed.sub_role is None:
+                return parsed.name in self.names
+            return (parsed.name, parsed.sub_role) in self._named_sub_roles
+        scope = scope or parsed.scope
+        if parsed.sub_role is None:
+            return (scope, parsed.name) in self._scoped
+        return (scope, parsed.name, parsed.sub_role) in self._scoped_sub_roles
+
+    def has_any_role(self, roles, scope=None):
+        return any(self.has_role(r, scope) for r in roles)
+
+    def in_scope(self, scope):
+        '''
+        Return the names of the roles held in the given scope.
+        '''
+        return frozenset(r.name for r in self.roles if r.scope == scope)
+
+    def __iter__(self):
+        return iter(self.roles)
+
+    def __len__(self):
+        return len(self.roles)
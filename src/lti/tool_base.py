@@ -1,9 +1,51 @@
+import weakref
 
-from .launch_params import LaunchParams, valid_param
+from .launch_params import LaunchParams, LAUNCH_PARAM_SCHEMA
+from .roles import CONTEXT_SCOPE, RoleSet
 
 ROLES_STUDENT = ['student', 'learner']
 ROLES_INSTRUCTOR = ['instructor', 'faculty', 'staff']
 
+_SPEC_PARAMS = LAUNCH_PARAM_SCHEMA.params
+_DYNAMIC_PREFIXES = LAUNCH_PARAM_SCHEMA.prefixes
+
+# the attribute names declared by each tool class, such as launch_url
+_declared_names = weakref.WeakKeyDictionary()
+
+
+def _class_names(cls):
+    names = _declared_names.get(cls)
+    if names is None:
+        names = _declared_names[cls] = frozenset(dir(cls))
+    return names
+
+
+class LaunchParamAttribute(object):
+    '''
+    Data descriptor exposing a spec launch param as a tool attribute.
+
+    Reading an unset param gives None, like any other valid launch param.
+    '''
+
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        try:
+            # the name is known to be valid, so skip the validating
+            # __getitem__ and read the value directly
+            return instance.launch_params._param_value(self.name)
+        except KeyError:
+            return None
+
+    def __set__(self, instance, value):
+        instance.launch_params[self.name] = value
+
+    def __delete__(self, instance):
+        del instance.launch_params[self.name]
+
 
 class ToolBase(object):
 
@@ -18,32 +60,66 @@ class ToolBase(object):
         if isinstance(params, LaunchParams):
             self.launch_params = params
         else:
-            self.launch_params = LaunchParams(params)
+            # subclasses such as ToolProvider may extend the schema
+            launch_params_class = getattr(self, 'launch_params_class',
+                                          LaunchParams)
+            self.launch_params = launch_params_class(params)
 
     def __getattr__(self, attr):
-        if not valid_param(attr):
+        # Only reached when normal lookup fails, so spec params (which are
+        # descriptors) and instance attributes never get here. What is left
+        # are the dynamic custom_ and ext_ params and any extra params
+        # accepted by the schema of the launch params.
+        launch_params = self.__dict__.get('launch_params')
+        if launch_params is None or not launch_params.valid_param(attr):
             raise AttributeError(
                 "{} is not a valid launch param attribute".format(attr))
         try:
-            return self.launch_params[attr]
+            return launch_params._param_value(attr)
         except KeyError:
             return None
 
     def __setattr__(self, key, value):
-        if valid_param(key):
+        # spec params are descriptors and never land in the instance dict,
+        # so an attribute found there is rewritten in place
+        instance_dict = self.__dict__
+        if key in instance_dict:
+            instance_dict[key] = value
+            return
+        if key in _SPEC_PARAMS or key.startswith(_DYNAMIC_PREFIXES):
             self.launch_params[key] = value
+            return
+        # an extended schema may accept more params, as in __getattr__, but
+        # attributes the class declares, such as launch_url, stay its own
+        launch_params = instance_dict.get('launch_params')
+        if launch_params is not None and \
+                key not in _class_names(type(self)) and \
+                launch_params.valid_param(key):
+            launch_params[key] = value
         else:
-            self.__dict__[key] = value
-
-    def has_role(self, role):
-        return self.launch_params.get('roles') and any(
-               x.lower() == role.lower() for x in self.launch_params['roles'])
-
+            instance_dict[key] = value
+
+    @property
+    def role_set(self):
+        '''
+        The parsed roles of the launch, rebuilt only when ``roles`` changes.
+        '''
+        roles = self.launch_params.get('roles') or ()
+        role_set = self.__dict__.get('_role_set')
+        if role_set is None or role_set.source is not roles:
+            role_set = self.__dict__['_role_set'] = RoleSet(roles)
+        return role_set
+
+    def has_role(self, role, scope=None):
+        return self.role_set.has_role(role, scope)
+
+    # only roles in the context count: an institution role such as Faculty
+    # says nothing about what the user may do in this course
     def is_student(self):
-        return any(self.has_role(x) for x in ROLES_STUDENT)
+        return self.role_set.has_any_role(ROLES_STUDENT, CONTEXT_SCOPE)
 
     def is_instructor(self):
-        return any(self.has_role(x) for x in ROLES_INSTRUCTOR)
+        return self.role_set.has_any_role(ROLES_INSTRUCTOR, CONTEXT_SCOPE)
 
     def is_launch_request(self):
         msg_type = self.launch_params.get('lti_message_type')
@@ -72,9 +148,13 @@ class ToolBase(object):
         return getattr(self, 'ext_' + key)
 
     def to_params(self):
-        params = dict(self.launch_params)
-        # stringify any list values
-        for k, v in params.items():
-            if isinstance(v, list):
-                params[k] = ','.join(v)
-        return params
+        return self.launch_params.to_params()
+
+    def to_body(self):
+        return self.launch_params.to_body()
+
+
+for _param in _SPEC_PARAMS:
+    if not hasattr(ToolBase, _param):
+        setattr(ToolBase, _param, LaunchParamAttribute(_param))
+del _param
@@ -1,4 +1,5 @@
 
+from oauthlib.oauth1.rfc5849 import CONTENT_TYPE_FORM_URLENCODED
 from requests import Request
 from requests_oauthlib import OAuth1
 from requests_oauthlib.oauth1_auth import SIGNATURE_TYPE_BODY
@@ -43,8 +44,9 @@ class ToolOutbound(ToolBase):
                 + str(LAUNCH_PARAMS_REQUIRED)
             )
 
-        params = self.to_params()
-        r = Request('POST', self.launch_url, data=params).prepare()
+        r = Request('POST', self.launch_url, data=self.to_body(),
+                    headers={'Content-Type': CONTENT_TYPE_FORM_URLENCODED}
+                    ).prepare()
         sign = OAuth1(self.consumer_key, self.consumer_secret,
                                 signature_type=SIGNATURE_TYPE_BODY, **kwargs)
         return sign(r)
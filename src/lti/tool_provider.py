@@ -1,12 +1,14 @@
-from .utils import InvalidLTIRequestError
-from .launch_params import LaunchParams
+import sys
+
+from .utils import InvalidLTIConfigError, InvalidLTIRequestError
+from .launch_params import LaunchParams, LazyLaunchParams
 from .tool_base import ToolBase
+from .launch_verifier import LaunchVerifier
 
-from oauthlib.oauth1 import SignatureOnlyEndpoint
 from oauthlib.oauth1.rfc5849 import CONTENT_TYPE_FORM_URLENCODED
 from requests.structures import CaseInsensitiveDict
 
-from .outcome_request import OutcomeRequest
+from .outcome_request import DELETE_REQUEST, OutcomeRequest
 from collections import defaultdict
 
 try:
@@ -20,13 +22,48 @@ except ImportError:
 class ToolProvider(ToolBase):
     '''
     Implements the LTI Tool Provider.
+
+    Set consumer_registry to a ConsumerRegistry to verify launches and sign
+    outcome requests with the secrets it holds, and outcome_transport to an
+    OutcomeTransport such as a SessionTransport to send outcome requests
+    over pooled connections. Set outcome_retry_policy to a RetryPolicy and
+    outcome_circuit_breaker to a CircuitBreaker to retry outcome requests
+    that fail and to stop sending them to an LMS that is down, and
+    outcome_rate_limiter to a RateLimiter to keep within the rate each LMS
+    accepts. Set outcome_cache to an OutcomeCache to skip posting scores
+    that are unchanged and reuse recent readResult responses.
+
+    Set outcome_queue to an OutcomeQueue to post replaceResult and
+    deleteResult requests in the background, or to an Outbox to save them
+    for a worker to post. post_replace_result and post_delete_result then
+    return None at once.
     '''
     launch_params_class = LaunchParams
+    # None for a LazyLaunchParams accepting what launch_params_class does
+    lazy_launch_params_class = None
+    launch_url = None
+    launch_headers = None
+    consumer_registry = None
+    outcome_transport = None
+    outcome_retry_policy = None
+    outcome_circuit_breaker = None
+    outcome_rate_limiter = None
+    outcome_cache = None
+    outcome_queue = None
 
     @classmethod
     def from_unpacked_request(cls, secret, params, url, headers):
-
-        launch_params = cls.launch_params_class(params)
+        '''
+        Create a ToolProvider from the parts of a launch request. The params
+        may be a mapping, or the raw urlencoded request body as bytes, in
+        which case values are only decoded as they are read.
+        '''
+        if isinstance(params, bytes):
+            lazy_class = cls.lazy_launch_params_class or \
+                LazyLaunchParams.for_class(cls.launch_params_class)
+            launch_params = lazy_class.from_body(params)
+        else:
+            launch_params = cls.launch_params_class(params)
 
         if 'oauth_consumer_key' not in launch_params:
             raise InvalidLTIRequestError("oauth_consumer_key not found!")
@@ -47,23 +84,38 @@ class ToolProvider(ToolBase):
         if 'Content-Type' not in self.launch_headers:
             self.launch_headers['Content-Type'] = CONTENT_TYPE_FORM_URLENCODED
 
-    def is_valid_request(self, validator):
-        validator = ProxyValidator(validator)
-        endpoint = SignatureOnlyEndpoint(validator)
-
-        valid, request = endpoint.validate_request(
-            self.launch_url,
-            'POST',
-            self.to_params(),
-            self.launch_headers
-        )
+    def is_valid_request(self, validator=None):
+        '''
+        Check the launch signature. The validator is either an oauthlib
+        RequestValidator or, to avoid setting up oauthlib on every launch, a
+        LaunchVerifier created once and shared. Without one, the launch is
+        checked against the consumer_registry.
+        '''
+        return self.verify_launch(validator).valid
 
-        if valid and not self.consumer_key and not self.consumer_secret:
+    def verify_launch(self, validator=None):
+        '''
+        Like is_valid_request, but returns the VerificationResult, whose
+        reason says why an invalid launch was rejected. A
+        StagedLaunchVerifier gives the most precise reasons.
+        '''
+        if validator is None:
+            if self.consumer_registry is None:
+                raise InvalidLTIConfigError(
+                    'is_valid_request needs a validator or consumer_registry')
+            verifier = self.consumer_registry.verifier
+        elif isinstance(validator, LaunchVerifier):
+            verifier = validator
+        else:
+            verifier = LaunchVerifier(validator)
+        result = verifier.verify(self)
+
+        if result.valid and not self.consumer_key and not self.consumer_secret:
             # Gather the key and secret
             self.consumer_key = self.launch_params['oauth_consumer_key']
-            self.consumer_secret = validator.secret
+            self.consumer_secret = result.consumer_secret
 
-        return valid
+        return result
 
     def is_outcome_service(self):
         '''
@@ -128,12 +180,22 @@ class ToolProvider(ToolBase):
             'text' : str text
             'url' : str url
         '''
+        if self.outcome_queue is not None:
+            request = self.new_request(outcome_opts)
+            request._set_replace_result(score, result_data)
+            self.outcome_queue.put(request)
+            return None
         return self.new_request(outcome_opts).post_replace_result(score, result_data)
 
     def post_delete_result(self, outcome_opts=defaultdict(lambda: None)):
         '''
         POSTs a delete request to the Tool Consumer.
         '''
+        if self.outcome_queue is not None:
+            request = self.new_request(outcome_opts)
+            request.operation = DELETE_REQUEST
+            self.outcome_queue.put(request)
+            return None
         return self.new_request(outcome_opts).post_delete_result()
 
     def post_read_result(self, outcome_opts=defaultdict(lambda: None)):
@@ -162,6 +224,12 @@ class ToolProvider(ToolBase):
         opts.update({
             'consumer_key': self.consumer_key,
             'consumer_secret': self.consumer_secret,
+            'consumer_registry': self.consumer_registry,
+            'transport': self.outcome_transport,
+            'retry_policy': self.outcome_retry_policy,
+            'circuit_breaker': self.outcome_circuit_breaker,
+            'rate_limiter': self.outcome_rate_limiter,
+            'outcome_cache': self.outcome_cache,
             'lis_outcome_service_url': self.lis_outcome_service_url,
             'lis_result_sourcedid': self.lis_result_sourcedid
         })
@@ -170,6 +238,13 @@ class ToolProvider(ToolBase):
         return self._last_outcome_request
 
 
+if sys.version_info >= (3, 5):
+    # Coroutines live in their own module, which Python 2 cannot parse.
+    from .async_verifier import is_valid_request_async, verify_launch_async
+    ToolProvider.is_valid_request_async = is_valid_request_async
+    ToolProvider.verify_launch_async = verify_launch_async
+
+
 class ProxyValidator(object):
     '''
     Proxies a RequestValidator to save the client secret.
@@ -0,0 +1,347 @@
+import math
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from urllib.parse import urlsplit
+except ImportError:
+    # Python 2
+    from urlparse import urlsplit
+
+try:
+    # immune to changes of the system clock
+    _clock = time.monotonic
+except AttributeError:
+    # Python 2
+    _clock = time.time
+
+
+def _host(url):
+    # the host name without any user:password@ of the URL, which is the
+    # same server, and lowercased by urlsplit
+    parts = urlsplit(url)
+    return (parts.scheme.lower(), parts.hostname, parts.port)
+
+
+class OutcomeTransport(object):
+    '''
+    Sends the HTTP requests of OutcomeRequests.
+
+    This one posts each request with ``requests.post``, which opens a new
+    connection every time. The ``timeout`` is a number of seconds or a
+    ``(connect, read)`` tuple, as in requests; by default there is none.
+    '''
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout
+
+    def post(self, url, data=None, headers=None, auth=None):
+        return requests.post(url, data=data, headers=headers, auth=auth,
+                             timeout=self.timeout)
+
+    def close(self):
+        pass
+
+
+class SessionTransport(OutcomeTransport):
+    '''
+    Keeps a ``requests.Session`` for each outcome service host, so that
+    requests to the same host reuse open connections instead of setting
+    up a new TCP and TLS connection for every grade.
+
+    Up to ``pool_maxsize`` connections per host are kept alive. The
+    ``timeout`` is a number of seconds or a ``(connect, read)`` tuple, as
+    in requests. ``max_retries`` is passed to the requests HTTPAdapter.
+
+    One transport can be shared by every thread of a process.
+    '''
+
+    def __init__(self, pool_maxsize=10, timeout=(5, 30), max_retries=0):
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def create_session(self):
+        '''
+        Create the session for one host.
+        '''
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1,
+                              pool_maxsize=self.pool_maxsize,
+                              max_retries=self.max_retries)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    def session(self, url):
+        '''
+        Return the session for the host of a URL.
+        '''
+        key = _host(url)
+        session = self._sessions.get(key)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(key)
+                if session is None:
+                    session = self._sessions[key] = self.create_session()
+        return session
+
+    def post(self, url, data=None, headers=None, auth=None):
+        return self.session(url).post(url, data=data, headers=headers,
+                                      auth=auth, timeout=self.timeout)
+
+    def close(self):
+        '''
+        Close every connection.
+        '''
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+
+class CircuitOpenError(Exception):
+    '''
+    An outcome request was not sent because the circuit of its host is open.
+    '''
+
+
+def _is_unavailable(response, error):
+    # whether an attempt failed for reasons of the LMS or the network
+    if error is not None:
+        return isinstance(error, (requests.ConnectionError, requests.Timeout))
+    code = response.response_code
+    return code is not None and code >= 500
+
+
+class RetryPolicy(object):
+    '''
+    Which failed outcome requests to post again, and when.
+
+    An attempt is retried after a connection error or timeout, a 5xx
+    response, or a ``processing`` response, up to ``attempts`` attempts in
+    all. After attempt n the wait is random, between 0 and
+    ``min(max_backoff, backoff * 2 ** (n - 1))`` seconds, so that the
+    retries of many workers to one LMS spread out instead of arriving
+    together.
+    '''
+
+    def __init__(self, attempts=3, backoff=0.5, max_backoff=30):
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def should_retry(self, outcome_response=None, error=None):
+        if _is_unavailable(outcome_response, error):
+            return True
+        return error is None and outcome_response.is_processing()
+
+    def delay(self, attempt):
+        '''
+        Seconds to wait after the given attempt, counting from 1.
+        '''
+        return random.uniform(
+            0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+
+
+class _Circuit(object):
+    __slots__ = ('failures', 'opened', 'trial')
+
+    def __init__(self):
+        self.failures = 0
+        self.opened = None
+        self.trial = False
+
+
+class CircuitBreaker(object):
+    '''
+    Stops posting to an outcome service host that keeps failing.
+
+    After ``failure_threshold`` connection errors, timeouts or 5xx responses
+    in a row from a host, its circuit opens: for ``reset_timeout`` seconds,
+    requests to it fail at once with a CircuitOpenError instead of tying up
+    a worker. Then a single request is let through. If it succeeds the
+    circuit closes, and otherwise it opens again.
+
+    One breaker can be shared by every thread of a process.
+    '''
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._circuits = {}
+        self._lock = threading.Lock()
+
+    def state(self, url):
+        '''
+        The state of the circuit of a URL's host.
+        '''
+        with self._lock:
+            circuit = self._circuits.get(_host(url))
+            if circuit is None or circuit.opened is None:
+                return self.CLOSED
+            if circuit.trial or \
+                    _clock() - circuit.opened >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self.OPEN
+
+    def allow(self, url):
+        '''
+        Whether a request to a URL may be sent now.
+        '''
+        with self._lock:
+            circuit = self._circuits.get(_host(url))
+            if circuit is None or circuit.opened is None:
+                return True
+            if circuit.trial or \
+                    _clock() - circuit.opened < self.reset_timeout:
+                return False
+            circuit.trial = True
+            return True
+
+    def release(self, url):
+        '''
+        Give up a request that was allowed without recording an outcome,
+        as when it could not be sent, so that another may be let through.
+        '''
+        with self._lock:
+            circuit = self._circuits.get(_host(url))
+            if circuit is not None:
+                circuit.trial = False
+
+    def record(self, url, outcome_response=None, error=None):
+        '''
+        Record the outcome of a request that was allowed.
+        '''
+        key = _host(url)
+        with self._lock:
+            if not _is_unavailable(outcome_response, error):
+                self._circuits.pop(key, None)
+                return
+            circuit = self._circuits.get(key)
+            if circuit is None:
+                circuit = self._circuits[key] = _Circuit()
+            circuit.trial = False
+            circuit.failures += 1
+            if circuit.opened is not None or \
+                    circuit.failures >= self.failure_threshold:
+                circuit.opened = _clock()
+
+
+class RateLimiter(object):
+    '''
+    Spaces out outcome requests so that no outcome service host receives
+    more than ``rate`` requests per second, after an initial ``burst``.
+    ``rates`` maps host names to rates that differ from ``rate``. With
+    ``per_consumer``, each consumer key gets its own allowance on a host.
+
+    It is a token bucket in which requests reserve their token, so that
+    they go in the order they arrived. ``reserve`` returns how long the
+    caller must wait before sending, ``acquire`` waits that long, and
+    coroutines can ``await asyncio.sleep`` it instead.
+
+    One limiter can be shared by every thread of a process.
+    '''
+
+    def __init__(self, rate, burst=1, rates=None, per_consumer=False):
+        self.rate = rate
+        self.burst = burst
+        self.rates = dict((host.lower(), host_rate)
+                          for host, host_rate in (rates or {}).items())
+        self.per_consumer = per_consumer
+        self.requests = 0
+        self.delayed = 0
+        self.wait_seconds = 0.0
+        self.max_wait = 0.0
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def key(self, url, consumer_key=None):
+        '''
+        The key of the bucket that requests to a URL draw from.
+        '''
+        host = _host(url)
+        if self.per_consumer:
+            return host + (consumer_key,)
+        return host
+
+    def _rate(self, key):
+        return self.rates.get(key[1], self.rate)
+
+    def reserve(self, url, consumer_key=None):
+        '''
+        Reserve the next slot to send a request to a URL, returning the
+        number of seconds to wait for it.
+        '''
+        key = self.key(url, consumer_key)
+        rate = self._rate(key)
+        with self._lock:
+            # read under the lock, so that a bucket's time never goes back
+            now = _clock()
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [self.burst, now]
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[0] = tokens - 1
+            bucket[1] = now
+            wait = max(0.0, (1 - tokens) / rate)
+            self.requests += 1
+            if wait:
+                self.delayed += 1
+                self.wait_seconds += wait
+                self.max_wait = max(self.max_wait, wait)
+        return wait
+
+    def acquire(self, url, consumer_key=None):
+        '''
+        Wait for the next slot to send a request to a URL. Returns the
+        number of seconds waited.
+        '''
+        wait = self.reserve(url, consumer_key)
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def queue_depth(self, url, consumer_key=None):
+        '''
+        The number of requests to a URL's host waiting for their slot.
+        '''
+        key = self.key(url, consumer_key)
+        with self._lock:
+            return self._queue_depth(key, _clock())
+
+    def _queue_depth(self, key, now):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return 0
+        tokens = bucket[0] + (now - bucket[1]) * self._rate(key)
+        return max(0, int(math.ceil(-tokens)))
+
+    def metrics(self):
+        '''
+        Return the number of ``requests``, how many were ``delayed``, the
+        total and longest wait in seconds, and the total ``queue_depth``.
+        '''
+        with self._lock:
+            now = _clock()
+            return {
+                'requests': self.requests,
+                'delayed': self.delayed,
+                'wait_seconds': self.wait_seconds,
+                'max_wait': self.max_wait,
+                'queue_depth': sum(self._queue_depth(key, now)
+                                   for key in self._buckets),
+            }
+
+
+DEFAULT_TRANSPORT = OutcomeTransport()
@@ -1,5 +1,28 @@
+import sqlite3
+import threading
 from uuid import uuid1
 
+from lxml import etree
+
+try:
+    from functools import lru_cache
+except ImportError:
+    # Python 2: memoize until full, then start over
+    def lru_cache(maxsize=128):
+        def decorator(func):
+            cache = {}
+
+            def wrapper(*args):
+                try:
+                    return cache[args]
+                except KeyError:
+                    if len(cache) >= maxsize:
+                        cache.clear()
+                    value = cache[args] = func(*args)
+                    return value
+            return wrapper
+        return decorator
+
 try:
     import urllib.parse as urlparse
 except ImportError:
@@ -16,6 +39,45 @@ def generate_identifier():
     return uuid1().__str__()
 
 
+_parsers = threading.local()
+
+
+def xml_parser():
+    '''
+    An lxml parser for XML from other hosts, which neither loads DTDs nor
+    resolves entities nor touches the network. lxml parsers may not be
+    used by several threads at once, so each thread gets its own.
+    '''
+    parser = getattr(_parsers, 'parser', None)
+    if parser is None:
+        parser = _parsers.parser = etree.XMLParser(
+            resolve_entities=False, load_dtd=False, no_network=True,
+            huge_tree=False)
+    return parser
+
+
+def sqlite_connection(path, wal=False, **kwargs):
+    '''
+    Return a function giving the calling thread its own connection to a
+    SQLite database, since sqlite3 connections may not be shared between
+    threads. ``wal`` puts the database in WAL mode, in which readers do not
+    block the writer. Other keyword arguments go to ``sqlite3.connect``.
+    '''
+    local = threading.local()
+    kwargs.setdefault('timeout', 30)
+
+    def connection():
+        connection = getattr(local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(path, **kwargs)
+            if wal:
+                connection.execute('PRAGMA journal_mode=WAL')
+                connection.execute('PRAGMA synchronous=NORMAL')
+            local.connection = connection
+        return connection
+    return connection
+
+
 class InvalidLTIConfigError(Exception):
     def __init__(self, value):
         self.value = value
@@ -30,3 +92,9 @@ class InvalidLTIRequestError(Exception):
 
     def __str__(self):
         return repr(self.value)
+
+
+class InvalidOutcomeRequestError(InvalidLTIRequestError):
+    '''
+    The XML of an outcome request is malformed.
+    '''
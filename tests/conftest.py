@@ -0,0 +1,7 @@
+import sys
+
+collect_ignore = []
+if sys.version_info < (3, 5):
+    # async def is a syntax error before Python 3.5
+    collect_ignore.append('test_async_verifier.py')
+    collect_ignore.append('test_async_outcome.py')
@@ -0,0 +1,189 @@
+import asyncio
+import base64
+import hashlib
+import threading
+import time
+import unittest
+
+from lti import OutcomeRequest, ToolProvider
+from lti.async_outcome import (AsyncOutcomeClient, ExecutorTransport,
+                               aiohttp)
+from lti.outcome_request import REPLACE_REQUEST
+from lti.transport import RateLimiter
+from lti.utils import InvalidLTIConfigError
+
+from test_transport import StubLMS, StubLMSHandler
+
+
+class SlowLMSHandler(StubLMSHandler):
+    '''
+    Takes a little while to answer, and records how many requests it was
+    answering at once.
+    '''
+
+    def do_POST(self):
+        server = self.server
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight,
+                                       server.in_flight)
+        time.sleep(0.02)
+        with server.lock:
+            server.in_flight -= 1
+        StubLMSHandler.do_POST(self)
+
+
+class SlowLMS(StubLMS):
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = self.max_in_flight = 0
+        StubLMS.__init__(self)
+        self.RequestHandlerClass = SlowLMSHandler
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class TestAsyncOutcomeClient(unittest.TestCase):
+
+    def setUp(self):
+        self.lms = SlowLMS()
+
+    def tearDown(self):
+        self.lms.stop()
+
+    def outcome_request(self, sourcedid='sourcedid', **opts):
+        opts.update({
+            'consumer_key': 'consumer',
+            'consumer_secret': 'secret',
+            'lis_outcome_service_url': self.lms.url,
+            'lis_result_sourcedid': sourcedid,
+        })
+        return OutcomeRequest(opts)
+
+    def test_post_replace_results_concurrently(self):
+        requests = [self.outcome_request('sourcedid{0}'.format(i))
+                    for i in range(20)]
+
+        async def post_all():
+            async with AsyncOutcomeClient(per_host=4) as client:
+                return await asyncio.gather(*[
+                    client.post_replace_result(request, 0.5)
+                    for request in requests])
+
+        responses = run(post_all())
+        self.assertEqual(len(responses), 20)
+        self.assertTrue(all(response.is_success() for response in responses))
+        self.assertIs(requests[0].outcome_response, responses[0])
+        self.assertEqual(len(self.lms.requests), 20)
+        self.assertEqual(self.lms.max_in_flight, 4)
+        # kept alive and reused rather than one per grade
+        self.assertLessEqual(len(self.lms.connections), 4)
+
+    def test_rate_limiter(self):
+        limiter = RateLimiter(50)
+        requests = [self.outcome_request('sourcedid{0}'.format(i),
+                                         operation=REPLACE_REQUEST, score=1)
+                    for i in range(5)]
+        requests[0].rate_limiter = RateLimiter(1000)
+
+        async def post_all():
+            async with AsyncOutcomeClient(rate_limiter=limiter) as client:
+                return await client.post_many(requests)
+
+        start = time.time()
+        responses = run(post_all())
+        self.assertGreaterEqual(time.time() - start, 0.06)
+        self.assertTrue(all(response.is_success() for response in responses))
+        self.assertEqual(limiter.metrics()['requests'], 4)
+        self.assertEqual(limiter.metrics()['delayed'], 3)
+
+    def test_same_request_as_blocking_client(self):
+        request = self.outcome_request(score=0.75,
+                                       operation=REPLACE_REQUEST)
+        response = run(AsyncOutcomeClient().post_many([request]))[0]
+        self.assertTrue(response.is_success())
+        self.assertEqual(response.response_code, 200)
+
+        body = self.lms.bodies[0]
+        self.assertEqual(body, request.generate_request_xml())
+        authorization = self.lms.requests[0]
+        self.assertTrue(authorization.startswith('OAuth '))
+        body_hash = base64.b64encode(hashlib.sha1(body).digest())
+        self.assertIn('oauth_body_hash="{0}"'.format(
+            body_hash.decode('ascii').replace('=', '%3D')), authorization)
+
+    def test_read_and_delete(self):
+        async def read_and_delete(client):
+            read = await client.post_read_result(self.outcome_request())
+            delete = await client.post_delete_result(self.outcome_request())
+            await client.close()
+            return read, delete
+
+        read, delete = run(read_and_delete(AsyncOutcomeClient()))
+        self.assertTrue(read.is_success())
+        self.assertTrue(delete.is_success())
+        self.assertIn(b'<readResultRequest>', self.lms.bodies[0])
+        self.assertIn(b'<deleteResultRequest>', self.lms.bodies[1])
+
+    def test_invalid_requests(self):
+        client = AsyncOutcomeClient()
+        with self.assertRaises(InvalidLTIConfigError):
+            run(client.post_replace_result(self.outcome_request(), 1,
+                                           {'image': 'cat.png'}))
+        incomplete = OutcomeRequest({'operation': REPLACE_REQUEST})
+        results = run(client.post_many(
+            [incomplete, self.outcome_request(operation=REPLACE_REQUEST)],
+            return_exceptions=True))
+        self.assertIsInstance(results[0], InvalidLTIConfigError)
+        self.assertTrue(results[1].is_success())
+        run(client.close())
+
+    def test_tool_provider_request(self):
+        tp = ToolProvider('consumer', 'secret', {
+            'lis_outcome_service_url': self.lms.url,
+            'lis_result_sourcedid': 'sourcedid'})
+
+        async def post(client):
+            async with client:
+                return await client.post_replace_result(tp.new_request({}),
+                                                        0.9)
+
+        self.assertTrue(run(post(AsyncOutcomeClient())).is_success())
+        self.assertTrue(tp.last_outcome_request().is_replace_request())
+
+
+class TestExecutorTransport(unittest.TestCase):
+
+    def setUp(self):
+        self.lms = SlowLMS()
+
+    def tearDown(self):
+        self.lms.stop()
+
+    def test_post_many(self):
+        requests = [OutcomeRequest({
+            'consumer_key': 'consumer',
+            'consumer_secret': 'secret',
+            'lis_outcome_service_url': self.lms.url,
+            'lis_result_sourcedid': 'sourcedid{0}'.format(i),
+            'operation': REPLACE_REQUEST,
+            'score': 1,
+        }) for i in range(6)]
+        client = AsyncOutcomeClient(ExecutorTransport(), per_host=2)
+        responses = run(client.post_many(requests))
+        run(client.close())
+        self.assertTrue(all(response.is_success() for response in responses))
+        self.assertEqual(responses[0].post_response.status_code, 200)
+        self.assertEqual(self.lms.max_in_flight, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,192 @@
+import asyncio
+import unittest
+
+from mock import patch
+from oauthlib.oauth1 import RequestValidator, SignatureOnlyEndpoint
+
+from lti import (ConsumerRegistry, HMACLaunchVerifier, LaunchVerifier,
+                 StagedLaunchVerifier, ToolConsumer, ToolProvider)
+from lti.async_verifier import AsyncLaunchVerifier, _async_verifier
+from lti.launch_pipeline import ACCEPTED
+from lti.launch_verifier import (INVALID_SIGNATURE, MISSING_LAUNCH_PARAMS,
+                                 REPLAYED_NONCE, UNKNOWN_CONSUMER)
+from lti.nonce_store import MemoryNonceStore
+
+KEY = 'consumerkey000000000001'
+SECRET = 'secret'
+LAUNCH_URL = 'https://example.edu/launch'
+
+
+class AsyncValidator(RequestValidator):
+    '''
+    Looks up secrets and nonces with coroutines, as against a database.
+    '''
+    dummy_client = 'dummyconsumerkey000000'
+
+    def __init__(self):
+        super(AsyncValidator, self).__init__()
+        self.nonces = set()
+        self.calls = []
+
+    @property
+    def allowed_signature_methods(self):
+        return ('HMAC-SHA1', 'HMAC-SHA256', 'PLAINTEXT')
+
+    async def validate_client_key(self, client_key, request):
+        self.calls.append('validate_client_key')
+        await asyncio.sleep(0)
+        return client_key == KEY
+
+    async def get_client_secret(self, client_key, request):
+        self.calls.append('get_client_secret')
+        await asyncio.sleep(0)
+        return SECRET if client_key == KEY else 'dummy'
+
+    async def validate_timestamp_and_nonce(self, client_key, timestamp,
+                                           nonce, request, request_token=None,
+                                           access_token=None):
+        self.calls.append('validate_timestamp_and_nonce')
+        await asyncio.sleep(0)
+        if (timestamp, nonce) in self.nonces:
+            return False
+        self.nonces.add((timestamp, nonce))
+        return True
+
+
+class SyncValidator(RequestValidator):
+    dummy_client = 'dummyconsumerkey000000'
+
+    def validate_client_key(self, client_key, request):
+        return client_key == KEY
+
+    def get_client_secret(self, client_key, request):
+        return SECRET
+
+    def validate_timestamp_and_nonce(self, client_key, timestamp, nonce,
+                                     request, request_token=None,
+                                     access_token=None):
+        return True
+
+
+def launch(key=KEY, secret=SECRET, signature_method='HMAC-SHA1'):
+    consumer = ToolConsumer(key, secret, launch_url=LAUNCH_URL,
+                            params={'resource_link_id': 'link'})
+    return ToolProvider.from_unpacked_request(
+        None, consumer.generate_launch_data(
+            signature_method=signature_method), LAUNCH_URL,
+        {'Content-Type': 'application/x-www-form-urlencoded'})
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class TestAsyncLaunchVerifier(unittest.TestCase):
+
+    def setUp(self):
+        self.validator = AsyncValidator()
+        self.verifier = AsyncLaunchVerifier(self.validator)
+
+    def test_valid(self):
+        result = run(self.verifier.verify_async(launch()))
+        self.assertTrue(result)
+        self.assertEqual(result.consumer_secret, SECRET)
+        self.assertEqual(self.validator.calls, [
+            'validate_timestamp_and_nonce', 'validate_client_key',
+            'get_client_secret'])
+
+    def test_rejections(self):
+        tp = launch()
+        self.assertTrue(run(self.verifier.verify_async(tp)))
+        self.assertEqual(run(self.verifier.verify_async(tp)).reason,
+                         REPLAYED_NONCE)
+        self.assertEqual(
+            run(self.verifier.verify_async(launch(secret='wrong'))).reason,
+            INVALID_SIGNATURE)
+        self.assertEqual(run(self.verifier.verify_async(
+            launch(key='consumerkey000000000009'))).reason, UNKNOWN_CONSUMER)
+
+    def test_oauthlib_signature_methods(self):
+        self.assertTrue(run(self.verifier.verify_async(
+            launch(signature_method='PLAINTEXT'))))
+        self.assertFalse(run(self.verifier.verify_async(
+            launch(secret='wrong', signature_method='PLAINTEXT'))))
+
+    def test_same_results_as_sync(self):
+        for tp in [launch(), launch(secret='wrong'),
+                   launch(key='consumerkey000000000009'),
+                   launch(signature_method='HMAC-SHA256')]:
+            expected = HMACLaunchVerifier(SyncValidator()).verify(tp)
+            actual = run(AsyncLaunchVerifier(SyncValidator()).verify_async(tp))
+            self.assertEqual(actual.valid, expected.valid)
+            self.assertEqual(actual.reason, expected.reason)
+
+    def test_rotated_secret(self):
+        registry = ConsumerRegistry({'consumer': ['new', 'old']})
+        validator = registry.verifier.validator
+        validator.nonce_store = MemoryNonceStore()
+        result = run(AsyncLaunchVerifier(validator).verify_async(
+            launch(key='consumer', secret='old')))
+        self.assertTrue(result)
+        self.assertEqual(registry.secret('consumer'), 'old')
+
+    def test_concurrent(self):
+        launches = [launch() for _ in range(20)]
+
+        async def verify_all():
+            return await asyncio.gather(
+                *[self.verifier.verify_async(tp) for tp in launches])
+
+        self.assertTrue(all(run(verify_all())))
+
+
+class TestToolProviderAsync(unittest.TestCase):
+
+    def test_is_valid_request_async(self):
+        tp = launch()
+        tp.consumer_key = tp.consumer_secret = None
+        self.assertTrue(run(tp.is_valid_request_async(AsyncValidator())))
+        self.assertEqual(tp.consumer_key, KEY)
+        self.assertEqual(tp.consumer_secret, SECRET)
+
+    def test_launch_verifier(self):
+        verifier = LaunchVerifier(SyncValidator())
+        self.assertTrue(run(launch().is_valid_request_async(verifier)))
+        result = run(launch(secret='wrong').verify_launch_async(verifier))
+        self.assertEqual(result.reason, INVALID_SIGNATURE)
+
+    def test_async_verifier_is_kept(self):
+        verifier = LaunchVerifier(SyncValidator())
+        with patch('lti.launch_verifier.SignatureOnlyEndpoint',
+                   wraps=SignatureOnlyEndpoint) as constructor:
+            for i in range(3):
+                self.assertTrue(run(launch().is_valid_request_async(
+                    verifier)))
+        self.assertEqual(constructor.call_count, 1)
+
+    def test_staged_launch_verifier(self):
+        verifier = StagedLaunchVerifier(SyncValidator())
+        tp = launch()
+        self.assertTrue(run(tp.verify_launch_async(verifier)))
+        del tp.launch_params['resource_link_id']
+        self.assertEqual(run(tp.verify_launch_async(verifier)).reason,
+                         MISSING_LAUNCH_PARAMS)
+        self.assertEqual(verifier.metrics(),
+                         {ACCEPTED: 1, MISSING_LAUNCH_PARAMS: 1})
+
+    def test_consumer_registry(self):
+        registry = ConsumerRegistry({KEY: SECRET})
+        registry.verifier.validator.nonce_store = MemoryNonceStore()
+        tp = launch()
+        tp.consumer_registry = registry
+        self.assertTrue(run(tp.is_valid_request_async()))
+        self.assertIs(_async_verifier(registry.verifier),
+                      _async_verifier(registry.verifier))
+
+
+if __name__ == '__main__':
+    unittest.main()
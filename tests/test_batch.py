@@ -0,0 +1,114 @@
+import sqlite3
+import unittest
+
+from oauthlib.oauth1 import RequestValidator
+
+from lti import LaunchVerifier, ToolConsumer, ToolProvider
+from lti.batch import verify_many
+from lti.launch_verifier import (INVALID_SIGNATURE, MISSING_OAUTH_PARAMS,
+                                 VERIFIER_ERROR)
+
+KEY = 'consumerkey000000000001'
+SECRET = 'secret'
+LAUNCH_URL = 'https://example.edu/launch'
+HEADERS = {'Content-Type': 'application/x-www-form-urlencoded'}
+
+
+class ReplayValidator(RequestValidator):
+    '''
+    Accepts the nonces of recorded launches, which are all seen before.
+    '''
+    dummy_client = 'dummyconsumerkey000000'
+
+    def validate_client_key(self, client_key, request):
+        return client_key == KEY
+
+    def get_client_secret(self, client_key, request):
+        return SECRET
+
+    def validate_timestamp_and_nonce(self, client_key, timestamp, nonce,
+                                     request, request_token=None,
+                                     access_token=None):
+        return True
+
+
+class FlakyValidator(ReplayValidator):
+    '''
+    Fails to reach its nonce store for one of the launches.
+    '''
+
+    def validate_timestamp_and_nonce(self, client_key, timestamp, nonce,
+                                     request, request_token=None,
+                                     access_token=None):
+        if dict(request.decoded_body).get('resource_link_id') == '4':
+            raise sqlite3.OperationalError('database is locked')
+        return True
+
+
+def recorded_launches(count):
+    launches = []
+    for i in range(count):
+        secret = SECRET if i % 3 else 'wrong'
+        consumer = ToolConsumer(KEY, secret, launch_url=LAUNCH_URL,
+                                params={'resource_link_id': str(i)})
+        launches.append((consumer.generate_launch_data(), LAUNCH_URL,
+                         HEADERS))
+    return launches
+
+
+class TestVerifyMany(unittest.TestCase):
+
+    def check(self, launches, results):
+        self.assertEqual(len(results), len(launches))
+        for i, result in enumerate(results):
+            self.assertEqual(bool(result), bool(i % 3), i)
+            if not i % 3:
+                self.assertEqual(result.reason, INVALID_SIGNATURE)
+
+    def test_in_process(self):
+        launches = recorded_launches(20)
+        progress = []
+        results = list(verify_many(
+            iter(launches), ReplayValidator(), workers=1, chunksize=6,
+            progress=lambda stats: progress.append(
+                (stats.verified, stats.valid))))
+        self.check(launches, results)
+        self.assertEqual(progress, [(6, 4), (12, 8), (18, 12), (20, 13)])
+
+    def test_process_pool(self):
+        launches = recorded_launches(40)
+        stats = []
+        results = list(verify_many(
+            (launch for launch in launches), LaunchVerifier(ReplayValidator()),
+            workers=2, chunksize=3, progress=stats.append))
+        self.check(launches, results)
+        self.assertEqual(stats[-1].verified, 40)
+        self.assertGreater(stats[-1].per_second, 0)
+
+    def test_launch_forms(self):
+        body = recorded_launches(2)[1]
+        tp = ToolProvider.from_unpacked_request(None, *body)
+        raw = (tp.to_body(), LAUNCH_URL, HEADERS)
+        missing_key = ({'resource_link_id': '1'}, LAUNCH_URL, HEADERS)
+        results = list(verify_many([tp, raw, missing_key], ReplayValidator(),
+                                   workers=1))
+        self.assertEqual([bool(result) for result in results],
+                         [True, True, False])
+        self.assertEqual(results[2].reason, MISSING_OAUTH_PARAMS)
+        self.assertIsNone(results[0].request)
+
+    def test_validator_error(self):
+        launches = recorded_launches(8)
+        for workers in (1, 2):
+            results = list(verify_many(launches, FlakyValidator(),
+                                       workers=workers, chunksize=3))
+            self.assertEqual([bool(result) for result in results],
+                             [False, True, True, False, False, True, False,
+                              True])
+            self.assertEqual(results[4].reason, VERIFIER_ERROR)
+            self.assertIsInstance(results[4].error, sqlite3.OperationalError)
+            self.assertIsNone(results[5].error)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,251 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from httmock import HTTMock, all_requests
+
+from lti import (ConsumerRegistry, InvalidLTIConfigError, OutcomeRequest,
+                 ToolConsumer, ToolProvider)
+from lti.consumer_registry import (ConsumerBackend, FileConsumerBackend,
+                                   SQLiteConsumerBackend, yaml)
+from lti.nonce_store import MemoryNonceStore
+
+LAUNCH_URL = 'https://example.edu/launch'
+
+
+class CountingBackend(ConsumerBackend):
+
+    def __init__(self, consumers):
+        self.consumers = consumers
+        self.lookups = 0
+
+    def get_secrets(self, consumer_key):
+        self.lookups += 1
+        return self.consumers.get(consumer_key, ())
+
+
+def signed_launch(key, secret, **params):
+    params.setdefault('resource_link_id', 'link')
+    consumer = ToolConsumer(key, secret, launch_url=LAUNCH_URL, params=params)
+    return ToolProvider.from_unpacked_request(
+        None, consumer.generate_launch_data(), LAUNCH_URL,
+        {'Content-Type': 'application/x-www-form-urlencoded'})
+
+
+class TestConsumerRegistry(unittest.TestCase):
+
+    def test_secrets_from_dict(self):
+        registry = ConsumerRegistry({'one': 'secret', 'two': ['new', 'old']})
+        self.assertEqual(registry.secrets('one'), ('secret',))
+        self.assertEqual(registry.secrets('two'), ('new', 'old'))
+        self.assertEqual(registry.secret('two'), 'new')
+        self.assertEqual(registry.secrets('three'), ())
+        self.assertIsNone(registry.secret('three'))
+        self.assertIn('one', registry)
+        self.assertNotIn('three', registry)
+
+    def test_lookups_are_cached(self):
+        backend = CountingBackend({'key': ('secret',)})
+        registry = ConsumerRegistry(backend, ttl=60)
+        for _ in range(3):
+            registry.secret('key')
+            registry.secret('unknown')
+        self.assertEqual(backend.lookups, 2)
+        registry.invalidate('key')
+        registry.secret('key')
+        self.assertEqual(backend.lookups, 3)
+        registry.invalidate()
+        registry.secret('key')
+        registry.secret('unknown')
+        self.assertEqual(backend.lookups, 5)
+
+    def test_cache_expires(self):
+        backend = CountingBackend({'key': ('secret',)})
+        registry = ConsumerRegistry(backend, ttl=0)
+        registry.secret('key')
+        registry.secret('key')
+        self.assertEqual(backend.lookups, 2)
+
+    def test_cache_is_bounded(self):
+        registry = ConsumerRegistry({}, maxsize=10)
+        for i in range(25):
+            registry.secret('key{0}'.format(i))
+        self.assertLessEqual(len(registry._cache), 10)
+
+    def test_matched_secret_comes_first(self):
+        registry = ConsumerRegistry({'key': ['new', 'old']})
+        registry.record_match('key', 'old')
+        self.assertEqual(registry.secrets('key'), ('old', 'new'))
+        self.assertEqual(registry.secret('key'), 'old')
+        # a secret no longer in the backend is not offered
+        registry.record_match('key', 'retired')
+        self.assertEqual(registry.secrets('key'), ('new', 'old'))
+
+
+class TestFileConsumerBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, name, text, mtime=None):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as f:
+            f.write(text)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+        return path
+
+    def test_json(self):
+        path = self.write('consumers.json', json.dumps(
+            {'one': 'secret', 'two': ['new', 'old']}))
+        backend = FileConsumerBackend(path)
+        self.assertEqual(backend.get_secrets('one'), ('secret',))
+        self.assertEqual(backend.get_secrets('two'), ('new', 'old'))
+        self.assertEqual(backend.get_secrets('three'), ())
+
+    @unittest.skipIf(yaml is None, 'PyYAML is not installed')
+    def test_yaml(self):
+        path = self.write('consumers.yaml', 'one: secret\ntwo:\n- new\n- old\n')
+        backend = FileConsumerBackend(path)
+        self.assertEqual(backend.get_secrets('one'), ('secret',))
+        self.assertEqual(backend.get_secrets('two'), ('new', 'old'))
+
+    def test_hot_reload(self):
+        mtime = time.time() - 100
+        path = self.write('consumers.json', '{"key": "old"}', mtime)
+        backend = FileConsumerBackend(path, check_interval=0)
+        self.assertEqual(backend.get_secrets('key'), ('old',))
+        self.write('consumers.json', '{"key": ["new", "old"]}')
+        self.assertEqual(backend.get_secrets('key'), ('new', 'old'))
+
+    def test_failed_reload_keeps_secrets(self):
+        mtime = time.time() - 100
+        path = self.write('consumers.json', '{"key": "old"}', mtime)
+        backend = FileConsumerBackend(path, check_interval=0)
+        self.write('consumers.json', '{"key": ')
+        self.assertEqual(backend.get_secrets('key'), ('old',))
+
+    def test_reload_is_rate_limited(self):
+        mtime = time.time() - 100
+        path = self.write('consumers.json', '{"key": "old"}', mtime)
+        backend = FileConsumerBackend(path, check_interval=60)
+        self.write('consumers.json', '{"key": "new"}')
+        self.assertEqual(backend.get_secrets('key'), ('old',))
+
+
+class TestSQLiteConsumerBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.backend = SQLiteConsumerBackend(
+            os.path.join(self.directory, 'consumers.db'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_secrets(self):
+        self.backend.add_secret('key', 'old')
+        self.backend.add_secret('key', 'new')
+        self.backend.add_secret('key', 'new')
+        self.assertEqual(self.backend.get_secrets('key'), ('new', 'old'))
+        self.assertEqual(self.backend.get_secrets('unknown'), ())
+        self.backend.remove_secret('key', 'old')
+        self.assertEqual(self.backend.get_secrets('key'), ('new',))
+
+
+class TestConsumerRegistryLaunches(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = ConsumerRegistry({'consumer': ['new', 'old']})
+        self.registry.verifier.validator.nonce_store = MemoryNonceStore()
+
+    def test_primary_secret(self):
+        tp = signed_launch('consumer', 'new')
+        self.assertTrue(tp.is_valid_request(self.registry.verifier))
+
+    def test_rotated_secret(self):
+        tp = signed_launch('consumer', 'old')
+        result = self.registry.verifier.verify(tp)
+        self.assertTrue(result)
+        self.assertEqual(result.consumer_secret, 'old')
+        self.assertEqual(self.registry.secret('consumer'), 'old')
+
+        # and again, now trying the matching secret first
+        tp = signed_launch('consumer', 'old')
+        self.assertTrue(self.registry.verifier.verify(tp))
+
+    def test_unknown_secret(self):
+        tp = signed_launch('consumer', 'wrong')
+        self.assertFalse(self.registry.verifier.verify(tp))
+        self.assertEqual(self.registry.secret('consumer'), 'new')
+
+    def test_unknown_consumer(self):
+        tp = signed_launch('unknown', 'new')
+        self.assertFalse(self.registry.verifier.verify(tp))
+
+    def test_replay(self):
+        tp = signed_launch('consumer', 'old')
+        self.assertTrue(self.registry.verifier.verify(tp))
+        self.assertFalse(self.registry.verifier.verify(tp))
+
+    def test_tool_provider_registry(self):
+        tp = signed_launch('consumer', 'old')
+        tp.consumer_registry = self.registry
+        self.assertTrue(tp.is_valid_request())
+
+    def test_tool_provider_without_registry(self):
+        tp = signed_launch('consumer', 'old')
+        with self.assertRaises(InvalidLTIConfigError):
+            tp.is_valid_request()
+
+
+class TestConsumerRegistryOutcomes(unittest.TestCase):
+
+    def test_signs_with_matched_secret(self):
+        registry = ConsumerRegistry({'consumer': ['new', 'old']})
+        registry.record_match('consumer', 'old')
+        request = OutcomeRequest({
+            'consumer_key': 'consumer',
+            'consumer_registry': registry,
+            'lis_outcome_service_url': 'http://example.edu/service',
+            'lis_result_sourcedid': 'sourcedid',
+        })
+        self.assertEqual(request.signing_secret(), 'old')
+
+        headers = []
+
+        @all_requests
+        def response_content(url, request):
+            headers.append(request.headers['Authorization'])
+            return {'status_code': 200, 'content': b''}
+
+        with HTTMock(response_content):
+            request.post_delete_result()
+        self.assertIn(b'oauth_consumer_key="consumer"', headers[0])
+
+    def test_explicit_secret_wins(self):
+        registry = ConsumerRegistry({'consumer': 'registered'})
+        request = OutcomeRequest({'consumer_key': 'consumer',
+                                  'consumer_secret': 'explicit',
+                                  'consumer_registry': registry})
+        self.assertEqual(request.signing_secret(), 'explicit')
+
+    def test_tool_provider_passes_registry(self):
+        registry = ConsumerRegistry({'consumer': 'secret'})
+        tp = ToolProvider('consumer', None, {
+            'lis_outcome_service_url': 'http://example.edu/service',
+            'lis_result_sourcedid': 'sourcedid'})
+        tp.consumer_registry = registry
+        request = tp.new_request({})
+        self.assertIs(request.consumer_registry, registry)
+        self.assertEqual(request.signing_secret(), 'secret')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+import random
+import unittest
+
+from oauthlib.oauth1 import RequestValidator
+from oauthlib.oauth1.rfc5849 import signature
+
+from lti import (ConsumerRegistry, HMACLaunchVerifier, LaunchVerifier,
+                 ToolConsumer, ToolProvider)
+from lti.hmac_verifier import LaunchRequest, _uri_parts, escape
+from lti.nonce_store import MemoryNonceStore
+
+SECRETS = {
+    'consumerkey000000000001': u'secret-one',
+    'consumerkey000000000002': u'sécret & two%',
+}
+CHARACTERS = u'aZ09-._~ +&=%/?#,;:!*\'"é中\U0001f600'
+
+
+class PermissiveValidator(RequestValidator):
+    '''
+    Accepts every nonce, so that both verifiers can check the same launch.
+    '''
+    dummy_client = 'dummyconsumerkey000000'
+
+    @property
+    def allowed_signature_methods(self):
+        return ('HMAC-SHA1', 'HMAC-SHA256', 'HMAC-SHA512', 'PLAINTEXT')
+
+    def validate_client_key(self, client_key, request):
+        return client_key in SECRETS
+
+    def get_client_secret(self, client_key, request):
+        return SECRETS.get(client_key, u'dummy-secret')
+
+    def validate_timestamp_and_nonce(self, client_key, timestamp, nonce,
+                                     request, request_token=None,
+                                     access_token=None):
+        return True
+
+
+def random_text(rng):
+    return u''.join(rng.choice(CHARACTERS)
+                    for _ in range(rng.randint(0, 12)))
+
+
+def launch(key, secret, url, params, signature_method='HMAC-SHA1'):
+    consumer = ToolConsumer(key, secret, launch_url=url, params=params)
+    data = consumer.generate_launch_data(
+        signature_method=signature_method)
+    return ToolProvider.from_unpacked_request(
+        None, data, url,
+        {'Content-Type': 'application/x-www-form-urlencoded'})
+
+
+class TestEscape(unittest.TestCase):
+
+    def test_matches_oauthlib(self):
+        from oauthlib.oauth1.rfc5849.utils import escape as reference
+        rng = random.Random(1)
+        for value in [u'', u'abc', u'a b', u'~', u'%', u'é'] + \
+                [random_text(rng) for _ in range(500)]:
+            self.assertEqual(escape(value), reference(value))
+
+
+class TestHMACLaunchVerifier(unittest.TestCase):
+
+    def setUp(self):
+        self.reference = LaunchVerifier(PermissiveValidator())
+        self.verifier = HMACLaunchVerifier(PermissiveValidator())
+
+    def assertSameResult(self, tp):
+        expected = self.reference.verify(tp)
+        actual = self.verifier.verify(tp)
+        self.assertEqual(bool(actual), bool(expected))
+        self.assertEqual(actual.consumer_key, expected.consumer_key)
+        if expected:
+            self.assertEqual(actual.consumer_secret, expected.consumer_secret)
+        return actual
+
+    def test_base_string_matches_oauthlib(self):
+        rng = random.Random(2)
+        url = u'https://Example.EDU:443/launch/päth?b=2&a=1&a=%20'
+        escaped_uri, query = _uri_parts(url)
+        for _ in range(200):
+            pairs = list(query) + [(u'custom_' + random_text(rng),
+                                    random_text(rng)) for _ in range(5)]
+            expected = signature.signature_base_string(
+                'POST', signature.base_string_uri(url),
+                signature.normalize_parameters(pairs))
+            self.assertEqual(
+                HMACLaunchVerifier.signature_base_string(escaped_uri, pairs),
+                expected)
+
+    def test_differential(self):
+        rng = random.Random(3)
+        urls = ['https://example.edu/launch',
+                'https://example.edu:8443/a/b?x=1&y=&x=%2F',
+                'HTTPS://EXAMPLE.edu/launch/']
+        for i in range(200):
+            key = rng.choice(sorted(SECRETS))
+            params = {'resource_link_id': random_text(rng) or 'link',
+                      'roles': u'Instructor,Learner',
+                      'custom_' + rng.choice('abc'): random_text(rng),
+                      'ext_' + rng.choice('xyz'): random_text(rng)}
+            method = rng.choice(['HMAC-SHA1', 'HMAC-SHA256'])
+            secret = SECRETS[key] if i % 4 else random_text(rng)
+            tp = launch(key, secret, rng.choice(urls), params, method)
+            self.assertSameResult(tp)
+
+    def test_valid_launch(self):
+        tp = launch('consumerkey000000000002',
+                    SECRETS['consumerkey000000000002'],
+                    'https://example.edu/launch', {'resource_link_id': 'l'},
+                    'HMAC-SHA256')
+        result = self.assertSameResult(tp)
+        self.assertTrue(result)
+        self.assertEqual(result.consumer_key, 'consumerkey000000000002')
+
+    def test_tampered_launch(self):
+        tp = launch('consumerkey000000000001',
+                    SECRETS['consumerkey000000000001'],
+                    'https://example.edu/launch', {'resource_link_id': 'l'})
+        tp.launch_params['resource_link_id'] = 'other'
+        self.assertFalse(self.assertSameResult(tp))
+
+    def test_unknown_consumer(self):
+        tp = launch('consumerkey000000000009', u'secret-one',
+                    'https://example.edu/launch', {'resource_link_id': 'l'})
+        self.assertFalse(self.assertSameResult(tp))
+
+    def test_structural_failures(self):
+        url = 'https://example.edu/launch'
+        for name, value in [('oauth_timestamp', '12345'),
+                            ('oauth_timestamp', '1000000000'),
+                            ('oauth_version', '2.0'),
+                            ('oauth_nonce', ''),
+                            ('oauth_signature_method', 'HMAC-MD5')]:
+            tp = launch('consumerkey000000000001',
+                        SECRETS['consumerkey000000000001'], url,
+                        {'resource_link_id': 'l'})
+            tp.launch_params[name] = value
+            self.assertFalse(self.assertSameResult(tp), name)
+        tp = launch('consumerkey000000000001',
+                    SECRETS['consumerkey000000000001'],
+                    'http://example.edu/launch', {'resource_link_id': 'l'})
+        self.assertFalse(self.assertSameResult(tp))
+
+    def test_falls_back_to_oauthlib(self):
+        tp = launch('consumerkey000000000001',
+                    SECRETS['consumerkey000000000001'],
+                    'https://example.edu/launch', {'resource_link_id': 'l'},
+                    'PLAINTEXT')
+        result = self.assertSameResult(tp)
+        self.assertTrue(result)
+        self.assertNotIsInstance(result.request, LaunchRequest)
+
+    def test_rotated_secret(self):
+        registry = ConsumerRegistry({'consumer': ['new', 'old']})
+        validator = registry.verifier.validator
+        validator.nonce_store = MemoryNonceStore()
+        verifier = HMACLaunchVerifier(validator)
+        tp = launch('consumer', 'old', 'https://example.edu/launch',
+                    {'resource_link_id': 'l'})
+        result = verifier.verify(tp)
+        self.assertTrue(result)
+        self.assertEqual(result.consumer_secret, 'old')
+        self.assertEqual(registry.secret('consumer'), 'old')
+        # replayed
+        self.assertFalse(verifier.verify(tp))
+
+    def test_is_valid_request(self):
+        tp = launch('consumerkey000000000001',
+                    SECRETS['consumerkey000000000001'],
+                    'https://example.edu/launch', {'resource_link_id': 'l'})
+        tp.consumer_key = tp.consumer_secret = None
+        self.assertTrue(tp.is_valid_request(self.verifier))
+        self.assertEqual(tp.consumer_secret, u'secret-one')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,10 @@
+import copy
+import pickle
 import unittest
 
-from lti import LaunchParams, DEFAULT_LTI_VERSION, InvalidLTIConfigError
-from lti.launch_params import InvalidLaunchParamError
+from lti import (LaunchParams, LaunchParamSchema, LazyLaunchParams,
+                 DEFAULT_LTI_VERSION, InvalidLTIConfigError)
+from lti.launch_params import InvalidLaunchParamError, ReadOnlyParams
 
 class TestLaunchParams(unittest.TestCase):
 
@@ -38,15 +41,34 @@ class TestLaunchParams(unittest.TestCase):
     def test_list_params(self):
 
         lp = LaunchParams({'roles': 'foo,bar,baz'})
-        self.assertEqual(lp['roles'], ['foo','bar','baz'])
+        self.assertEqual(lp['roles'], ('foo','bar','baz'))
         self.assertEqual(lp._params['roles'], 'foo,bar,baz')
 
         lp['roles'] = ['bar','baz']
-        self.assertEqual(lp['roles'], ['bar','baz'])
+        self.assertEqual(lp['roles'], ('bar','baz'))
         self.assertEqual(lp._params['roles'], 'bar,baz')
 
         lp['roles'] = 'blah, bluh '
-        self.assertEqual(lp['roles'], ['blah','bluh'])
+        self.assertEqual(lp['roles'], ('blah','bluh'))
+
+        lp['roles'] = ('spam', ' eggs')
+        self.assertEqual(lp['roles'], ('spam','eggs'))
+        self.assertEqual(lp._params['roles'], 'spam,eggs')
+
+    def test_list_params_cached(self):
+        lp = LaunchParams({'roles': 'foo,bar'})
+        roles = lp['roles']
+        self.assertIs(lp['roles'], roles)
+
+        # writes invalidate the cached value
+        lp['roles'] = 'baz'
+        self.assertEqual(lp['roles'], ('baz',))
+        lp.update({'roles': ['foo']})
+        self.assertEqual(lp['roles'], ('foo',))
+        del lp['roles']
+        self.assertNotIn('roles', lp)
+        lp.set_non_spec_param('roles', 'spam')
+        self.assertEqual(lp['roles'], ('spam',))
 
     def test_non_spec_params(self):
         lp = LaunchParams()
@@ -80,3 +102,224 @@ class TestLaunchParams(unittest.TestCase):
             'lti_message_type': 'bar',
             'resource_link_id': 1
         })
+
+    def test_schema(self):
+        schema = LaunchParamSchema()
+        self.assertTrue(schema.is_valid('resource_link_id'))
+        self.assertTrue(schema.is_valid('custom_foo'))
+        self.assertTrue(schema.is_valid('ext_foo'))
+        self.assertFalse(schema.is_valid('foo'))
+        self.assertEqual(schema.prefix_of('custom_foo'), 'custom_')
+        self.assertIsNone(schema.prefix_of('resource_link_id'))
+
+        extended = schema.extend(['basiclti_submit'], prefixes=['vnd_'],
+                                 list_params=['vnd_list'])
+        self.assertTrue(extended.is_valid('basiclti_submit'))
+        self.assertTrue(extended.is_valid('vnd_foo'))
+        self.assertTrue(extended.is_valid('custom_foo'))
+        self.assertIn('vnd_list', extended.list_params)
+        self.assertFalse(schema.is_valid('basiclti_submit'))
+
+    def test_schema_subclass(self):
+
+        class VendorLaunchParams(LaunchParams):
+            schema = LaunchParams.schema.extend(['basiclti_submit'],
+                                                list_params=['vnd_roles'])
+
+        lp = VendorLaunchParams({'basiclti_submit': 'go',
+                                 'vnd_roles': 'a, b'})
+        self.assertEqual(lp['basiclti_submit'], 'go')
+        self.assertEqual(lp['vnd_roles'], ('a', 'b'))
+        self.failUnlessRaises(InvalidLaunchParamError, LaunchParams, {
+            'basiclti_submit': 'go'
+        })
+
+        lazy_class = LazyLaunchParams.for_class(VendorLaunchParams)
+        self.assertIs(lazy_class.schema, VendorLaunchParams.schema)
+        self.assertIs(LazyLaunchParams.for_class(VendorLaunchParams),
+                      lazy_class)
+        self.assertIs(LazyLaunchParams.for_class(LaunchParams),
+                      LazyLaunchParams)
+        lp = lazy_class.from_body(b'basiclti_submit=go&vnd_roles=a%2C+b')
+        self.assertEqual(lp['vnd_roles'], ('a', 'b'))
+
+    def test_prefix_views(self):
+        lp = LaunchParams({'custom_foo': 'bar', 'ext_baz': 'blergh',
+                           'resource_link_id': 1})
+        custom = lp.custom_params()
+        ext = lp.ext_params()
+        self.assertEqual(dict(custom), {'foo': 'bar'})
+        self.assertEqual(dict(ext), {'baz': 'blergh'})
+
+        # views are live
+        lp['custom_spam'] = 'eggs'
+        del lp['ext_baz']
+        self.assertEqual(dict(custom), {'foo': 'bar', 'spam': 'eggs'})
+        self.assertEqual(len(ext), 0)
+        with self.assertRaises(KeyError):
+            ext['baz']
+
+    def test_from_trusted(self):
+        lp = LaunchParams.from_trusted({
+            'resource_link_id': 1,
+            'roles': ['foo', ' bar'],
+            'custom_foo': 'bar',
+            'basiclti_submit': 'go',
+        })
+        self.assertEqual(lp['resource_link_id'], 1)
+        self.assertEqual(lp['roles'], ('foo', 'bar'))
+        self.assertEqual(lp._params['roles'], 'foo,bar')
+        self.assertEqual(lp['lti_version'], DEFAULT_LTI_VERSION)
+        self.assertEqual(lp['lti_message_type'], 'basic-lti-launch-request')
+        self.assertEqual(dict(lp.custom_params()), {'foo': 'bar'})
+        # unknown keys are dropped, so the params can still be read back
+        self.assertNotIn('basiclti_submit', lp._params)
+        self.assertEqual(lp.to_params()['resource_link_id'], 1)
+        self.assertEqual(len(dict(lp)), len(lp))
+
+        self.failUnlessRaises(InvalidLaunchParamError,
+                              LaunchParams.from_trusted,
+                              {'foo': 'bar'}, validate=True)
+
+    def test_copy(self):
+        lp = LaunchParams({'roles': 'foo,bar', 'custom_foo': 'bar'})
+        lp['roles']
+        clone = lp.copy()
+        self.assertIsInstance(clone, LaunchParams)
+        self.assertEqual(clone, lp)
+        self.assertIs(clone['roles'], lp['roles'])
+
+        # the copy is independent of the original
+        clone['custom_spam'] = 'eggs'
+        clone['roles'] = 'baz'
+        self.assertNotIn('custom_spam', lp)
+        self.assertEqual(dict(lp.custom_params()), {'foo': 'bar'})
+        self.assertEqual(lp['roles'], ('foo', 'bar'))
+
+    def test_pickle_and_deepcopy_after_to_params(self):
+        lp = LaunchParams({'roles': ['foo', 'bar'], 'custom_foo': 'bar'})
+        params = lp.to_params()
+        lp.to_body()
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            clone = pickle.loads(pickle.dumps(lp, protocol))
+            self.assertEqual(clone.to_params(), params)
+        self.assertIsNone(pickle.loads(pickle.dumps(lp))._encoded)
+        clone = copy.deepcopy(lp)
+        self.assertEqual(clone.to_params(), params)
+        clone['custom_foo'] = 'baz'
+        self.assertEqual(lp['custom_foo'], 'bar')
+
+        # the cached params stay read only once rebuilt
+        for clone in [copy.copy(params), copy.deepcopy(params)] + [
+                pickle.loads(pickle.dumps(params, protocol))
+                for protocol in range(pickle.HIGHEST_PROTOCOL + 1)]:
+            self.assertIsInstance(clone, ReadOnlyParams)
+            self.assertEqual(clone, params)
+            self.assertRaises(TypeError, clone.update, {'roles': 'baz'})
+
+
+class TestLazyLaunchParams(unittest.TestCase):
+
+    BODY = (b'lti_message_type=basic-lti-launch-request&lti_version=LTI-1p0'
+            b'&resource_link_id=abc&roles=Instructor%2CLearner'
+            b'&custom_name=J%C3%BCrgen+Smith&ext_empty=&lis_person_name_full'
+            b'&user_id=1&user_id=2')
+
+    def test_from_body(self):
+        lp = LazyLaunchParams.from_body(self.BODY)
+        self.assertEqual(len(lp), 8)
+        # nothing is decoded until it is read
+        self.assertEqual(lp._params, {})
+        self.assertEqual(lp['custom_name'], u'Jürgen Smith')
+        self.assertEqual(lp['roles'], ('Instructor', 'Learner'))
+        self.assertEqual(set(lp._params), {'custom_name', 'roles'})
+        self.assertEqual(lp['ext_empty'], '')
+        self.assertEqual(lp['lis_person_name_full'], '')
+        self.assertEqual(lp['user_id'], '1')
+        self.assertIn('resource_link_id', lp)
+        self.assertNotIn('context_id', lp)
+        self.assertEqual(dict(lp.custom_params()),
+                         {'name': u'Jürgen Smith'})
+
+    def test_dict_behavior(self):
+        lp = LazyLaunchParams.from_body(self.BODY)
+        expected = {
+            'lti_message_type': 'basic-lti-launch-request',
+            'lti_version': 'LTI-1p0',
+            'resource_link_id': 'abc',
+            'roles': ('Instructor', 'Learner'),
+            'custom_name': u'Jürgen Smith',
+            'ext_empty': '',
+            'lis_person_name_full': '',
+            'user_id': '1',
+        }
+        self.assertEqual(dict(lp), expected)
+
+        lp['user_id'] = '3'
+        del lp['ext_empty']
+        del lp['custom_name']
+        self.assertEqual(lp['user_id'], '3')
+        self.assertNotIn('ext_empty', lp)
+        self.assertEqual(len(lp), 6)
+        self.assertEqual(dict(lp.custom_params()), {})
+
+    def test_copy(self):
+        lp = LazyLaunchParams.from_body(self.BODY)
+        clone = lp.copy()
+        self.assertEqual(clone['resource_link_id'], 'abc')
+        self.assertNotIn('resource_link_id', lp._params)
+        self.assertEqual(dict(clone), dict(lp))
+
+    def test_from_trusted(self):
+        lp = LazyLaunchParams.from_trusted({'user_id': '1', 'foo': 'bar'})
+        self.assertEqual(dict(lp), {
+            'user_id': '1',
+            'lti_version': DEFAULT_LTI_VERSION,
+            'lti_message_type': 'basic-lti-launch-request',
+        })
+
+    def test_defaults_and_validation(self):
+        lp = LazyLaunchParams.from_body('resource_link_id=1')
+        self.assertEqual(lp['lti_version'], DEFAULT_LTI_VERSION)
+        self.assertEqual(lp['lti_message_type'], 'basic-lti-launch-request')
+        self.failUnlessRaises(InvalidLaunchParamError,
+                              LazyLaunchParams.from_body, b'foo=bar')
+
+        lp = LazyLaunchParams({'resource_link_id': 1})
+        self.assertEqual(lp['resource_link_id'], 1)
+
+    def test_to_params_cached(self):
+        lp = LaunchParams({'roles': ['foo', 'bar'], 'resource_link_id': 1})
+        params = lp.to_params()
+        self.assertEqual(params, {
+            'roles': 'foo,bar',
+            'resource_link_id': 1,
+            'lti_version': DEFAULT_LTI_VERSION,
+            'lti_message_type': 'basic-lti-launch-request',
+        })
+        self.assertIs(lp.to_params(), params)
+        with self.assertRaises(TypeError):
+            params['roles'] = 'baz'
+        self.assertEqual(params.copy()['roles'], 'foo,bar')
+
+        # any change clears the cache
+        lp['roles'] = 'baz'
+        self.assertIsNot(lp.to_params(), params)
+        self.assertEqual(lp.to_params()['roles'], 'baz')
+        params = lp.to_params()
+        del lp['roles']
+        self.assertNotIn('roles', lp.to_params())
+
+    def test_to_body(self):
+        lp = LaunchParams({'custom_name': u'J\xfcrgen Smith',
+                           'roles': ['foo', 'bar']})
+        body = lp.to_body()
+        self.assertEqual(body, b'custom_name=J%C3%BCrgen+Smith&roles=foo%2Cbar'
+                               b'&lti_version=LTI-1.0'
+                               b'&lti_message_type=basic-lti-launch-request')
+        self.assertIs(lp.to_body(), body)
+        lp['custom_name'] = 'Jane'
+        self.assertIn(b'custom_name=Jane', lp.to_body())
+        self.assertEqual(
+            LazyLaunchParams.from_body(lp.to_body()).to_params(),
+            lp.to_params())
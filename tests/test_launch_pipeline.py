@@ -0,0 +1,184 @@
+import time
+import unittest
+
+from mock import patch
+from oauthlib.oauth1 import SIGNATURE_TYPE_BODY, Client, RequestValidator
+
+from lti import (HMACLaunchVerifier, LaunchVerifier, StagedLaunchVerifier,
+                 ToolConsumer, ToolProvider)
+from lti.launch_pipeline import ACCEPTED
+from lti.launch_verifier import (INSECURE_TRANSPORT, INVALID_OAUTH_PARAMS,
+                                 INVALID_SIGNATURE, MISSING_LAUNCH_PARAMS,
+                                 MISSING_OAUTH_PARAMS, REPLAYED_NONCE,
+                                 TIMESTAMP_OUT_OF_WINDOW, UNKNOWN_CONSUMER)
+
+KEY = 'consumerkey000000000001'
+SECRET = 'secret'
+LAUNCH_URL = 'https://example.edu/launch'
+
+
+class Validator(RequestValidator):
+    dummy_client = 'dummyconsumerkey000000'
+
+    def __init__(self):
+        super(Validator, self).__init__()
+        self.nonces = set()
+
+    @property
+    def allowed_signature_methods(self):
+        return ('HMAC-SHA1', 'HMAC-SHA256', 'PLAINTEXT')
+
+    def validate_client_key(self, client_key, request):
+        return client_key == KEY
+
+    def get_client_secret(self, client_key, request):
+        return SECRET
+
+    def validate_timestamp_and_nonce(self, client_key, timestamp, nonce,
+                                     request, request_token=None,
+                                     access_token=None):
+        if (timestamp, nonce) in self.nonces:
+            return False
+        self.nonces.add((timestamp, nonce))
+        return True
+
+
+def launch(key=KEY, secret=SECRET, url=LAUNCH_URL, **params):
+    signature_method = params.pop('signature_method', 'HMAC-SHA1')
+    params.setdefault('resource_link_id', 'link')
+    consumer = ToolConsumer(key, secret, launch_url=url, params=params)
+    return ToolProvider.from_unpacked_request(
+        None, consumer.generate_launch_data(
+            signature_method=signature_method), url,
+        {'Content-Type': 'application/x-www-form-urlencoded'})
+
+
+class TestStagedLaunchVerifier(unittest.TestCase):
+
+    def setUp(self):
+        self.validator = Validator()
+        self.verifier = StagedLaunchVerifier(self.validator)
+
+    def assertRejected(self, tp, reason):
+        result = self.verifier.verify(tp)
+        self.assertFalse(result)
+        self.assertEqual(result.reason, reason)
+        return result
+
+    def test_accepted(self):
+        result = self.verifier.verify(launch())
+        self.assertTrue(result)
+        self.assertIsNone(result.reason)
+        self.assertEqual(result.consumer_secret, SECRET)
+        self.assertEqual(self.verifier.metrics(), {ACCEPTED: 1})
+
+    def test_missing_launch_params(self):
+        tp = launch()
+        del tp.launch_params['resource_link_id']
+        self.assertRejected(tp, MISSING_LAUNCH_PARAMS)
+
+    def test_content_item_request(self):
+        # ToolConsumer insists on a resource_link_id, so sign it directly
+        client = Client(KEY, client_secret=SECRET,
+                        signature_type=SIGNATURE_TYPE_BODY)
+        _, headers, body = client.sign(
+            LAUNCH_URL, 'POST', body={
+                'lti_message_type': 'ContentItemSelectionRequest',
+                'lti_version': 'LTI-1p0'},
+            headers={'Content-Type': 'application/x-www-form-urlencoded'})
+        tp = ToolProvider.from_unpacked_request(
+            None, body.encode('utf-8'), LAUNCH_URL, headers)
+        self.assertTrue(self.verifier.verify(tp))
+
+    def test_missing_oauth_params(self):
+        tp = launch()
+        for name in list(tp.launch_params):
+            if name.startswith('oauth_'):
+                del tp.launch_params[name]
+        self.assertRejected(tp, MISSING_OAUTH_PARAMS)
+        tp = launch()
+        del tp.launch_params['oauth_nonce']
+        self.assertRejected(tp, MISSING_OAUTH_PARAMS)
+
+    def test_invalid_oauth_params(self):
+        for name, value in [('oauth_version', '2.0'),
+                            ('oauth_timestamp', 'abcdefghij'),
+                            ('oauth_signature_method', 'HMAC-MD5')]:
+            tp = launch()
+            tp.launch_params[name] = value
+            self.assertRejected(tp, INVALID_OAUTH_PARAMS)
+
+    def test_insecure_transport(self):
+        self.assertRejected(launch(url='http://example.edu/launch'),
+                            INSECURE_TRANSPORT)
+
+    def test_timestamp_out_of_window(self):
+        tp = launch()
+        tp.launch_params['oauth_timestamp'] = str(int(time.time()) - 3600)
+        self.assertRejected(tp, TIMESTAMP_OUT_OF_WINDOW)
+
+    def test_unknown_consumer(self):
+        tp = launch(key='consumerkey000000000009')
+        self.assertRejected(tp, UNKNOWN_CONSUMER)
+        # rejected before its nonce is recorded
+        self.assertEqual(self.validator.nonces, set())
+
+    def test_replayed_nonce(self):
+        tp = launch()
+        self.assertTrue(self.verifier.verify(tp))
+        self.assertRejected(tp, REPLAYED_NONCE)
+
+    def test_invalid_signature(self):
+        self.assertRejected(launch(secret='wrong'), INVALID_SIGNATURE)
+
+    def test_no_signature_before_cheap_checks(self):
+        tp = launch()
+        tp.launch_params['oauth_timestamp'] = str(int(time.time()) - 3600)
+        with patch.object(HMACLaunchVerifier, '_check_signature') as check:
+            self.verifier.verify(tp)
+            self.verifier.verify(launch(key='consumerkey000000000009'))
+        self.assertFalse(check.called)
+
+    def test_oauthlib_signature_methods(self):
+        self.assertTrue(self.verifier.verify(
+            launch(signature_method='PLAINTEXT')))
+        self.assertRejected(launch(secret='wrong',
+                                   signature_method='PLAINTEXT'),
+                            INVALID_SIGNATURE)
+
+    def test_metrics(self):
+        self.verifier.verify(launch())
+        self.verifier.verify(launch())
+        self.verifier.verify(launch(secret='wrong'))
+        self.verifier.verify(launch(key='consumerkey000000000009'))
+        self.assertEqual(self.verifier.metrics(), {
+            ACCEPTED: 2, INVALID_SIGNATURE: 1, UNKNOWN_CONSUMER: 1})
+
+    def test_verify_launch(self):
+        tp = launch(secret='wrong')
+        result = tp.verify_launch(self.verifier)
+        self.assertEqual(result.reason, INVALID_SIGNATURE)
+        self.assertFalse(tp.is_valid_request(self.verifier))
+
+
+class TestRejectionReasons(unittest.TestCase):
+
+    def test_launch_verifier(self):
+        for verifier in [LaunchVerifier(Validator()),
+                         HMACLaunchVerifier(Validator())]:
+            self.assertIsNone(verifier.verify(launch()).reason)
+            self.assertEqual(verifier.verify(launch(secret='wrong')).reason,
+                             INVALID_SIGNATURE)
+            self.assertEqual(
+                verifier.verify(launch(key='consumerkey000000000009')).reason,
+                UNKNOWN_CONSUMER)
+
+    def test_hmac_launch_verifier(self):
+        verifier = HMACLaunchVerifier(Validator())
+        tp = launch()
+        self.assertTrue(verifier.verify(tp))
+        self.assertEqual(verifier.verify(tp).reason, REPLAYED_NONCE)
+
+
+if __name__ == '__main__':
+    unittest.main()
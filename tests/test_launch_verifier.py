@@ -0,0 +1,86 @@
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from oauthlib.oauth1 import RequestValidator
+
+from lti import LaunchVerifier, ToolConsumer, ToolProvider
+
+LAUNCH_URL = 'https://example.edu/launch'
+SECRETS = {
+    'consumerkey000000000001': 'secret-one',
+    'consumerkey000000000002': 'secret-two',
+}
+
+
+class DictValidator(RequestValidator):
+    dummy_client = 'dummyconsumerkey000000'
+
+    def __init__(self):
+        super(DictValidator, self).__init__()
+        self.lock = threading.Lock()
+        self.nonces = set()
+
+    def validate_client_key(self, client_key, request):
+        return client_key in SECRETS
+
+    def get_client_secret(self, client_key, request):
+        return SECRETS.get(client_key, 'dummy-secret')
+
+    def validate_timestamp_and_nonce(self, client_key, timestamp, nonce,
+                                     request, request_token=None,
+                                     access_token=None):
+        with self.lock:
+            if (timestamp, nonce) in self.nonces:
+                return False
+            self.nonces.add((timestamp, nonce))
+            return True
+
+
+def signed_launch(key, secret=None, **params):
+    params.setdefault('resource_link_id', 'link')
+    consumer = ToolConsumer(key, secret or SECRETS[key],
+                            launch_url=LAUNCH_URL, params=params)
+    return ToolProvider.from_unpacked_request(
+        None, consumer.generate_launch_data(), LAUNCH_URL,
+        {'Content-Type': 'application/x-www-form-urlencoded'})
+
+
+class TestLaunchVerifier(unittest.TestCase):
+
+    def setUp(self):
+        self.verifier = LaunchVerifier(DictValidator())
+
+    def test_verify(self):
+        result = self.verifier.verify(signed_launch('consumerkey000000000001'))
+        self.assertTrue(result)
+        self.assertEqual(result.consumer_key, 'consumerkey000000000001')
+        self.assertEqual(result.consumer_secret, 'secret-one')
+
+    def test_verify_bad_signature(self):
+        tp = signed_launch('consumerkey000000000001', secret='wrong')
+        self.assertFalse(self.verifier.verify(tp))
+
+    def test_verify_replay(self):
+        tp = signed_launch('consumerkey000000000002')
+        self.assertTrue(self.verifier.verify(tp))
+        self.assertFalse(self.verifier.verify(tp))
+
+    def test_is_valid_request(self):
+        launch = signed_launch('consumerkey000000000002')
+        tp = ToolProvider(params=launch.launch_params, launch_url=LAUNCH_URL,
+                          launch_headers=launch.launch_headers)
+        self.assertTrue(tp.is_valid_request(self.verifier))
+        self.assertEqual(tp.consumer_key, 'consumerkey000000000002')
+        self.assertEqual(tp.consumer_secret, 'secret-two')
+
+    def test_concurrent_verify(self):
+        launches = [signed_launch(key, user_id=str(i))
+                    for i in range(20) for key in sorted(SECRETS)]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(self.verifier.verify, launches))
+        self.assertTrue(all(results))
+        self.assertEqual(
+            [r.consumer_secret for r in results],
+            [SECRETS[tp.launch_params['oauth_consumer_key']]
+             for tp in launches])
@@ -0,0 +1,172 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import uuid
+
+from oauthlib.oauth1 import RequestValidator
+
+from lti.nonce_store import (MemoryNonceStore, NonceStore,
+                             NonceValidatorMixin, SharedMemoryNonceStore,
+                             SQLiteNonceStore, shared_memory)
+
+
+class NonceStoreTests(object):
+
+    def test_replay(self):
+        now = str(int(time.time()))
+        self.assertTrue(self.store.add('key', now, 'nonce1'))
+        self.assertFalse(self.store.add('key', now, 'nonce1'))
+        # the same nonce for another consumer or timestamp is fine
+        self.assertTrue(self.store.add('other', now, 'nonce1'))
+        self.assertTrue(self.store.add('key', str(int(now) + 1), 'nonce1'))
+        self.assertEqual(len(self.store), 3)
+
+    def test_expired(self):
+        old = str(int(time.time()) - self.store.ttl - 1)
+        self.assertTrue(self.store.add('key', old, 'nonce1'))
+        self.assertTrue(self.store.add('key', old, 'nonce1'))
+
+    def test_concurrent_add(self):
+        now = str(int(time.time()))
+        results = []
+
+        def add():
+            results.append(self.store.add('key', now, 'nonce1'))
+
+        threads = [threading.Thread(target=add) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(results), [False] * 7 + [True])
+
+
+class TestMemoryNonceStore(NonceStoreTests, unittest.TestCase):
+
+    def setUp(self):
+        self.store = MemoryNonceStore()
+
+    def test_maxsize(self):
+        store = MemoryNonceStore(maxsize=2)
+        now = str(int(time.time()))
+        for nonce in ['nonce1', 'nonce2', 'nonce3']:
+            self.assertTrue(store.add('key', now, nonce))
+        self.assertEqual(len(store), 2)
+        # the oldest nonce was dropped to make room
+        self.assertTrue(store.add('key', now, 'nonce1'))
+        self.assertFalse(store.add('key', now, 'nonce3'))
+
+    def test_expired_are_dropped(self):
+        old = str(int(time.time()) - self.store.ttl - 1)
+        self.store.add('key', old, 'nonce1')
+        self.store.add('key', str(int(time.time())), 'nonce2')
+        self.assertEqual(len(self.store), 1)
+
+
+class TestSQLiteNonceStore(NonceStoreTests, unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'nonces.db')
+        self.store = SQLiteNonceStore(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_shared_file(self):
+        now = str(int(time.time()))
+        self.assertTrue(self.store.add('key', now, 'nonce1'))
+        other = SQLiteNonceStore(self.path)
+        self.assertFalse(other.add('key', now, 'nonce1'))
+
+    def test_sweep(self):
+        old = str(int(time.time()) - self.store.ttl - 1)
+        self.store.add('key', old, 'nonce1')
+        self.store.add('key', str(int(time.time())), 'nonce2')
+        self.assertEqual(len(self.store), 2)
+        self.store.sweep()
+        self.assertEqual(len(self.store), 1)
+
+
+@unittest.skipIf(shared_memory is None, 'requires Python 3.8')
+class TestSharedMemoryNonceStore(NonceStoreTests, unittest.TestCase):
+
+    def setUp(self):
+        self.name = 'lti-test-{0}'.format(uuid.uuid4().hex[:12])
+        self.store = SharedMemoryNonceStore(self.name, capacity=1000)
+
+    def tearDown(self):
+        self.store.unlink()
+        self.store.close()
+
+    def test_replay(self):
+        now = str(int(time.time()))
+        self.assertTrue(self.store.add('key', now, 'nonce1'))
+        self.assertFalse(self.store.add('key', now, 'nonce1'))
+        self.assertTrue(self.store.add('other', now, 'nonce1'))
+        self.assertTrue(self.store.add('key', str(int(now) + 1), 'nonce1'))
+
+    def test_future_timestamp(self):
+        future = str(int(time.time()) + 3 * self.store.ttl)
+        self.assertFalse(self.store.add('key', future, 'nonce1'))
+
+    def test_rotation(self):
+        now = int(time.time())
+        self.assertTrue(self.store.add('key', str(now), 'nonce1'))
+        # a timestamp one full ring later lands in the same filter
+        later = now + self.store.buckets * self.store.bucket_seconds
+        window = later // self.store.bucket_seconds
+        offset = (self.store.HEADER.size +
+                  (window % self.store.buckets) * self.store.bucket_size)
+        self.store.WINDOW.pack_into(self.store._memory.buf, offset, window)
+        self.assertFalse(self.store.add('key', str(now), 'nonce1'))
+        self.store.WINDOW.pack_into(self.store._memory.buf, offset, 0)
+        self.assertTrue(self.store.add('key', str(now), 'nonce2'))
+
+    def test_shared_between_instances(self):
+        now = str(int(time.time()))
+        other = SharedMemoryNonceStore(self.name, capacity=1000)
+        try:
+            self.assertTrue(self.store.add('key', now, 'nonce1'))
+            self.assertFalse(other.add('key', now, 'nonce1'))
+        finally:
+            other.close()
+
+        with self.assertRaises(ValueError):
+            SharedMemoryNonceStore(self.name, capacity=10)
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'requires fork')
+    def test_shared_between_processes(self):
+        now = str(int(time.time()))
+        self.assertTrue(self.store.add('key', now, 'nonce1'))
+        pid = os.fork()
+        if pid == 0:
+            store = SharedMemoryNonceStore(self.name, capacity=1000)
+            replayed = not store.add('key', now, 'nonce1')
+            fresh = store.add('key', now, 'nonce2')
+            os._exit(0 if replayed and fresh else 1)
+        _, status = os.waitpid(pid, 0)
+        self.assertEqual(status, 0)
+        self.assertFalse(self.store.add('key', now, 'nonce2'))
+
+
+class TestNonceValidatorMixin(unittest.TestCase):
+
+    def test_validate_timestamp_and_nonce(self):
+
+        class Validator(NonceValidatorMixin, RequestValidator):
+            nonce_store = MemoryNonceStore()
+
+        validator = Validator()
+        now = str(int(time.time()))
+        self.assertTrue(validator.validate_timestamp_and_nonce(
+            'key', now, 'nonce1', None))
+        self.assertFalse(validator.validate_timestamp_and_nonce(
+            'key', now, 'nonce1', None))
+
+    def test_base_store(self):
+        with self.assertRaises(NotImplementedError):
+            NonceStore().add('key', '1', 'nonce1')
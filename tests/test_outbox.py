@@ -0,0 +1,214 @@
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import time
+import unittest
+
+from lti import ConsumerRegistry, OutcomeRequest, ToolProvider
+from lti.outbox import (FAILED, PENDING, SENDING, SENT, SUPERSEDED, Outbox,
+                        main)
+from lti.outcome_request import READ_REQUEST, REPLACE_REQUEST
+
+from test_transport import SUCCESS_XML, StubLMS, StubLMSHandler
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+
+class CodeLMSHandler(StubLMSHandler):
+    '''
+    Answers with the code_major the server is set to.
+    '''
+
+    def do_POST(self):
+        code = self.server.codes.pop(0) if self.server.codes else 'success'
+        self.server.bodies.append(
+            self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.requests.append(self.headers.get('Authorization'))
+        body = SUCCESS_XML.replace(b'>success<', '>{0}<'.format(
+            code).encode('ascii'))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def unused_url():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return 'http://127.0.0.1:{0}/service'.format(port)
+
+
+class TestOutbox(unittest.TestCase):
+
+    def setUp(self):
+        self.lms = StubLMS()
+        self.lms.RequestHandlerClass = CodeLMSHandler
+        self.lms.codes = []
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'outbox.db')
+        self.outbox = Outbox(self.path, retry_delay=0)
+
+    def tearDown(self):
+        self.lms.stop()
+        shutil.rmtree(self.directory)
+
+    def outcome_request(self, sourcedid='sourcedid', url=None, **opts):
+        opts.setdefault('consumer_secret', 'secret')
+        opts.update({
+            'consumer_key': 'consumer',
+            'lis_outcome_service_url': url or self.lms.url,
+            'lis_result_sourcedid': sourcedid,
+        })
+        opts.setdefault('operation', REPLACE_REQUEST)
+        return OutcomeRequest(opts)
+
+    def test_put_and_drain(self):
+        request = self.outcome_request(score=0.8, result_data={
+            'url': 'https://tool.example.edu/work/1'},
+            message_identifier='42')
+        row_id = self.outbox.put(request)
+        self.assertEqual(self.outbox.status(row_id)['status'], PENDING)
+        self.assertEqual(self.lms.bodies, [])
+
+        # another process drains the same file
+        self.assertEqual(Outbox(self.path).drain(), 1)
+        self.assertEqual(self.lms.bodies, [request.generate_request_xml()])
+        self.assertEqual(self.outbox.status(row_id), {
+            'status': SENT, 'attempts': 1, 'response_code': 200,
+            'code_major': 'success', 'description': 'Score updated',
+            'error': None})
+        self.assertEqual(self.outbox.drain(), 0)
+        self.assertEqual(self.outbox.counts(), {SENT: 1})
+
+    def test_drains_in_batches(self):
+        outbox = Outbox(self.path, batch_size=3, workers=2)
+        for i in range(10):
+            outbox.put(self.outcome_request('sourcedid{0}'.format(i),
+                                            score=i))
+        self.assertEqual(outbox.drain(), 10)
+        self.assertEqual(len(self.lms.bodies), 10)
+        self.assertEqual(outbox.counts(), {SENT: 10})
+
+    def test_retries(self):
+        self.lms.codes = ['processing']
+        retried = self.outbox.put(self.outcome_request('a', score=1))
+        self.assertEqual(self.outbox.drain(), 2)
+        self.assertEqual(self.outbox.status(retried)['status'], SENT)
+        self.assertEqual(self.outbox.status(retried)['attempts'], 2)
+
+        self.lms.codes = ['failure']
+        refused = self.outbox.put(self.outcome_request('b', score=1))
+        self.assertEqual(self.outbox.drain(), 1)
+        self.assertEqual(self.outbox.status(refused)['status'], FAILED)
+
+    def test_unreachable(self):
+        outbox = Outbox(self.path, max_attempts=2, retry_delay=0)
+        row_id = outbox.put(self.outcome_request(url=unused_url(), score=1))
+        self.assertEqual(outbox.drain(), 2)
+        status = outbox.status(row_id)
+        self.assertEqual(status['status'], FAILED)
+        self.assertEqual(status['attempts'], 2)
+        self.assertIn('ConnectionError', status['error'])
+
+        outbox = Outbox(self.path, retry_delay=60)
+        row_id = outbox.put(self.outcome_request(url=unused_url(), score=1))
+        self.assertEqual(outbox.drain(), 1)
+        self.assertEqual(outbox.status(row_id)['status'], PENDING)
+
+    def test_newer_writes_supersede_older(self):
+        older = self.outbox.put(self.outcome_request(score=0.5))
+        self.outbox.put(self.outcome_request(score=0.9))
+        self.assertEqual(self.outbox.status(older)['status'], SUPERSEDED)
+        self.assertEqual(self.outbox.drain(), 1)
+        self.assertIn(b'<textString>0.9</textString>', self.lms.bodies[0])
+
+        # a write that fails after a newer one is put is not retried
+        in_flight = self.outbox.put(self.outcome_request('b', score=0.5))
+        claimed = self.outbox.claim()
+        self.outbox.put(self.outcome_request('b', score=0.9))
+        self.assertEqual(self.outbox.claim(), [])
+        self.lms.codes = ['processing']
+        self.outbox._record([self.outbox._send(claimed[0])])
+        self.assertEqual(self.outbox.status(in_flight)['status'], SUPERSEDED)
+        self.assertEqual(self.outbox.drain(), 1)
+        self.assertEqual(len(self.lms.bodies), 3)
+        self.assertIn(b'<textString>0.9</textString>', self.lms.bodies[2])
+
+    def test_one_request_per_result_at_a_time(self):
+        outbox = Outbox(self.path, workers=2)
+        outbox.put(self.outcome_request(operation=READ_REQUEST))
+        outbox.put(self.outcome_request(score=1))
+        outbox.put(self.outcome_request('other', score=1))
+        claimed = outbox.claim()
+        self.assertEqual(
+            [(request.lis_result_sourcedid, request.operation)
+             for _, request in claimed],
+            [('sourcedid', READ_REQUEST), ('other', REPLACE_REQUEST)])
+        outbox._record([outbox._send(claim) for claim in claimed])
+        self.assertEqual(outbox.drain(), 1)
+        self.assertEqual(outbox.counts(), {SENT: 3})
+
+    def test_lease_expires(self):
+        row_id = self.outbox.put(self.outcome_request(score=1))
+        claimed = self.outbox.claim()
+        self.assertEqual([claimed_id for claimed_id, _ in claimed], [row_id])
+        self.assertEqual(self.outbox.status(row_id)['status'], SENDING)
+        # the worker died without posting it
+        self.assertEqual(self.outbox.claim(), [])
+        claimed = self.outbox.claim(now=time.time() + self.outbox.lease + 1)
+        self.assertEqual(claimed[0][1].score, '1')
+        self.assertEqual(self.outbox.status(row_id)['attempts'], 2)
+
+    def test_secret_from_registry(self):
+        registry = ConsumerRegistry({'consumer': 'registered'})
+        request = self.outcome_request(consumer_secret=None,
+                                       consumer_registry=registry, score=1)
+        row_id = Outbox(self.path).put(request)
+        outbox = Outbox(self.path, consumer_registry=registry)
+        self.assertIsNone(outbox._connection().execute(
+            'SELECT consumer_secret FROM lti_outbox').fetchone()[0])
+        self.assertEqual(outbox.drain(), 1)
+        self.assertEqual(outbox.status(row_id)['status'], SENT)
+        self.assertTrue(self.lms.requests[0].startswith('OAuth '))
+
+    def test_purge(self):
+        self.outbox.put(self.outcome_request(score=1))
+        self.outbox.drain()
+        pending = self.outbox.put(self.outcome_request(url=unused_url()))
+        self.assertEqual(self.outbox.purge(60), 0)
+        self.assertEqual(self.outbox.purge(-1), 1)
+        self.assertEqual(self.outbox.status(pending)['status'], PENDING)
+
+    def test_tool_provider(self):
+        tp = ToolProvider('consumer', 'secret', {
+            'lis_outcome_service_url': self.lms.url,
+            'lis_result_sourcedid': 'sourcedid'})
+        tp.outcome_queue = self.outbox
+        self.assertIsNone(tp.post_replace_result(0.25))
+        self.assertEqual(self.outbox.counts(), {PENDING: 1})
+        self.outbox.drain()
+        self.assertIn(b'<textString>0.25</textString>', self.lms.bodies[0])
+
+    def test_main(self):
+        self.outbox.put(self.outcome_request(score=1))
+        stdout = sys.stdout
+        sys.stdout = StringIO()
+        try:
+            self.assertEqual(main([self.path, '--once', '--workers', '1']), 0)
+            output = sys.stdout.getvalue()
+        finally:
+            sys.stdout = stdout
+        self.assertEqual(output,
+                         'posted 1 outcome requests: {"sent": 1}\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import time
+import unittest
+
+from lti import OutcomeRequest, ToolProvider
+from lti.outcome_cache import OutcomeCache
+from lti.outcome_request import READ_REQUEST, REPLACE_REQUEST
+
+from test_transport import FAILURE_XML, SUCCESS_XML, StubLMS
+
+READ_XML = SUCCESS_XML.replace(
+    b'<replaceResultResponse/>',
+    b'<readResultResponse><result><resultScore><language>en</language>'
+    b'<textString>0.5</textString></resultScore></result>'
+    b'</readResultResponse>')
+
+
+class SuccessResponse(object):
+
+    def is_success(self):
+        return True
+
+
+class TestOutcomeCache(unittest.TestCase):
+
+    def setUp(self):
+        self.lms = StubLMS()
+        self.cache = OutcomeCache()
+
+    def tearDown(self):
+        self.lms.stop()
+
+    def outcome_request(self, sourcedid='sourcedid'):
+        return OutcomeRequest({
+            'consumer_key': 'consumer',
+            'consumer_secret': 'secret',
+            'lis_outcome_service_url': self.lms.url,
+            'lis_result_sourcedid': sourcedid,
+            'outcome_cache': self.cache,
+        })
+
+    def test_skips_unchanged_scores(self):
+        self.assertTrue(
+            self.outcome_request().post_replace_result(0.5).is_success())
+        response = self.outcome_request().post_replace_result(0.5)
+        self.assertTrue(response.is_success())
+        self.assertEqual(response.attempts, 0)
+        self.assertEqual(len(self.lms.requests), 1)
+
+        self.outcome_request().post_replace_result('0.5')
+        self.outcome_request('other').post_replace_result(0.5)
+        self.outcome_request().post_replace_result(0.5, {'text': 'Good'})
+        self.outcome_request().post_replace_result(0.5, {'text': 'Good'})
+        self.outcome_request().post_replace_result(0.75, {'text': 'Good'})
+        self.assertEqual(len(self.lms.requests), 4)
+        self.assertEqual(self.cache.metrics(), {
+            'replace_hits': 3, 'replace_misses': 4})
+
+    def test_failures_are_not_cached(self):
+        self.lms.responses = [(200, FAILURE_XML), (500, b'')]
+        self.assertTrue(
+            self.outcome_request().post_replace_result(1).is_failure())
+        self.outcome_request().post_replace_result(1)
+        self.assertEqual(len(self.lms.requests), 2)
+        self.outcome_request().post_replace_result(1)
+        self.outcome_request().post_replace_result(1)
+        self.assertEqual(len(self.lms.requests), 3)
+        # a failed write leaves the score in the LMS unknown
+        self.lms.responses = [(503, b'')]
+        self.outcome_request().post_replace_result(2)
+        self.outcome_request().post_replace_result(1)
+        self.assertEqual(len(self.lms.requests), 5)
+
+    def test_delete_and_invalidate(self):
+        self.outcome_request().post_replace_result(1)
+        self.outcome_request().post_delete_result()
+        self.outcome_request().post_replace_result(1)
+        self.cache.invalidate(self.outcome_request())
+        self.outcome_request().post_replace_result(1)
+        self.cache.invalidate()
+        self.outcome_request().post_replace_result(1)
+        self.assertEqual(len(self.lms.requests), 5)
+
+    def test_read_result(self):
+        self.lms.responses = [(200, READ_XML)]
+        response = self.outcome_request().post_read_result()
+        self.assertEqual(response.score, 0.5)
+        self.assertIs(self.outcome_request().post_read_result(), response)
+        self.assertEqual(len(self.lms.requests), 1)
+
+        # a write makes the cached read stale
+        self.outcome_request().post_replace_result(1)
+        self.lms.responses = [(200, READ_XML)]
+        self.outcome_request().post_read_result()
+        self.assertEqual(len(self.lms.requests), 3)
+        self.assertEqual(self.cache.metrics(), {
+            'read_hits': 1, 'read_misses': 2, 'replace_misses': 1})
+
+    def test_read_ttl(self):
+        self.cache.read_ttl = 0.05
+        self.lms.responses = [(200, READ_XML)]
+        self.outcome_request().post_read_result()
+        time.sleep(0.05)
+        self.outcome_request().post_read_result()
+        self.assertEqual(len(self.lms.requests), 2)
+
+    def test_maxsize(self):
+        cache = OutcomeCache(maxsize=2)
+        requests = []
+        for sourcedid in ('a', 'b', 'c'):
+            request = OutcomeRequest({
+                'lis_outcome_service_url': self.lms.url,
+                'lis_result_sourcedid': sourcedid,
+                'operation': REPLACE_REQUEST,
+                'score': 1})
+            cache.store(request, SuccessResponse())
+            requests.append(request)
+        self.assertIsNone(cache.lookup(requests[0]))
+        self.assertIsNotNone(cache.lookup(requests[1]))
+        self.assertIsNotNone(cache.lookup(requests[2]))
+
+        read = OutcomeRequest({
+            'lis_outcome_service_url': self.lms.url,
+            'lis_result_sourcedid': 'a', 'operation': READ_REQUEST})
+        self.assertIsNone(cache.lookup(read))
+
+    def test_tool_provider(self):
+        tp = ToolProvider('consumer', 'secret', {
+            'lis_outcome_service_url': self.lms.url,
+            'lis_result_sourcedid': 'sourcedid'})
+        tp.outcome_cache = self.cache
+        for i in range(3):
+            self.assertTrue(tp.post_replace_result(0.9).is_success())
+        self.assertTrue(tp.last_outcome_success())
+        self.assertEqual(len(self.lms.requests), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+import threading
+import unittest
+
+from lti import ToolProvider
+from lti.outcome_queue import OutcomeQueue
+
+from test_transport import StubLMS
+
+
+class FakeOutcomeRequest(object):
+    '''
+    Stands in for an OutcomeRequest, and waits for ``release`` to be set
+    before "posting".
+    '''
+    lis_outcome_service_url = 'https://lms.example.edu/outcomes'
+
+    def __init__(self, sourcedid, score, release=None, posted=None,
+                 error=None):
+        self.lis_result_sourcedid = sourcedid
+        self.score = score
+        self.release = release
+        self.posted = posted if posted is not None else []
+        self.error = error
+        self.started = threading.Event()
+
+    def is_read_request(self):
+        return False
+
+    def post_outcome_request(self):
+        self.started.set()
+        if self.release is not None:
+            self.release.wait()
+        if self.error is not None:
+            raise self.error
+        self.posted.append((self.lis_result_sourcedid, self.score))
+        return 'response {0}'.format(self.score)
+
+
+class TestOutcomeQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.results = []
+        self.queue = OutcomeQueue(workers=2, hooks=[self.hook])
+
+    def tearDown(self):
+        self.queue.close(timeout=5)
+
+    def hook(self, outcome_request, outcome_response, error):
+        self.results.append((outcome_request, outcome_response, error))
+
+    def test_coalesces_pending_writes(self):
+        queue = OutcomeQueue(delay=60, hooks=[self.hook])
+        posted = []
+        for score in (0.1, 0.2, 0.3):
+            queue.put(FakeOutcomeRequest('a', score, posted=posted))
+        queue.put(FakeOutcomeRequest('b', 0.5, posted=posted))
+        self.assertEqual(queue.metrics()['pending'], 2)
+        self.assertTrue(queue.close(timeout=5))
+        self.assertEqual(sorted(posted), [('a', 0.3), ('b', 0.5)])
+        self.assertEqual(queue.metrics(), {
+            'queued': 4, 'coalesced': 2, 'posted': 2,
+            'pending': 0, 'in_flight': 0})
+        self.assertEqual(len(self.results), 2)
+
+    def test_waits_for_write_in_flight(self):
+        release = threading.Event()
+        posted = []
+        first = FakeOutcomeRequest('a', 1, release, posted)
+        self.queue.put(first)
+        self.assertTrue(first.started.wait(5))
+        # the second worker must not overtake the write in flight
+        self.queue.put(FakeOutcomeRequest('a', 2, posted=posted))
+        self.queue.put(FakeOutcomeRequest('a', 3, posted=posted))
+        self.assertFalse(self.queue.flush(timeout=0.05))
+        self.assertEqual(posted, [])
+        release.set()
+        self.assertTrue(self.queue.flush(timeout=5))
+        self.assertEqual(posted, [('a', 1), ('a', 3)])
+        self.assertEqual(self.queue.counts['coalesced'], 1)
+
+    def test_hooks(self):
+        self.queue.put(FakeOutcomeRequest('a', 1))
+        error = ValueError('LMS is down')
+        self.queue.put(FakeOutcomeRequest('b', 1, error=error))
+        self.queue.hooks.insert(0, lambda *args: 1 / 0)
+        self.queue.flush(timeout=5)
+        results = sorted(self.results,
+                         key=lambda result: result[0].lis_result_sourcedid)
+        self.assertEqual([result[1:] for result in results],
+                         [('response 1', None), (None, error)])
+        self.assertEqual(self.queue.counts['posted'], 1)
+        self.assertEqual(self.queue.counts['failed'], 1)
+
+    def test_closed(self):
+        self.queue.close()
+        with self.assertRaises(RuntimeError):
+            self.queue.put(FakeOutcomeRequest('a', 1))
+
+    def test_reads_are_not_coalesced_with_writes(self):
+        read = FakeOutcomeRequest('a', None)
+        read.is_read_request = lambda: True
+        self.assertNotEqual(OutcomeQueue.key(read),
+                            OutcomeQueue.key(FakeOutcomeRequest('a', 1)))
+
+
+class TestToolProviderOutcomeQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.lms = StubLMS()
+        self.results = []
+        self.queue = OutcomeQueue(delay=60, hooks=[
+            lambda request, response, error: self.results.append(response)])
+
+    def tearDown(self):
+        self.queue.close(timeout=5)
+        self.lms.stop()
+
+    def tool_provider(self, sourcedid):
+        tp = ToolProvider('consumer', 'secret', {
+            'lis_outcome_service_url': self.lms.url,
+            'lis_result_sourcedid': sourcedid})
+        tp.outcome_queue = self.queue
+        return tp
+
+    def test_post_replace_result(self):
+        tp = self.tool_provider('sourcedid')
+        self.assertIsNone(tp.post_replace_result(0.5))
+        self.assertIsNone(tp.post_replace_result(0.75, result_data={
+            'text': 'second attempt'}))
+        self.assertEqual(self.lms.requests, [])
+        self.assertFalse(tp.last_outcome_success())
+
+        self.assertTrue(self.queue.flush(timeout=5))
+        self.assertEqual(len(self.lms.bodies), 1)
+        self.assertEqual(self.lms.bodies[0],
+                         tp.last_outcome_request().generate_request_xml())
+        self.assertIn(b'<textString>0.75</textString>', self.lms.bodies[0])
+        self.assertTrue(tp.last_outcome_success())
+        self.assertTrue(self.results[0].is_success())
+
+    def test_delete_replaces_pending_score(self):
+        tp = self.tool_provider('sourcedid')
+        tp.post_replace_result(0.5)
+        self.assertIsNone(tp.post_delete_result())
+        self.tool_provider('other').post_replace_result(1)
+        self.queue.flush(timeout=5)
+        self.assertEqual(len(self.lms.bodies), 2)
+        self.assertIn(b'<deleteResultRequest>',
+                      b''.join(self.lms.bodies))
+
+    def test_without_queue(self):
+        tp = self.tool_provider('sourcedid')
+        tp.outcome_queue = None
+        self.assertTrue(tp.post_replace_result(0.5).is_success())
+        self.assertEqual(len(self.lms.requests), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,9 @@
 from lti.outcome_request import REPLACE_REQUEST
 from lti import OutcomeRequest, OutcomeResponse, InvalidLTIConfigError
+from lti import InvalidOutcomeRequestError
 
 import unittest
+from random import Random
 from oauthlib.common import unquote
 from httmock import all_requests, HTTMock
 from django.conf import settings
@@ -99,6 +101,64 @@ class TestOutcomeRequest(unittest.TestCase):
         self.assertEqual(request.message_identifier, '123456789')
         self.assertEqual(request.score, None)
 
+    def test_parse_result_data(self):
+        request = OutcomeRequest()
+        request.process_xml(REPLACE_RESULT_XML.replace(
+            b'</resultScore>',
+            b'</resultScore><resultData><url>http://a/?b&amp;c</url>'
+            b'</resultData>'))
+        self.assertEqual(request.result_data, {'url': 'http://a/?b&c'})
+
+    def test_parse_extensions(self):
+        request = OutcomeRequest()
+        request.process_xml(REPLACE_RESULT_XML.replace(
+            b'<result>',
+            b'<result><resultTotalScore><language/><textString>10'
+            b'</textString></resultTotalScore>'))
+        self.assertEqual(request.score, '5')
+        self.assertEqual(request.lis_result_sourcedid, '261-154-728-17-784')
+
+    def test_parse_generated_xml(self):
+        request = OutcomeRequest({
+            'operation': REPLACE_REQUEST, 'score': 0.5,
+            'result_data': {'text': 'Good'},
+            'lis_result_sourcedid': 'a&b', 'message_identifier': '42'})
+        parsed = OutcomeRequest()
+        parsed.process_xml(request.generate_request_xml())
+        self.assertEqual(parsed.message_identifier, '42')
+        self.assertEqual(parsed.lis_result_sourcedid, 'a&b')
+        self.assertEqual(parsed.score, '0.5')
+        self.assertEqual(parsed.result_data, {'text': 'Good'})
+
+    def test_parse_without_namespace(self):
+        request = OutcomeRequest()
+        request.process_xml(READ_RESULT_XML.replace(
+            b' xmlns="http://www.imsglobal.org/services/ltiv1p1/xsd/'
+            b'imsoms_v1p0"', b''))
+        self.assertEqual(request.operation, 'readResult')
+        self.assertEqual(request.lis_result_sourcedid, '261-154-728-17-784')
+
+    def test_parse_invalid_xml(self):
+        doctype = (b'<?xml version="1.0"?><!DOCTYPE x [<!ENTITY e "e">]>'
+                   b'<imsx_POXEnvelopeRequest>&e;</imsx_POXEnvelopeRequest>')
+        for xml in (b'', b'<imsx_POXEnvelopeRequest>', doctype,
+                    REPLACE_RESULT_XML.replace(b'imsx_POX', b'POX'),
+                    REPLACE_RESULT_XML.replace(b'imsx_messageIdentifier',
+                                               b'messageIdentifier'),
+                    REPLACE_RESULT_XML.replace(b'replaceResult',
+                                               b'replaceResults'),
+                    REPLACE_RESULT_XML.replace(b'261-154-728-17-784', b''),
+                    READ_RESULT_XML.replace(b'sourcedGUID', b'sourcedId'),
+                    EXPECTED_XML % b'<sourcedId>1</sourcedId>',
+                    REPLACE_RESULT_XML.replace(
+                        b'</replaceResultRequest>',
+                        b'</replaceResultRequest><readResultRequest/>'),
+                    EXPECTED_XML % b''):
+            request = OutcomeRequest()
+            with self.assertRaises(InvalidOutcomeRequestError):
+                request.process_xml(xml)
+            self.assertIsNone(request.operation)
+
     def test_has_required_attributes(self):
         request = OutcomeRequest()
         self.assertFalse(request.has_required_attributes())
@@ -146,3 +206,34 @@ class TestOutcomeRequest(unittest.TestCase):
         self.assertEqual(request.lis_result_sourcedid, '261-154-728-17-784')
         self.assertEqual(request.message_identifier, '123456789')
         self.assertEqual(request.score, '5')
+
+    def test_template_xml_matches_tree(self):
+        random = Random(1)
+        alphabet = (u'ab1 &<>"\'\r\n\t\x7f\x85\xe9\u2603\ud7ff\ue000'
+                    u'\ufffd\U0001f600')
+        texts = [None, u'', u'sourcedid', u'a&b<c>d\r\n', 5, b'bytes',
+                 u'\x00', u'\x0b', u'\ufffe', u'\ud800']
+        texts.extend(u''.join(random.choice(alphabet) for i in range(8))
+                     for j in range(50))
+        result_datas = [None, {}, {'text': u'Good'}, {'url': u'http://a/?b&c'},
+                        {'text': u'a', 'url': u'b'}, {'image': u'cat'}]
+        for operation in (REPLACE_REQUEST, 'readResult', 'deleteResult',
+                          'otherResult'):
+            for score in (None, 0.5, 1, u'0.25', u'<1>'):
+                for result_data in result_datas:
+                    for text in texts:
+                        request = OutcomeRequest({
+                            'operation': operation, 'score': score,
+                            'result_data': result_data,
+                            'message_identifier': text,
+                            'lis_result_sourcedid': texts[
+                                random.randrange(len(texts))]})
+                        try:
+                            expected = request._tree_request_xml()
+                        except Exception as e:
+                            with self.assertRaises(type(e)):
+                                request.generate_request_xml()
+                        else:
+                            self.assertEqual(request.generate_request_xml(),
+                                             expected)
+
@@ -1,4 +1,5 @@
-from lti import OutcomeResponse
+from lti import OutcomeRequest, OutcomeResponse
+from lti.outcome_request import REPLACE_REQUEST
 from lxml import etree
 import mock
 import unittest
@@ -72,7 +73,7 @@ class TestOutcomeResponse(unittest.TestCase):
         self.assertEqual(response.severity, 'status')
         self.assertEqual(response.description, '')
         self.assertEqual(response.message_ref_identifier, '123456789')
-        self.assertEqual(response.score, '0.91')
+        self.assertEqual(response.score, 0.91)
 
     def test_parse_delete_result_response_xml(self):
         '''
@@ -98,6 +99,64 @@ class TestOutcomeResponse(unittest.TestCase):
         result = OutcomeResponse.from_post_response(fake, failure_xml)
         self.assertTrue(result.is_failure())
 
+    def test_parse_plain_strings(self):
+        response = OutcomeResponse()
+        response.process_xml(RESPONSE_XML.replace(
+            b'<imsx_description></imsx_description>',
+            b'<imsx_description>Score &amp; data updated</imsx_description>'))
+        for name in ('message_identifier', 'code_major', 'severity',
+                     'description', 'message_ref_identifier', 'operation'):
+            self.assertIs(type(getattr(response, name)), str)
+        self.assertEqual(response.description, 'Score & data updated')
+
+    def test_parse_empty_score(self):
+        read_xml = RESPONSE_XML.replace(
+            b'<replaceResultResponse/>',
+            b'<readResultResponse><result><resultScore><language/>'
+            b'<textString/></resultScore></result></readResultResponse>')
+        response = OutcomeResponse()
+        response.process_xml(read_xml)
+        self.assertTrue(response.is_success())
+        self.assertIsNone(response.score)
+
+    def test_parse_without_namespace(self):
+        response = OutcomeResponse()
+        response.process_xml(RESPONSE_XML.replace(
+            b' xmlns="http://www.imsglobal.org/services/ltiv1p1/xsd/'
+            b'imsoms_v1p0"', b''))
+        self.assertTrue(response.is_success())
+        self.assertEqual(response.operation, 'replaceResult')
+
+    def test_parse_invalid_xml(self):
+        for xml in (b'', b'<html><body>Bad Gateway</body></html>',
+                    RESPONSE_XML[:200],
+                    b'<!DOCTYPE x [<!ENTITY e "success">]>'
+                    b'<imsx_POXEnvelopeResponse><imsx_statusInfo>'
+                    b'<imsx_codeMajor>&e;</imsx_codeMajor></imsx_statusInfo>'
+                    b'</imsx_POXEnvelopeResponse>'):
+            response = OutcomeResponse()
+            response.process_xml(xml)
+            self.assertIsNone(response.code_major)
+            self.assertFalse(response.is_success())
+
+    def test_score_round_trip(self):
+        for score in (0.0, 0.91, 1.0, 1 / 3.0, 0.1 + 0.2, 1e-07):
+            response = OutcomeResponse()
+            response.process_xml(RESPONSE_XML)
+            response.operation = 'readResult'
+            response.score = score
+            parsed = OutcomeResponse()
+            parsed.process_xml(response.generate_response_xml())
+            self.assertEqual(parsed.score, score)
+
+            request = OutcomeRequest({
+                'operation': REPLACE_REQUEST, 'score': score,
+                'lis_result_sourcedid': 'sourcedid',
+                'message_identifier': '42'})
+            parsed = OutcomeRequest()
+            parsed.process_xml(request.generate_request_xml())
+            self.assertEqual(float(parsed.score), score)
+
     def test_generate_response_xml(self):
         '''
         Should generate response XML.
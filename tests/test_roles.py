@@ -0,0 +1,83 @@
+import unittest
+
+from lti import RoleSet
+from lti.roles import (parse_role, Role, CONTEXT_SCOPE, INSTITUTION_SCOPE,
+                       SYSTEM_SCOPE)
+
+
+class TestParseRole(unittest.TestCase):
+
+    def test_simple_name(self):
+        self.assertEqual(parse_role(' Instructor'),
+                         Role(CONTEXT_SCOPE, 'instructor', None, False))
+        self.assertEqual(parse_role('TeachingAssistant/Grader'),
+                         Role(CONTEXT_SCOPE, 'teachingassistant', 'grader',
+                              False))
+
+    def test_urns(self):
+        self.assertEqual(parse_role('urn:lti:role:ims/lis/Instructor'),
+                         Role(CONTEXT_SCOPE, 'instructor', None, True))
+        self.assertEqual(parse_role('urn:lti:instrole:ims/lis/Faculty'),
+                         Role(INSTITUTION_SCOPE, 'faculty', None, True))
+        self.assertEqual(parse_role('urn:lti:sysrole:ims/lis/SysAdmin'),
+                         Role(SYSTEM_SCOPE, 'sysadmin', None, True))
+        self.assertEqual(
+            parse_role('urn:lti:role:ims/lis/'
+                       'TeachingAssistant/TeachingAssistantSection'),
+            Role(CONTEXT_SCOPE, 'teachingassistant',
+                 'teachingassistantsection', True))
+
+    def test_unknown_urn(self):
+        self.assertEqual(parse_role('urn:vendor:role:Grader'),
+                         Role(None, 'urn:vendor:role:grader', None, True))
+
+    def test_interned(self):
+        role = 'urn:lti:role:ims/lis/Learner'
+        self.assertIs(parse_role(role), parse_role(role))
+
+
+class TestRoleSet(unittest.TestCase):
+
+    def setUp(self):
+        self.roles = RoleSet((
+            'urn:lti:role:ims/lis/Learner',
+            'urn:lti:instrole:ims/lis/Faculty',
+            'urn:lti:role:ims/lis/TeachingAssistant/TeachingAssistantSection',
+            'Mentor',
+            '',
+        ))
+
+    def test_simple_names_match_any_scope(self):
+        self.assertTrue(self.roles.has_role('learner'))
+        self.assertTrue(self.roles.has_role('Faculty'))
+        self.assertTrue(self.roles.has_role('teachingassistant'))
+        self.assertTrue(self.roles.has_role('mentor'))
+        self.assertFalse(self.roles.has_role('Instructor'))
+
+    def test_urns_match_scope(self):
+        self.assertTrue(self.roles.has_role('urn:lti:role:ims/lis/Learner'))
+        self.assertTrue(self.roles.has_role('urn:lti:role:ims/lis/Mentor'))
+        self.assertTrue(
+            self.roles.has_role('urn:lti:instrole:ims/lis/Faculty'))
+        self.assertFalse(
+            self.roles.has_role('urn:lti:role:ims/lis/Faculty'))
+        self.assertFalse(
+            self.roles.has_role('urn:lti:instrole:ims/lis/Learner'))
+
+    def test_explicit_scope(self):
+        self.assertTrue(self.roles.has_role('Faculty', INSTITUTION_SCOPE))
+        self.assertFalse(self.roles.has_role('Faculty', CONTEXT_SCOPE))
+        self.assertEqual(self.roles.in_scope(INSTITUTION_SCOPE),
+                         frozenset(['faculty']))
+
+    def test_sub_roles(self):
+        self.assertTrue(self.roles.has_role(
+            'TeachingAssistant/TeachingAssistantSection'))
+        self.assertFalse(self.roles.has_role('TeachingAssistant/Grader'))
+        self.assertTrue(self.roles.has_role(
+            'urn:lti:role:ims/lis/TeachingAssistant'))
+
+    def test_has_any_role(self):
+        self.assertTrue(self.roles.has_any_role(['foo', 'learner']))
+        self.assertFalse(self.roles.has_any_role(['foo', 'bar']))
+        self.assertEqual(len(self.roles), 4)
@@ -2,6 +2,7 @@
 import unittest
 from oauthlib.common import generate_client_id, generate_token
 from lti import LaunchParams, ToolBase, DEFAULT_LTI_VERSION
+from lti.tool_base import LaunchParamAttribute
 
 
 def create_tb(key=None, secret=None, lp=None):
@@ -47,6 +48,42 @@ class TestToolBase(unittest.TestCase):
         self.assertFalse('context_id' in tb.__dict__)
         self.assertEqual(tb.launch_params['context_id'], 2345)
 
+    def test_spec_param_descriptors(self):
+        self.assertIsInstance(ToolBase.user_id, LaunchParamAttribute)
+        tb = create_tb()
+        self.assertIsNone(tb.user_id)
+        tb.user_id = 'spam'
+        self.assertEqual(tb.launch_params['user_id'], 'spam')
+        self.assertEqual(tb.user_id, 'spam')
+        self.assertFalse('user_id' in tb.__dict__)
+        del tb.user_id
+        self.assertNotIn('user_id', tb.launch_params)
+        self.assertIsNone(tb.user_id)
+
+    def test_dynamic_params(self):
+        tb = create_tb()
+        self.assertIsNone(tb.custom_foo)
+        tb.custom_foo = 'bar'
+        tb.ext_baz = 'blergh'
+        self.assertEqual(tb.launch_params['custom_foo'], 'bar')
+        self.assertEqual(tb.custom_foo, 'bar')
+        self.assertEqual(tb.ext_baz, 'blergh')
+        self.assertFalse('custom_foo' in tb.__dict__)
+
+    def test_schema_params(self):
+
+        class VendorLaunchParams(LaunchParams):
+            schema = LaunchParams.schema.extend(['basiclti_submit'])
+
+        tb = create_tb(lp=VendorLaunchParams({'basiclti_submit': 'go'}))
+        self.assertEqual(tb.basiclti_submit, 'go')
+        tb.basiclti_submit = 'stop'
+        self.assertNotIn('basiclti_submit', tb.__dict__)
+        self.assertEqual(tb.launch_params['basiclti_submit'], 'stop')
+        self.assertEqual(tb.to_params()['basiclti_submit'], 'stop')
+        with self.assertRaises(AttributeError):
+            create_tb().basiclti_submit
+
     def test_has_role(self):
 
         tb = create_tb(lp={'roles': 'foo,bar,BLERG'})
@@ -74,6 +111,47 @@ class TestToolBase(unittest.TestCase):
         tb = create_tb(lp={'roles': 'foo, student'})
         self.assertFalse(tb.is_instructor())
 
+    def test_urn_roles(self):
+
+        tb = create_tb(lp={'roles': 'urn:lti:role:ims/lis/Learner'})
+        self.assertTrue(tb.is_student())
+        self.assertFalse(tb.is_instructor())
+        self.assertTrue(tb.has_role('urn:lti:role:ims/lis/Learner'))
+        self.assertFalse(tb.has_role('learner', scope='institution'))
+
+        tb = create_tb(lp={'roles': 'urn:lti:instrole:ims/lis/Faculty'})
+        self.assertFalse(tb.is_instructor())
+        self.assertTrue(tb.has_role('faculty', scope='institution'))
+
+    def test_institution_roles_are_not_course_roles(self):
+
+        tb = create_tb(lp={'roles': 'urn:lti:instrole:ims/lis/Faculty,'
+                                    'urn:lti:role:ims/lis/Learner'})
+        self.assertFalse(tb.is_instructor())
+        self.assertTrue(tb.is_student())
+
+        tb = create_tb(lp={'roles': 'urn:lti:instrole:ims/lis/Student,'
+                                    'urn:lti:role:ims/lis/Instructor'})
+        self.assertTrue(tb.is_instructor())
+        self.assertFalse(tb.is_student())
+
+    def test_role_set(self):
+
+        tb = create_tb(lp={'roles': 'foo'})
+        role_set = tb.role_set
+        self.assertIs(tb.role_set, role_set)
+        self.assertTrue(tb.has_role('foo'))
+
+        # rebuilt when the roles change
+        tb.roles = 'Instructor'
+        self.assertIsNot(tb.role_set, role_set)
+        self.assertFalse(tb.has_role('foo'))
+        self.assertTrue(tb.is_instructor())
+
+        tb = create_tb()
+        self.assertFalse(tb.has_role('foo'))
+        self.assertEqual(len(tb.role_set), 0)
+
     def test_is_launch_request(self):
 
         tb = create_tb()
@@ -92,3 +170,21 @@ class TestToolBase(unittest.TestCase):
         tb.set_ext_param('baz', 'blergh')
         self.assertEqual(tb.launch_params['ext_baz'], 'blergh')
         self.assertEqual(tb.get_ext_param('baz'), 'blergh')
+
+    def test_to_params(self):
+
+        tb = create_tb(lp={'resource_link_id': 1, 'roles': 'foo, bar'})
+        params = tb.to_params()
+        self.assertEqual(params['roles'], 'foo,bar')
+        self.assertIs(tb.to_params(), params)
+        self.assertIs(tb.to_body(), tb.to_body())
+
+        tb.user_id = 'spam'
+        tb.custom_foo = 'bar'
+        self.assertEqual(tb.to_params()['user_id'], 'spam')
+        self.assertEqual(tb.to_params()['custom_foo'], 'bar')
+        self.assertIn(b'user_id=spam', tb.to_body())
+
+        tb.custom_x = ['a', 'b']
+        self.assertEqual(tb.to_params()['custom_x'], 'a,b')
+        self.assertIn(b'custom_x=a%2Cb', tb.to_body())
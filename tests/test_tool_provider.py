@@ -1,3 +1,5 @@
+import copy
+import pickle
 import unittest
 
 try:
@@ -11,7 +13,7 @@ from oauthlib.common import generate_token
 from oauthlib.oauth1 import SignatureOnlyEndpoint
 from oauthlib.oauth1 import RequestValidator
 
-from lti import LaunchParams, OutcomeRequest, ToolProvider
+from lti import LaunchParams, LazyLaunchParams, OutcomeRequest, ToolProvider
 from lti.utils import parse_qs, InvalidLTIConfigError
 from lti.tool_provider import ProxyValidator
 
@@ -67,6 +69,31 @@ class TestToolProvider(unittest.TestCase):
             self.assertEqual(call_params, lp)
             self.assertEqual(call_headers, launch_headers)
 
+    def test_from_unpacked_request_body(self):
+        body = (b'oauth_consumer_key=spam&resource_link_id=123'
+                b'&lti_version=foo&lti_message_type=bar')
+        tp = ToolProvider.from_unpacked_request(
+            None, body, 'http://example.edu/foo/bar', {})
+        self.assertIsInstance(tp.launch_params, LazyLaunchParams)
+        self.assertEqual(tp.consumer_key, 'spam')
+        self.assertEqual(tp.to_params(), {
+            'oauth_consumer_key': 'spam',
+            'resource_link_id': '123',
+            'lti_version': 'foo',
+            'lti_message_type': 'bar',
+        })
+
+    def test_from_unpacked_request_body_custom_params(self):
+        body = b'oauth_consumer_key=spam&basiclti_submit=go'
+        tp = CustomToolProvider.from_unpacked_request(
+            None, body, 'http://example.edu/foo/bar', {})
+        self.assertIsInstance(tp.launch_params, LazyLaunchParams)
+        self.assertIsInstance(tp.launch_params, CustomLaunchParams)
+        self.assertEqual(tp.basiclti_submit, 'go')
+        self.assertIs(type(tp.launch_params), type(
+            CustomToolProvider.from_unpacked_request(
+                None, body, 'http://example.edu/foo/bar', {}).launch_params))
+
     def test_is_valid_request_no_key_or_secret(self):
         """
         Checks that the key and secret will be populated during validation.
@@ -218,11 +245,29 @@ class TestToolProvider(unittest.TestCase):
         tp._last_outcome_request = mock
         self.assertTrue(tp.last_outcome_success())
 
+    def test_constructor_launch_params_class(self):
+        tp = CustomToolProvider(params={'basiclti_submit': 'go'})
+        self.assertIsInstance(tp.launch_params, CustomLaunchParams)
+        self.assertEqual(tp.launch_params['basiclti_submit'], 'go')
+        tp.basiclti_submit = 'stop'
+        self.assertEqual(tp.to_params()['basiclti_submit'], 'stop')
+        tp.launch_url = 'http://example.edu/launch'
+        self.assertNotIn('launch_url', tp.launch_params)
+
     def test_last_outcome_request(self):
         tp = create_tp()
         tp.outcome_requests = ['foo','bar']
         self.assertEqual(tp.last_outcome_request(), 'bar')
 
+    def test_pickle_and_deepcopy_after_to_params(self):
+        tp = create_tp(lp={'resource_link_id': '123', 'roles': 'Learner'})
+        params = tp.to_params()
+        for clone in (pickle.loads(pickle.dumps(tp)), copy.deepcopy(tp)):
+            self.assertEqual(clone.to_params(), params)
+            self.assertEqual(clone.consumer_secret, tp.consumer_secret)
+            clone.resource_link_id = '456'
+            self.assertEqual(tp.resource_link_id, '123')
+
     def test_custom_launch_params(self):
         key = generate_client_id()
         secret = generate_token()